@@ -0,0 +1,100 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from mission import Mission, SearchMission, detect_bundled_sos
+
+# Column name -> dtype of the saved results; one entry per mission in each column
+COLUMNS = {
+    'seed': np.int64,
+    'success': bool,
+    'reached_goal': bool,
+    'detected': bool,
+    'confidence': np.float32,
+    'path_length': np.int32,
+    'planned_length': np.int32,  # -1 for search missions, which plan no route up front
+    'expanded': np.int64,
+    'obstacles_added': np.int32,
+    'planning_time': np.float64,
+    'detection_time': np.float64,
+    'coverage': np.float32,  # Share of free cells seen; NaN for missions with a known goal
+}
+
+def run_missions(seeds, mission_kwargs, detect=True, search=False):
+    # Runs one chunk of missions in a worker; returns columns rather than a list of
+    # dicts so only a handful of arrays cross the process boundary
+    detector = detect_bundled_sos if detect else None
+    kind = SearchMission if search else Mission
+    rows = [kind(seed=int(seed), detector=detector, **mission_kwargs).run() for seed in seeds]
+    return {name: np.array([row[name] for row in rows], dtype=dtype) for name, dtype in COLUMNS.items()}
+
+def run_batch(seeds, workers=None, chunk_size=64, detect=True, search=False, **mission_kwargs):
+    # Fans the seeded scenarios out over a process pool. Results come back in seed order,
+    # so the same seeds always give the same table regardless of the worker count.
+    seeds = np.asarray(seeds, dtype=np.int64)
+    chunks = [seeds[i:i + chunk_size] for i in range(0, len(seeds), chunk_size)]
+    if workers == 1:
+        parts = [run_missions(chunk, mission_kwargs, detect, search) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(run_missions, chunks, [mission_kwargs] * len(chunks), [detect] * len(chunks),
+                                  [search] * len(chunks)))
+    if not parts:
+        return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+    return {name: np.concatenate([part[name] for part in parts]) for name in COLUMNS}
+
+def save_results(path, columns, **settings):
+    # Columnar .npz: np.load(path)['path_length'] etc.; run settings are stored alongside
+    np.savez_compressed(path, **columns, **{f'setting_{k}': np.asarray(v) for k, v in settings.items()})
+
+def summarize(columns):
+    count = len(columns['seed'])
+    if not count:
+        return "No missions run"
+    success = columns['success']
+    reached = columns['path_length'][columns['reached_goal']]
+    mean_path = f"{reached.mean():.1f} cells" if reached.size else "n/a"  # Nothing reached the goal
+    swept = columns['coverage'][np.isfinite(columns['coverage'])]  # Only search missions sweep
+    coverage = f", mean coverage {swept.mean() * 100:.1f}%" if swept.size else ""
+    return (f"{count} missions, {success.mean() * 100:.1f}% success, "
+            f"mean path {mean_path}, "
+            f"mean planning {columns['planning_time'].mean() * 1000:.2f} ms, "
+            f"mean detection {columns['detection_time'].mean() * 1000:.2f} ms{coverage}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run many seeded missions headlessly across a process pool")
+    parser.add_argument('--missions', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0, help="first seed; missions use seed, seed+1, ...")
+    parser.add_argument('--width', type=int, default=30)
+    parser.add_argument('--height', type=int, default=30)
+    parser.add_argument('--obstacles', type=float, default=0.25)
+    parser.add_argument('--obstacle-rate', type=float, default=0.0,
+                        help="chance per step of discovering a new obstacle on the route")
+    parser.add_argument('--workers', type=int, default=None, help="default: one per CPU")
+    parser.add_argument('--chunk-size', type=int, default=64)
+    parser.add_argument('--no-detect', action='store_true', help="skip SOS detection on arrival")
+    parser.add_argument('--search', action='store_true',
+                        help="hide the SOS position and sweep for it (--obstacle-rate does not apply)")
+    parser.add_argument('--radius', type=int, default=None, help="camera footprint radius in cells for --search")
+    parser.add_argument('--output', default='missions.npz')
+    args = parser.parse_args(argv)
+    if args.radius is not None and args.radius < 1:
+        parser.error("--radius must be at least 1")
+
+    settings = dict(width=args.width, height=args.height, obstacle_prob=args.obstacles)
+    if args.search:
+        if args.radius is not None:
+            settings['radius'] = args.radius
+    else:
+        settings['obstacle_rate'] = args.obstacle_rate
+    seeds = np.arange(args.seed, args.seed + args.missions)
+    began = time.perf_counter()
+    columns = run_batch(seeds, args.workers, args.chunk_size, not args.no_detect, args.search, **settings)
+    elapsed = time.perf_counter() - began
+    save_results(args.output, columns, detect=not args.no_detect, search=args.search, **settings)
+    print(summarize(columns))
+    print(f"Ran in {elapsed:.2f} s on {args.workers or os.cpu_count()} workers, saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import cv2
+import numpy as np
+
+from pathfinding import astar
+from terrain_generator import generate_terrain
+from frame_ingest import brightness_cache
+from sos_detector import get_brightness_sequence, detect_sos_pattern
+from strobe_simulator import generate_sos_pattern
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(BASE_DIR, 'models', 'sos_classifier.pkl')
+SOS_FRAMES = os.path.join(BASE_DIR, 'assets', 'sos_sequence')
+
+DEFAULT_SIZES = (64, 256, 1024)
+DEFAULT_DENSITIES = (0.0, 0.1, 0.2)
+DEFAULT_FRAME_COUNTS = (15, 30, 60)
+DEFAULT_FRAME_SIZES = (100, 320, 640)
+QUICK = {'sizes': (32, 64), 'densities': (0.0, 0.2), 'frames': (15, 60), 'frame_sizes': (100,)}
+
+# A result is flagged when it gets this much slower or bigger than the baseline...
+DEFAULT_THRESHOLD = 0.25
+# ...and the change is larger than the timer / allocator noise
+MIN_SECONDS_DELTA = 0.002
+MIN_BYTES_DELTA = 64 * 1024
+
+def measure(fn, repeats=3):
+    # Best-of-N wall clock, then one extra run under tracemalloc for the memory peak
+    # (tracemalloc slows allocation down, so it's kept out of the timed runs)
+    times = []
+    result = None
+    for _ in range(repeats):
+        began = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - began)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    timing = {'seconds': min(times), 'median_seconds': statistics.median(times), 'peak_bytes': peak}
+    return timing, result
+
+def bench_astar(sizes, densities, repeats):
+    # Corner-to-corner queries on seeded terrain, so expansions are comparable between runs
+    for size in sizes:
+        for density in densities:
+            grid = generate_terrain(size, size, obstacle_prob=density, seed=size)
+            grid[0, 0] = grid[-1, -1] = 0
+            stats = {}
+            timing, path = measure(lambda: astar(grid, (0, 0), (size - 1, size - 1), stats=stats), repeats)
+            yield {'params': {'size': size, 'density': density},
+                   'expanded': stats['expanded'], 'path_length': len(path), **timing}
+
+def bench_terrain(sizes, densities, repeats):
+    for size in sizes:
+        for density in densities:
+            timing, _ = measure(lambda: generate_terrain(size, size, obstacle_prob=density, seed=0), repeats)
+            yield {'params': {'size': size, 'density': density}, **timing}
+
+def bench_brightness(frame_counts, frame_sizes, repeats):
+    # Reads synthetic strobe frames written once per frame size; the brightness cache is
+    # bypassed so every repeat measures a cold decode
+    for frame_size in frame_sizes:
+        with tempfile.TemporaryDirectory() as folder:
+            frame = np.full((frame_size, frame_size), 255, dtype=np.uint8)
+            for i in range(max(frame_counts)):
+                cv2.imwrite(os.path.join(folder, f'frame_{i:03}.png'), frame)
+            for count in frame_counts:
+                timing, values = measure(lambda: get_brightness_sequence(folder, num_frames=count, cache=False), repeats)
+                yield {'params': {'frames': count, 'frame_size': frame_size}, 'frames_read': len(values), **timing}
+
+def bench_detect(repeats):
+    # Full pipeline on the bundled 60-frame sequence, model load and frame decoding
+    # included, with and without the matched-filter fast path. The brightness cache is
+    # emptied before every run, or repeats would skip decoding altogether.
+    for fast_path in (True, False):
+        def detect():
+            brightness_cache.clear()
+            return detect_sos_pattern(MODEL_PATH, SOS_FRAMES, fast_path)
+        timing, (found, _) = measure(detect, repeats)
+        yield {'params': {'frames': 60, 'fast_path': fast_path}, 'detected': found, **timing}
+
+def bench_strobe(frame_sizes, repeats):
+    for frame_size in frame_sizes:
+        with tempfile.TemporaryDirectory() as folder:
+            timing, _ = measure(lambda: generate_sos_pattern(folder, frame_size=(frame_size, frame_size)), repeats)
+            yield {'params': {'frame_size': frame_size}, **timing}
+
+def scaling_exponent(points):
+    # Slope of log(seconds) against log(work); ~1 is linear, ~2 quadratic
+    points = [(x, y) for x, y in points if x > 0 and y > 0]
+    if len(points) < 2:
+        return None
+    xs, ys = np.log([x for x, _ in points]), np.log([y for _, y in points])
+    return float(np.polyfit(xs, ys, 1)[0])
+
+def scaling_curves(results):
+    # One curve per benchmark (and density), time against the number of grid cells or frames
+    curves = {}
+    for name, x_key, group_key in [('astar', 'size', 'density'), ('terrain', 'size', 'density'),
+                                   ('brightness', 'frames', 'frame_size')]:
+        groups = {}
+        for row in results:
+            if row['benchmark'] == name:
+                params = row['params']
+                work = params[x_key] ** 2 if x_key == 'size' else params[x_key]
+                groups.setdefault(params[group_key], []).append((work, row['seconds']))
+        for group, points in sorted(groups.items()):
+            curves[f'{name}[{group_key}={group}]'] = {
+                'points': sorted(points),
+                'exponent': scaling_exponent(points),
+            }
+    return curves
+
+def run_benchmarks(sizes, densities, frame_counts, frame_sizes, repeats=3, only=None):
+    suites = {
+        'astar': lambda: bench_astar(sizes, densities, repeats),
+        'terrain': lambda: bench_terrain(sizes, densities, repeats),
+        'brightness': lambda: bench_brightness(frame_counts, frame_sizes, repeats),
+        'detect': lambda: bench_detect(repeats),
+        'strobe': lambda: bench_strobe(frame_sizes, repeats),
+    }
+    results = []
+    for name, suite in suites.items():
+        if only and name not in only:
+            continue
+        for row in suite():
+            row = {'benchmark': name, **row}
+            results.append(row)
+            print(f"{name:>10} {json.dumps(row['params']):<36} {row['seconds'] * 1000:>10.2f} ms "
+                  f"{row['peak_bytes'] / 2**20:>8.2f} MB", file=sys.stderr)
+    return {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'platform': platform.platform(),
+            'repeats': repeats,
+        },
+        'results': results,
+        'scaling': scaling_curves(results),
+    }
+
+def result_key(row):
+    return row['benchmark'], json.dumps(row['params'], sort_keys=True)
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    # Returns (regressions, rows) where rows lists every benchmark found in both files
+    base_rows = {result_key(row): row for row in baseline['results']}
+    regressions, rows = [], []
+    for row in current['results']:
+        base = base_rows.get(result_key(row))
+        if base is None:
+            continue
+        problems = []
+        if (row['seconds'] > base['seconds'] * (1 + threshold)
+                and row['seconds'] - base['seconds'] > MIN_SECONDS_DELTA):
+            problems.append(f"time {base['seconds'] * 1000:.2f} -> {row['seconds'] * 1000:.2f} ms")
+        if (row['peak_bytes'] > base['peak_bytes'] * (1 + threshold)
+                and row['peak_bytes'] - base['peak_bytes'] > MIN_BYTES_DELTA):
+            problems.append(f"peak memory {base['peak_bytes'] / 2**20:.2f} -> {row['peak_bytes'] / 2**20:.2f} MB")
+        if 'expanded' in base and row.get('expanded', 0) > base['expanded']:
+            problems.append(f"expanded {base['expanded']} -> {row['expanded']}")
+        ratio = row['seconds'] / base['seconds'] if base['seconds'] else float('inf')
+        rows.append((row, ratio, problems))
+        if problems:
+            regressions.append((row, problems))
+    return regressions, rows
+
+def print_comparison(rows):
+    for row, ratio, problems in rows:
+        flag = 'REGRESSION ' + '; '.join(problems) if problems else ''
+        print(f"{row['benchmark']:>10} {json.dumps(row['params']):<36} {ratio:>6.2f}x  {flag}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless benchmarks for planning, terrain and SOS detection")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run = sub.add_parser('run', help="run the benchmarks and write a JSON report")
+    run.add_argument('--output', default='benchmark_results.json')
+    run.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    run.add_argument('--densities', type=float, nargs='+', default=DEFAULT_DENSITIES)
+    run.add_argument('--frames', type=int, nargs='+', default=DEFAULT_FRAME_COUNTS)
+    run.add_argument('--frame-sizes', type=int, nargs='+', default=DEFAULT_FRAME_SIZES)
+    run.add_argument('--repeats', type=int, default=3)
+    run.add_argument('--only', nargs='+', choices=['astar', 'terrain', 'brightness', 'detect', 'strobe'])
+    run.add_argument('--quick', action='store_true', help="small sizes, for a fast smoke run")
+    run.add_argument('--baseline', help="compare against this report after running")
+    run.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+
+    cmp = sub.add_parser('compare', help="compare two JSON reports")
+    cmp.add_argument('baseline')
+    cmp.add_argument('current')
+    cmp.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        if args.quick:
+            args.sizes, args.densities = QUICK['sizes'], QUICK['densities']
+            args.frames, args.frame_sizes = QUICK['frames'], QUICK['frame_sizes']
+        report = run_benchmarks(args.sizes, args.densities, args.frames, args.frame_sizes,
+                                args.repeats, args.only)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {len(report['results'])} results to {args.output}")
+        if not args.baseline:
+            return 0
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        current = report
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+
+    regressions, rows = compare(baseline, current, args.threshold)
+    print_comparison(rows)
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) against the baseline")
+        return 1
+    print("✅ No regressions against the baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from panda3d.core import NodePath
+from ground_mesh import ground_chunk
+from scenery import model_extent, scenery_block
+
+PAGE_CELLS = 32     # Cells per paged chunk edge; a multiple of the scenery LOD chunk
+VIEW_RADIUS = 2     # Chunks kept attached on each side of the drone's chunk
+CACHE_CHUNKS = 64   # Built chunks kept in memory, attached or not
+
+class ChunkManager:
+    # Pages ground and scenery in around a focus cell instead of building the whole map
+    # up front. Chunks within radius of the focus are attached; missing ones are built on
+    # a worker thread, nearest first, and attached by poll() once done. Chunks that fall
+    # out of range are detached but stay cached until the LRU needs the room, so flying
+    # back over them is free and memory stays flat however big the map is.
+    def __init__(self, parent, terrain, cell_size, texture=None, models=None, seed=0,
+                 chunk=PAGE_CELLS, radius=VIEW_RADIUS, cache_size=CACHE_CHUNKS):
+        self.root = parent.attach_new_node('world')
+        self.terrain = terrain
+        self.height, self.width = np.shape(terrain)
+        self.cell_size = cell_size
+        self.texture = texture
+        self.models = models
+        self.extents = None if models is None else {kind: model_extent(m) for kind, m in models.items()}
+        self.seed = seed
+        self.chunk = chunk
+        self.radius = radius
+        self.cache_size = max(cache_size, (2 * radius + 1) ** 2)
+        self.chunks = OrderedDict()  # (cx, cy) -> NodePath, least recently in view first
+        self.pending = {}            # (cx, cy) -> (future, version)
+        self.versions = {}           # (cx, cy) -> bumped whenever cells in the chunk change
+        self.visible = set()
+        self.center = None
+        self.built = 0
+        self.evicted = 0
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='chunk-builder')
+
+    def chunk_of(self, cell):
+        return (int(cell[0]) // self.chunk, int(cell[1]) // self.chunk)
+
+    def bounds(self, key):
+        # Cell range [x0, x1) x [y0, y1) of a chunk, clipped to the map
+        x0, y0 = key[0] * self.chunk, key[1] * self.chunk
+        return x0, y0, min(x0 + self.chunk, self.width), min(y0 + self.chunk, self.height)
+
+    def chunks_around(self, key):
+        # Chunks within radius of key that exist on the map, nearest first
+        cx, cy = key
+        r = self.radius
+        keys = [(x, y) for y in range(max(0, cy - r), min(-(-self.height // self.chunk), cy + r + 1))
+                for x in range(max(0, cx - r), min(-(-self.width // self.chunk), cx + r + 1))]
+        return sorted(keys, key=lambda k: (k[0] - cx) ** 2 + (k[1] - cy) ** 2)
+
+    def build(self, key, cells):
+        # Runs on the worker: ground mesh plus scenery for one chunk, as a detached node.
+        # cells is a private copy of the chunk's terrain so edits can't race the build, and
+        # the scenery rng is seeded per chunk so it doesn't depend on load order.
+        x0, y0, x1, y1 = self.bounds(key)
+        node = NodePath(f'chunk_{key[0]}_{key[1]}')
+        ground = node.attach_new_node(ground_chunk(x0, y0, x1, y1, self.cell_size, name=f'ground_{key[0]}_{key[1]}'))
+        if self.texture is not None:
+            ground.set_texture(self.texture)
+        if self.models is not None:
+            rng = np.random.default_rng([self.seed, key[0], key[1]])
+            scenery_block(cells, rng, self.models, self.cell_size, (x0, y0), self.extents).reparent_to(node)
+        return node
+
+    def submit(self, key):
+        x0, y0, x1, y1 = self.bounds(key)
+        cells = np.array(self.terrain[y0:y1, x0:x1])
+        self.pending[key] = (self.executor.submit(self.build, key, cells), self.versions.get(key, 0))
+
+    def update(self, cell):
+        # Recenter on a grid cell: attach cached chunks in range, queue the missing ones and
+        # detach those that left. Cheap when the focus stays inside the same chunk.
+        key = self.chunk_of(cell)
+        if key == self.center:
+            return
+        self.center = key
+        wanted = self.chunks_around(key)
+        for old in self.visible.difference(wanted):
+            if old in self.chunks:
+                self.chunks[old].detach_node()
+            elif old in self.pending and self.pending[old][0].cancel():
+                del self.pending[old]  # Queued but not started; no longer needed
+        self.visible = set(wanted)
+        for new in wanted:
+            if new in self.chunks:
+                self.chunks[new].reparent_to(self.root)
+                self.chunks.move_to_end(new)
+            elif new not in self.pending:
+                self.submit(new)
+        self.trim()
+
+    def poll(self):
+        # Attach chunks whose builds finished; call once a frame from the main thread
+        for key, (future, version) in list(self.pending.items()):
+            if not future.done():
+                continue
+            del self.pending[key]
+            node = future.result()
+            if version != self.versions.get(key, 0):
+                # Cells changed while it was building; build again from the new terrain
+                node.remove_node()
+                if key in self.visible:
+                    self.submit(key)
+                continue
+            stale = self.chunks.pop(key, None)
+            if stale is not None:
+                stale.remove_node()
+            self.chunks[key] = node
+            self.built += 1
+            if key in self.visible:
+                node.reparent_to(self.root)
+        self.trim()
+
+    def invalidate(self, cells):
+        # Terrain cells changed: rebuild the chunks holding them. A chunk in view keeps
+        # its old geometry until the replacement is attached, so nothing pops out.
+        for key in {self.chunk_of(cell) for cell in cells}:
+            self.versions[key] = self.versions.get(key, 0) + 1
+            if key not in self.visible:
+                stale = self.chunks.pop(key, None)
+                if stale is not None:
+                    stale.remove_node()
+            elif key not in self.pending:
+                self.submit(key)
+
+    def trim(self):
+        # Drop least recently viewed chunks that are out of view until the cache fits
+        for key in list(self.chunks):
+            if len(self.chunks) <= self.cache_size:
+                break
+            if key not in self.visible:
+                self.chunks.pop(key).remove_node()
+                self.evicted += 1
+
+    def wait(self):
+        # Block until every queued chunk is built and attached
+        while self.pending:
+            for future, _ in list(self.pending.values()):
+                future.result()
+            self.poll()
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+if __name__ == "__main__":
+    import time
+    from panda3d.core import RenderState, TransformState
+    from terrain_generator import generate_terrain
+    from scenery import builtin_model, TREE, ROCK
+
+    # Fly straight across a large map headlessly and watch the cache stay bounded
+    size = 4096
+    began = time.perf_counter()
+    terrain = generate_terrain(size, size, obstacle_prob=0.2, seed=np.random.default_rng(0))
+    print(f"{size}x{size} terrain generated in {time.perf_counter() - began:.2f} s")
+    manager = ChunkManager(NodePath('render'), terrain, 2, models={TREE: builtin_model(TREE), ROCK: builtin_model(ROCK)})
+    began = time.perf_counter()
+    manager.update((0, 0))
+    print(f"update() returned in {(time.perf_counter() - began) * 1000:.2f} ms, {len(manager.pending)} chunks queued")
+    manager.wait()
+    print(f"first view built in {time.perf_counter() - began:.2f} s")
+    began = time.perf_counter()
+    for step in range(0, size, 8):
+        manager.update((step, step))
+        manager.wait()
+        # Free unused transform/render states, which a running ShowBase does every frame
+        TransformState.garbage_collect()
+        RenderState.garbage_collect()
+    print(f"flew {size} cells diagonally in {time.perf_counter() - began:.1f} s: {manager.built} chunks built, "
+          f"{manager.evicted} evicted, {len(manager.chunks)} cached (max {manager.cache_size})")
+    manager.close()
@@ -0,0 +1,200 @@
+import numpy as np
+
+# 8-neighborhood in ring order; consecutive entries (cyclically) are 4-adjacent
+RING = [(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)]
+# Cells a local search may visit while checking a possible split before giving up
+# and relabeling the whole grid
+FLOOD_BUDGET = 4096
+
+def label_components(grid):
+    # 4-connected components of the free cells. Returns (labels, count) where labels
+    # is an int32 array with 0 for obstacles and 1..count for components.
+    free = np.asarray(grid) == 0
+    rows, cols = free.shape
+    labels = np.zeros((rows, cols), dtype=np.int32)
+    if not free.any():
+        return labels, 0
+
+    # Every horizontal run of free cells gets its own id
+    run_start = free.copy()
+    run_start[:, 1:] &= ~free[:, :-1]
+    run_ids = np.cumsum(run_start.ravel()).reshape(rows, cols) - 1
+    run_count = int(run_ids[-1, -1]) + 1
+
+    # Runs stacked on top of each other share a component
+    touching = free[:-1] & free[1:]
+    a = run_ids[:-1][touching]
+    b = run_ids[1:][touching]
+    parent = np.arange(run_count)
+    while a.size:
+        # Hook every root onto the smallest root it touches, then flatten the trees
+        ra, rb = parent[a], parent[b]
+        np.minimum.at(parent, np.maximum(ra, rb), np.minimum(ra, rb))
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+        pending = parent[a] != parent[b]
+        a, b = a[pending], b[pending]
+
+    roots, compact = np.unique(parent, return_inverse=True)
+    labels[free] = (compact + 1).astype(np.int32)[run_ids[free]]
+    return labels, len(roots)
+
+class ConnectivityIndex:
+    # Component labels for a terrain grid, kept up to date as cells change. Opening a
+    # cell merges the labels around it through a small union-find. Blocking a cell
+    # checks its 3x3 ring for a possible split, confirms it with a bounded local flood
+    # and only relabels the whole grid when both sides of a split are large.
+    def __init__(self, grid):
+        self.grid = grid
+        self.rows, self.cols = grid.shape
+        self.relabels = 0
+        self.relabel()
+
+    def relabel(self):
+        self.labels, count = label_components(self.grid)
+        self.parent = np.arange(count + 1, dtype=np.int32)  # Label 0 is "blocked"
+        self.next_label = count + 1
+        self.relabels += 1
+
+    def find(self, label):
+        parent = self.parent
+        while parent[label] != label:
+            parent[label] = parent[parent[label]]
+            label = int(parent[label])
+        return label
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[max(a, b)] = min(a, b)
+        return min(a, b)
+
+    def new_label(self):
+        if self.next_label == len(self.parent):
+            grown = np.arange(2 * len(self.parent), dtype=np.int32)
+            grown[:len(self.parent)] = self.parent
+            self.parent = grown
+        self.next_label += 1
+        return self.next_label - 1
+
+    def component(self, pos):
+        # Component id of a cell, 0 for obstacles and out-of-bounds cells
+        x, y = int(pos[0]), int(pos[1])
+        if not (0 <= x < self.cols and 0 <= y < self.rows):
+            return 0
+        label = int(self.labels[y, x])
+        return self.find(label) if label else 0
+
+    def connected(self, a, b):
+        component = self.component(a)
+        return component != 0 and component == self.component(b)
+
+    def component_mask(self, pos):
+        component = self.component(pos)
+        if not component:
+            return np.zeros((self.rows, self.cols), dtype=bool)
+        # Resolve every label to its root at once by pointer jumping
+        roots = self.parent[:self.next_label].copy()
+        while True:
+            jumped = roots[roots]
+            if np.array_equal(jumped, roots):
+                break
+            roots = jumped
+        return roots[self.labels] == component
+
+    def random_reachable(self, pos, rng, x_min=0, y_min=0):
+        # A random free cell other than pos that can be reached from pos, or None
+        mask = self.component_mask(pos)
+        if mask.any():
+            mask[int(pos[1]), int(pos[0])] = False
+        ys, xs = np.nonzero(mask[y_min:, x_min:])
+        if not xs.size:
+            return None
+        i = rng.integers(xs.size)
+        return (int(xs[i]) + x_min, int(ys[i]) + y_min)
+
+    def free(self, x, y):
+        return 0 <= x < self.cols and 0 <= y < self.rows and self.grid[y][x] == 0
+
+    def split_arcs(self, x, y):
+        # Blocking (x, y) can only disconnect its neighbors if they don't stay linked
+        # around it. Returns one neighbor per free arc of the surrounding ring that
+        # touches the cell; a single arc means nothing can have split.
+        ring = [self.free(x + dx, y + dy) for dx, dy in RING]
+        if all(ring):
+            return []
+        first_gap = ring.index(False)
+        arcs, arc = [], None
+        for i in range(first_gap + 1, first_gap + 9):
+            k = i % 8
+            if not ring[k]:
+                if arc is not None:
+                    arcs.append(arc)
+                arc = None
+            elif k % 2 == 0 and arc is None:
+                arc = (x + RING[k][0], y + RING[k][1])
+        return arcs
+
+    def flood(self, start, targets, budget=FLOOD_BUDGET):
+        # Bounded BFS; returns (seen, complete) where complete means the whole
+        # component was visited. Stops early once every target has been seen.
+        seen = {start}
+        queue = [start]
+        remaining = set(targets) - seen
+        for x, y in queue:
+            if not remaining or len(seen) > budget:
+                return seen, False
+            for dx, dy in RING[::2]:
+                cell = (x + dx, y + dy)
+                if cell not in seen and self.free(*cell):
+                    seen.add(cell)
+                    queue.append(cell)
+                    remaining.discard(cell)
+        return seen, True
+
+    def separate(self, arcs):
+        # Splits off pieces that lost their connection. Small pieces are found by a
+        # local flood and given a fresh label; returns False if that wasn't enough.
+        pending, stuck = arcs, 0
+        while len(pending) > 1 and stuck < len(pending):
+            seen, complete = self.flood(pending[0], pending[1:])
+            rest = [cell for cell in pending[1:] if cell not in seen]
+            if complete:
+                if rest:
+                    label = self.new_label()
+                    for cx, cy in seen:
+                        self.labels[cy, cx] = label
+                pending, stuck = rest, 0
+            else:
+                # Out of budget: drop the arcs it did reach and try from the next one
+                stuck = 0 if len(rest) < len(pending) - 1 else stuck + 1
+                pending = rest + [pending[0]]
+        return len(pending) <= 1
+
+    def update_cells(self, changes):
+        # changes: iterable of ((x, y), value). The grid is written as well so callers
+        # can pass the same edits they give the planners.
+        needs_relabel = False
+        for (x, y), value in changes:
+            blocked = bool(value)
+            if bool(self.grid[y][x]) == blocked and (self.labels[y, x] == 0) == blocked:
+                continue
+            self.grid[y][x] = value
+            if blocked:
+                self.labels[y, x] = 0
+                arcs = self.split_arcs(x, y)
+                if len(arcs) > 1 and not needs_relabel:
+                    needs_relabel = not self.separate(arcs)
+                continue
+            label = 0
+            for dx, dy in RING[::2]:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < self.cols and 0 <= ny < self.rows and self.labels[ny, nx]:
+                    neighbor = int(self.labels[ny, nx])
+                    label = self.union(label, neighbor) if label else self.find(neighbor)
+            self.labels[y, x] = label or self.new_label()
+        if needs_relabel:
+            self.relabel()
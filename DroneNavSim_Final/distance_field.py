@@ -0,0 +1,159 @@
+import hashlib
+import heapq
+from collections import OrderedDict
+import numpy as np
+from pathfinding import pad_grid, neighbor_offsets, to_index, to_pos, in_bounds
+
+class DistanceField:
+    # Cost-to-goal for every cell of a grid; any start descends it to the goal
+    def __init__(self, distances, shape, goal, diagonal=False, cost=None):
+        self.distances = distances  # Flat, padded like pathfinding.pad_grid
+        self.shape = shape
+        self.goal = goal
+        self.diagonal = diagonal
+        self.cost = cost
+        self.width = shape[1] + 2
+
+    def as_array(self):
+        rows, cols = self.shape
+        return self.distances.reshape(rows + 2, cols + 2)[1:-1, 1:-1]
+
+    def distance(self, pos):
+        if not in_bounds(pos, *self.shape):
+            return np.inf
+        return float(self.distances[to_index(pos, self.width)])
+
+    def reachable(self, pos):
+        return np.isfinite(self.distance(pos))
+
+    def path_from(self, start):
+        if not self.reachable(start):
+            return []
+        dist = memoryview(self.distances)
+        cost = memoryview(self.cost) if self.cost is not None else None
+        offsets = neighbor_offsets(self.width, self.diagonal)
+        current = to_index(start, self.width)
+        path = [to_pos(current, self.width)]
+        # Each step moves to the neighbor the field says is on a shortest path
+        while dist[current] > 0:
+            best, best_cost = current, np.inf
+            for offset, step, dx, dy in offsets:
+                neighbor = current + offset
+                if dx and dy and (dist[current + dx] == np.inf or dist[current + dy * self.width] == np.inf):
+                    continue  # Same corner rule the field was built with
+                through = dist[neighbor] + (step * cost[neighbor] if cost is not None else step)
+                if through < best_cost:
+                    best, best_cost = neighbor, through
+            if best_cost > dist[current] + 1e-9 * max(1.0, dist[current]):
+                return []  # Field doesn't belong to this grid
+            current = best
+            path.append(to_pos(current, self.width))
+        return path
+
+def compute_distance_field(grid, goal, diagonal=False, cost_grid=None):
+    rows, cols = grid.shape
+    width = cols + 2
+    blocked, cost = pad_grid(grid, cost_grid)
+    distances = np.full(blocked.size, np.inf)
+    if in_bounds(goal, rows, cols) and not blocked[to_index(goal, width)]:
+        goal_idx = to_index(goal, width)
+        if diagonal or cost is not None:
+            dijkstra(blocked, cost, goal_idx, width, diagonal, distances)
+        else:
+            wavefront(blocked, goal_idx, width, distances)
+    return DistanceField(distances, (rows, cols), tuple(goal), diagonal, cost)
+
+def wavefront(blocked, goal_idx, width, distances):
+    # Vectorized breadth-first expansion, one whole ring of cells per step
+    visited = blocked.astype(bool)
+    visited[goal_idx] = True
+    distances[goal_idx] = 0
+    offsets = np.array([-1, 1, -width, width])
+    frontier = np.array([goal_idx])
+    step = 0
+    while frontier.size:
+        step += 1
+        candidates = (frontier[:, None] + offsets).ravel()
+        candidates = candidates[~visited[candidates]]
+        # Drop duplicates without sorting: of the cells written to the same slot,
+        # exactly one reads its own position back
+        order = np.arange(candidates.size, dtype=distances.dtype)
+        distances[candidates] = order
+        frontier = candidates[distances[candidates] == order]
+        visited[frontier] = True
+        distances[frontier] = step
+    return distances
+
+def dijkstra(blocked, cost, goal_idx, width, diagonal, distances):
+    # Grows outwards from the goal; moving c -> n costs step * cost[n]
+    dist = memoryview(distances)
+    blocked = memoryview(blocked)
+    cost_view = memoryview(cost) if cost is not None else None
+    offsets = neighbor_offsets(width, diagonal)
+    dist[goal_idx] = 0.0
+    open_set = [(0.0, goal_idx)]
+    push, pop = heapq.heappush, heapq.heappop
+
+    while open_set:
+        d, current = pop(open_set)
+        if d > dist[current]:
+            continue  # Stale heap entry
+        current_cost = cost_view[current] if cost_view is not None else 1.0
+        for offset, step, dx, dy in offsets:
+            neighbor = current + offset
+            if blocked[neighbor]:
+                continue
+            if dx and dy and (blocked[current + dx] or blocked[current + dy * width]):
+                continue  # Don't cut corners past obstacles
+            candidate = d + step * current_cost
+            if candidate < dist[neighbor]:
+                dist[neighbor] = candidate
+                push(open_set, (candidate, neighbor))
+    return distances
+
+def terrain_fingerprint(grid, cost_grid=None):
+    digest = hashlib.blake2b(digest_size=16)
+    grid = np.asarray(grid)
+    digest.update(str(grid.shape).encode())
+    digest.update(memoryview(np.ascontiguousarray(grid != 0)).cast('B'))
+    if cost_grid is not None:
+        digest.update(memoryview(np.ascontiguousarray(cost_grid, dtype=np.float64)).cast('B'))
+    return digest.hexdigest()
+
+class DistanceFieldCache:
+    # LRU of distance fields keyed by (terrain fingerprint, goal, diagonal)
+    def __init__(self, maxsize=8):
+        self.maxsize = maxsize
+        self.fields = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, grid, goal, diagonal=False, cost_grid=None, fingerprint=None):
+        if fingerprint is None:
+            fingerprint = terrain_fingerprint(grid, cost_grid)
+        key = (fingerprint, (int(goal[0]), int(goal[1])), diagonal)
+        field = self.fields.get(key)
+        if field is not None:
+            self.hits += 1
+            self.fields.move_to_end(key)
+            return field
+        self.misses += 1
+        field = compute_distance_field(grid, goal, diagonal, cost_grid)
+        self.fields[key] = field
+        if len(self.fields) > self.maxsize:
+            self.fields.popitem(last=False)
+        return field
+
+    def find_path(self, grid, start, goal, diagonal=False, cost_grid=None, fingerprint=None):
+        return self.get(grid, goal, diagonal, cost_grid, fingerprint).path_from(start)
+
+    def clear(self):
+        self.fields.clear()
+
+# Shared cache so every caller planning towards the same SOS goal reuses one field.
+# Callers that query it repeatedly should compute terrain_fingerprint once per terrain
+# version and pass it in; otherwise every query hashes the whole grid.
+field_cache = DistanceFieldCache()
+
+def find_path(grid, start, goal, diagonal=False, cost_grid=None, fingerprint=None):
+    return field_cache.find_path(grid, start, goal, diagonal, cost_grid, fingerprint)
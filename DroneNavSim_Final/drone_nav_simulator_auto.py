@@ -3,12 +3,23 @@ import pygame
 import numpy as np
 from pathfinding import astar
 from terrain_generator import generate_terrain
+from connectivity import ConnectivityIndex
+from grid_renderer import GridRenderer
+from instrumentation import metrics, start_export
 
 # Constants
 CELL_SIZE = 20
 GRID_WIDTH, GRID_HEIGHT = 30, 30
-WINDOW_WIDTH = CELL_SIZE * GRID_WIDTH + 200
-WINDOW_HEIGHT = CELL_SIZE * GRID_HEIGHT
+# Larger maps scroll inside a view of at most this size (arrow keys pan, +/- zoom)
+MAX_VIEW_SIZE = 800
+VIEW_WIDTH = min(CELL_SIZE * GRID_WIDTH, MAX_VIEW_SIZE)
+VIEW_HEIGHT = min(CELL_SIZE * GRID_HEIGHT, MAX_VIEW_SIZE)
+WINDOW_WIDTH = VIEW_WIDTH + 200
+WINDOW_HEIGHT = VIEW_HEIGHT
+SCROLL_STEP = VIEW_WIDTH // 4
+SEED = None  # Set to an int to replay the same map
+# Time spent repainting after each event (scrolls, zooms)
+REDRAW_SECONDS = metrics.histogram('redraw_seconds', view='auto')
 
 # Colors
 WHITE = (255, 255, 255)
@@ -24,38 +35,40 @@ screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
 pygame.display.set_caption("Autonomous DroneNavSim")
 
 # Terrain and positions
-terrain = generate_terrain(GRID_WIDTH, GRID_HEIGHT)
+rng = np.random.default_rng(SEED)
 start = (0, 0)
-obstacle_coords = np.argwhere(terrain == 1)
-for y, x in obstacle_coords:
-    terrain[y][x] = 1
-free_cells = list(zip(*np.where(terrain == 0)))
-goal = start
-while goal == start:
-    goal = tuple(free_cells[np.random.randint(len(free_cells))])
+goal = None
+while goal is None:
+    # Only reachable goals; regenerate if the start is boxed in
+    terrain = generate_terrain(GRID_WIDTH, GRID_HEIGHT, seed=rng)
+    terrain[start[1]][start[0]] = 0
+    connectivity = ConnectivityIndex(terrain)
+    goal = connectivity.random_reachable(start, rng)
 
-path = astar(terrain, start, goal)
+path = astar(terrain, start, goal, connectivity=connectivity)
 
-def draw_grid():
-    for y in range(GRID_HEIGHT):
-        for x in range(GRID_WIDTH):
-            rect = pygame.Rect(x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-            color = WHITE
-            if terrain[y][x] == 1:
-                color = BLACK
-            elif (x, y) == goal:
-                color = YELLOW
-            pygame.draw.rect(screen, color, rect)
-            pygame.draw.rect(screen, BLACK, rect, 1)
+# Outlined terrain rendered in one go, with the route on top
+renderer = GridRenderer(screen, terrain, CELL_SIZE, outline=BLACK, view_size=(VIEW_WIDTH, VIEW_HEIGHT))
+renderer.add_layer('path', GREEN)
+renderer.add_layer('goal', YELLOW, outlined=True, marker=True)
+renderer.add_layer('drone', BLUE, marker=True)
+renderer.set_cells('path', path)
+renderer.set_cells('goal', [goal])
+renderer.set_cells('drone', [start])
+renderer.center_on(start)
 
-    for pos in path:
-        if pos != start and pos != goal:
-            pygame.draw.rect(screen, GREEN, (pos[0]*CELL_SIZE, pos[1]*CELL_SIZE, CELL_SIZE, CELL_SIZE))
+SCROLL_KEYS = {
+    pygame.K_LEFT: (-SCROLL_STEP, 0),
+    pygame.K_RIGHT: (SCROLL_STEP, 0),
+    pygame.K_UP: (0, -SCROLL_STEP),
+    pygame.K_DOWN: (0, SCROLL_STEP),
+}
 
-    pygame.draw.rect(screen, BLUE, (start[0]*CELL_SIZE, start[1]*CELL_SIZE, CELL_SIZE, CELL_SIZE))
+def draw_grid():
+    renderer.draw()
 
 def draw_sidebar():
-    sidebar_x = GRID_WIDTH * CELL_SIZE
+    sidebar_x = VIEW_WIDTH
     pygame.draw.rect(screen, GRAY, (sidebar_x, 0, 200, WINDOW_HEIGHT))
 
     font = pygame.font.SysFont(None, 24)
@@ -75,12 +88,21 @@ def main():
     draw_grid()
     draw_sidebar()
     pygame.display.flip()
-    running = True
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
+    # The scene is static, so sleep until an event arrives instead of polling
+    while True:
+        event = pygame.event.wait()
+        if event.type == pygame.QUIT:
+            break
+        with REDRAW_SECONDS.time():
+            if event.type == pygame.KEYDOWN and event.key in SCROLL_KEYS:
+                renderer.scroll(*SCROLL_KEYS[event.key])
+            elif event.type == pygame.KEYDOWN and event.key in (pygame.K_EQUALS, pygame.K_PLUS, pygame.K_MINUS):
+                renderer.zoom_by(-1 if event.key == pygame.K_MINUS else 1)
+            elif event.type == pygame.MOUSEWHEEL:
+                renderer.zoom_by(event.y, pygame.mouse.get_pos())
+            pygame.display.update(renderer.flush())
     pygame.quit()
 
 if __name__ == "__main__":
+    start_export()
     main()
@@ -1,26 +1,59 @@
-from panda3d.core import DirectionalLight, AmbientLight, Vec3, CardMaker, TransparencyAttrib, GraphicsPipe
+from panda3d.core import DirectionalLight, AmbientLight, Vec3, TransparencyAttrib
 from direct.showbase.ShowBase import ShowBase
 from direct.task import Task
 from direct.gui.DirectGui import DirectFrame
+from concurrent.futures import ThreadPoolExecutor
+import math
+import time
 import numpy as np
-import heapq
-from random import randint
+from incremental_planner import DStarLite
+from distance_field import field_cache
+from terrain_generator import generate_terrain
+from connectivity import ConnectivityIndex
+from scenery import load_scenery_models
+from chunk_manager import ChunkManager
+from minimap import TerrainMinimap
+from instrumentation import metrics, start_export
 
 
 GRID_WIDTH = 50
 GRID_HEIGHT = 50
 CELL_SIZE = 2
+SEED = None  # Set to an int to replay the same mission
+# Chance per drone step that an obstacle turns up on the route ahead, as in mission.Mission;
+# press 'o' to drop one by hand
+OBSTACLE_RATE = 0.05
+# 'terrain' draws the minimap straight from the grid; 'render' films the scene from above
+# into a MINIMAP_RTT_SIZE buffer; None turns it off. Either way it refreshes every
+# MINIMAP_INTERVAL seconds, not every frame.
+MINIMAP_MODE = 'terrain'
+MINIMAP_INTERVAL = 0.25
+MINIMAP_RTT_SIZE = 256
+
+# Minimap colors, as in the 2D views
+BLUE = (0, 0, 255)
+GREEN = (0, 255, 0)
+RED = (255, 0, 0)
+
+# Frame and per-task times; tasks are timed as task_seconds{task=...}
+FRAME_SECONDS = metrics.histogram('frame_seconds', view='3d')
+DRONE_STEPS = metrics.counter('drone_steps_total', view='3d')
 
 
 class DroneSim3D(ShowBase):
     def __init__(self):
+        self.startup_began = time.perf_counter()
+        self.startup = {}  # Phase -> (seconds, note), printed once every phase is done
         super().__init__()
 
         self.disable_mouse()
         self.set_background_color(0.1, 0.1, 0.1)
+        self.rng = np.random.default_rng(SEED)
 
         # Generate terrain grid
+        began = time.perf_counter()
         self.terrain = self.generate_terrain(GRID_WIDTH, GRID_HEIGHT)
+        self.connectivity = ConnectivityIndex(self.terrain)
 
         # Place drone and SOS grid positions on cleared terrain
         self.place_drone_grid_pos()
@@ -28,27 +61,24 @@ class DroneSim3D(ShowBase):
 
         # Clear area around SOS so search area is open
         self.clear_area_around(self.terrain, self.sos_grid_pos, radius=2)
+        self.startup['terrain'] = (time.perf_counter() - began, "generation, connectivity, placement")
+        print(f"Drone start: {self.drone_grid_pos}, SOS goal: {self.sos_grid_pos}")
 
-        # Draw terrain ground
-        self.draw_terrain()
+        # Find path from drone to SOS on a worker thread; the drone waits for the first path
+        self.start_planning()
 
-        # Place 3D trees and rocks instead of billboard trees
-        self.place_3d_scenery()
+        # Ground and 3D trees and rocks, paged in around the drone as it flies. Models are
+        # read on Panda's loader thread and show up when they arrive.
+        self.models_began = time.perf_counter()
+        self.models_pending = 3  # Scenery, drone, SOS cube
+        self.setup_world()
 
-        # Place drone and SOS models after terrain and scenery drawn
+        # Place drone and SOS models
         self.place_drone()
         self.place_sos_cube()
 
         self.setup_lighting()
 
-        # Find path from drone to SOS
-        self.path = self.find_path()
-        print(f"Drone start: {self.drone_grid_pos}, SOS goal: {self.sos_grid_pos}")
-        print(f"Path length: {len(self.path)}")
-        if len(self.path) == 0:
-            print("Warning: No path found from drone to SOS!")
-
-        self.path_index = 0
         self.move_delay = 0.4
         self.last_move_time = 0
 
@@ -61,104 +91,104 @@ class DroneSim3D(ShowBase):
         self.task_mgr.add(self.update_camera, "CameraFollowTask")
         self.task_mgr.add(self.move_drone_task, "MoveDroneTask")
         self.task_mgr.add(self.flash_sos_task, "FlashSOSTask")
+        self.task_mgr.add(self.startup_report_task, "StartupReportTask")
+        self.task_mgr.add(self.frame_time_task, "FrameTimeTask")
+        self.accept('o', self.add_obstacle_ahead)
+        self.startup_blocking = time.perf_counter() - self.startup_began
 
     def generate_terrain(self, width, height):
-        grid = np.zeros((height, width), dtype=int)
-        num_obstacles = int(0.2 * width * height)
-        for _ in range(num_obstacles):
-            x = randint(0, width - 1)
-            y = randint(0, height - 1)
-            grid[y][x] = 1
-        return grid
+        return generate_terrain(width, height, obstacle_prob=0.2, seed=self.rng)
 
     def place_drone_grid_pos(self):
         while True:
-            x = randint(0, GRID_WIDTH - 1)
-            y = randint(0, GRID_HEIGHT - 1)
+            x = int(self.rng.integers(GRID_WIDTH))
+            y = int(self.rng.integers(GRID_HEIGHT))
             if self.terrain[y][x] == 0:
                 self.drone_grid_pos = (x, y)
                 break
 
     def place_sos_grid_pos(self):
-        while True:
-            x = randint(0, GRID_WIDTH - 1)
-            y = randint(0, GRID_HEIGHT - 1)
-            if self.terrain[y][x] == 0 and (x, y) != self.drone_grid_pos:
-                self.sos_grid_pos = (x, y)
-                break
+        # Only pick targets the drone can actually reach
+        self.sos_grid_pos = self.connectivity.random_reachable(self.drone_grid_pos, self.rng)
+        while self.sos_grid_pos is None:
+            # Drone landed in a boxed-in pocket; try another start
+            self.place_drone_grid_pos()
+            self.sos_grid_pos = self.connectivity.random_reachable(self.drone_grid_pos, self.rng)
 
     def clear_area_around(self, grid, center, radius=2):
         cx, cy = center
+        cleared = []
         for y in range(max(0, cy - radius), min(GRID_HEIGHT, cy + radius + 1)):
             for x in range(max(0, cx - radius), min(GRID_WIDTH, cx + radius + 1)):
                 grid[y][x] = 0  # Clear obstacles
+                cleared.append(((x, y), 0))
+        self.connectivity.update_cells(cleared)
+
+    def setup_world(self):
+        # Only the chunks around the drone exist: ground meshes with the texture tiled once
+        # per cell, and trees and rocks merged per chunk with distance LOD (models/tree.egg
+        # and rock.egg if present, simple built-in shapes otherwise). They're built on a
+        # worker thread, so startup doesn't grow with the map. Paging starts once the
+        # scenery models are in.
+        self.chunks = None
+        self.dirt_tex = self.loader.load_texture("models/envir-ground.jpg")
+        self.world_seed = int(self.rng.integers(2 ** 63))
+        load_scenery_models(self.loader, callback=self.start_world)
+
+    def start_world(self, models):
+        self.scenery_models = models
+        self.model_arrived()
+        self.scenery_began = time.perf_counter()
+        self.chunks = ChunkManager(self.render, self.terrain, CELL_SIZE, self.dirt_tex, models, seed=self.world_seed)
+        self.chunks.update(self.drone_grid_pos)
+        self.task_mgr.add(self.page_chunks_task, "PageChunksTask")
+
+    @metrics.timed('task_seconds', task='page_chunks')
+    def page_chunks_task(self, task):
+        self.chunks.poll()
+        if 'scenery' not in self.startup and not self.chunks.pending:
+            self.startup['scenery'] = (time.perf_counter() - self.scenery_began,
+                                       f"first {len(self.chunks.chunks)} chunks, worker thread")
+        return Task.cont
 
-    def draw_terrain(self):
-        dirt_tex = self.loader.load_texture("models/envir-ground.jpg")
-        for y in range(GRID_HEIGHT):
-            for x in range(GRID_WIDTH):
-                cm = CardMaker('ground_cell')
-                cm.set_frame(-CELL_SIZE / 2, CELL_SIZE / 2, -CELL_SIZE / 2, CELL_SIZE / 2)
-                card = self.render.attach_new_node(cm.generate())
-                card.set_pos(x * CELL_SIZE, y * CELL_SIZE, 0)
-                card.set_hpr(0, -90, 0)
-                card.set_texture(dirt_tex)
-
-    def place_3d_scenery(self):
-        # Load the simple custom models you saved as tree.egg and rock.egg
-        self.tree_model = self.loader.load_model("models/tree.egg")
-        self.rock_model = self.loader.load_model("models/rock.egg")
-
-        if not self.tree_model or not self.rock_model:
-            print("Error loading 3D scenery models.")
-            return
-
-        for y in range(GRID_HEIGHT):
-            for x in range(GRID_WIDTH):
-                if self.terrain[y][x] == 1:
-                    # 70% chance tree, 30% rock
-                    if randint(0, 100) < 70:
-                        model = self.tree_model.copy_to(self.render)
-                        # Scale tree taller, vary size slightly
-                        model.set_scale(1.0 + 0.5 * np.random.rand())
-                    else:
-                        model = self.rock_model.copy_to(self.render)
-                        # Smaller scale for rocks
-                        model.set_scale(0.5 + 0.3 * np.random.rand())
-
-                    model.set_pos(x * CELL_SIZE, y * CELL_SIZE, 0)
-                    model.set_h(randint(0, 360))
-
+    def model_loaded(self, model, parent, error):
+        # Loader callback: parents a model under the node standing in for it
+        if model is None:
+            print(error)
+        else:
+            model.reparent_to(parent)
+        self.model_arrived()
 
+    def model_arrived(self):
+        self.models_pending -= 1
+        if self.models_pending == 0:
+            self.startup['models'] = (time.perf_counter() - self.models_began, "loader thread")
 
     def place_drone(self):
-        self.drone = self.loader.load_model("models/quadplane")
-        if self.drone is None:
-            print("Error: Could not load drone model.")
-            return
-        self.drone.reparent_to(self.render)
+        # Empty node until the model arrives, so the camera and tasks can use it meanwhile
+        self.drone = self.render.attach_new_node("drone")
         self.drone.set_scale(2.0)
         self.drone.set_color(0.2, 0.2, 1, 1)
         self.prev_grid_pos = self.drone_grid_pos
         self.drone.set_pos(self.grid_to_world(*self.drone_grid_pos, z=0.8))  # low altitude
+        self.loader.load_model("models/quadplane", okMissing=True, callback=self.model_loaded,
+                               extraArgs=[self.drone, "Error: Could not load drone model."])
 
     def place_sos_cube(self):
-        self.sos_cube = self.loader.load_model("models/rgbCube")
-        if self.sos_cube is None:
-            print("Error: Could not load SOS cube model.")
-            return
+        self.sos_cube = self.render.attach_new_node("sos")
         self.sos_cube.set_color(1, 1, 1, 1)
         self.sos_cube.set_scale(0.7, 0.7, 0.5)
-        self.sos_cube.reparent_to(self.render)
         self.sos_cube.set_pos(self.grid_to_world(*self.sos_grid_pos, z=0.8))
+        self.loader.load_model("models/rgbCube", okMissing=True, callback=self.model_loaded,
+                               extraArgs=[self.sos_cube, "Error: Could not load SOS cube model."])
 
     def grid_to_world(self, x, y, z=0):
         return Vec3(x * CELL_SIZE, y * CELL_SIZE, z)
 
+    @metrics.timed('task_seconds', task='update_camera')
     def update_camera(self, task):
         drone_pos = self.drone.get_pos()
 
-        import math
         heading_rad = math.radians(self.drone_heading)
         forward = Vec3(math.sin(heading_rad), math.cos(heading_rad), 0)
 
@@ -176,78 +206,108 @@ class DroneSim3D(ShowBase):
 
         return Task.cont
 
+    @metrics.timed('task_seconds', task='move_drone')
     def move_drone_task(self, task):
-        if not self.path or self.path_index >= len(self.path):
-            return Task.cont
+        if self.drone_grid_pos == self.sos_grid_pos or self.planner is None:
+            return Task.cont  # Arrived, or the first path isn't in yet
 
         current_time = task.time
         if current_time - self.last_move_time >= self.move_delay:
-            next_pos = self.path[self.path_index]
+            if not self.connectivity.connected(self.drone_grid_pos, self.sos_grid_pos):
+                return Task.cont  # SOS currently cut off
+            next_pos = self.planner.next_step()
+            if next_pos is None:
+                return Task.cont  # SOS currently cut off
             self.prev_grid_pos = self.drone_grid_pos
 
             dx = next_pos[0] - self.drone_grid_pos[0]
             dy = next_pos[1] - self.drone_grid_pos[1]
 
-            import math
             if dx != 0 or dy != 0:
                 self.drone_heading = (math.degrees(math.atan2(dx, dy))) % 360
                 self.drone.set_h(self.drone_heading)
 
             self.drone_grid_pos = next_pos
             self.drone.set_pos(self.grid_to_world(*next_pos, z=0.8))
-            self.path_index += 1
+            if self.chunks is not None:
+                self.chunks.update(next_pos)
+            if self.minimap is not None:
+                self.minimap.set_cells('drone', [next_pos])
+            self.planner.move_to(next_pos)
             self.last_move_time = current_time
-            print(f"Drone moved to: {self.drone_grid_pos} Heading: {self.drone_heading}")
+            DRONE_STEPS.inc()
+            if self.rng.random() < OBSTACLE_RATE:
+                self.add_obstacle_ahead()
 
         return Task.cont
 
-    def find_path(self):
-        start = self.drone_grid_pos
-        goal = self.sos_grid_pos
-        open_set = [(0, start)]
-        came_from = {}
-        g_score = {start: 0}
-        f_score = {start: self.heuristic(start, goal)}
-
-        while open_set:
-            _, current = heapq.heappop(open_set)
-
-            if current == goal:
-                return self.reconstruct_path(came_from, current)
-
-            for neighbor in self.get_neighbors(current):
-                tentative_g = g_score[current] + 1
-                if neighbor not in g_score or tentative_g < g_score[neighbor]:
-                    came_from[neighbor] = current
-                    g_score[neighbor] = tentative_g
-                    f_score[neighbor] = tentative_g + self.heuristic(neighbor, goal)
-                    heapq.heappush(open_set, (f_score[neighbor], neighbor))
-
-        return []
-
-    def get_neighbors(self, pos):
-        x, y = pos
-        neighbors = []
-        for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-            nx, ny = x + dx, y + dy
-            if 0 <= nx < GRID_WIDTH and 0 <= ny < GRID_HEIGHT:
-                if self.terrain[ny][nx] == 0:
-                    neighbors.append((nx, ny))
-        return neighbors
-
-    def heuristic(self, a, b):
-        return abs(a[0] - b[0]) + abs(a[1] - b[1])
-
-    def reconstruct_path(self, came_from, current):
-        path = [current]
-        while current in came_from:
-            current = came_from[current]
-            path.append(current)
-        path.reverse()
-        return path
+    def start_planning(self):
+        # The first search can take seconds on big maps, so it runs on a worker thread with
+        # its own copy of the grid and plan_task installs the result
+        self.planner = None
+        self.path = []
+        self.planner_changes = []  # Cells reported while the first search runs
+        connected = self.connectivity.connected(self.drone_grid_pos, self.sos_grid_pos)
+        self.planning_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='planner')
+        self.planning = self.planning_executor.submit(self.find_path, np.array(self.terrain), self.drone_grid_pos,
+                                                      self.sos_grid_pos, connected)
+        self.task_mgr.add(self.plan_task, "PlanTask")
+
+    def find_path(self, grid, start, goal, connected):
+        # D* Lite keeps its search between steps so move_drone_task can replan cheaply.
+        # It starts from the goal's cached distance field instead of searching.
+        began = time.perf_counter()
+        planner = DStarLite(grid, start, goal, field_cache.get(grid, goal).distances)
+        # Walled off; don't let the search exhaust the drone's component
+        path = planner.path() if connected else []
+        return planner, path, time.perf_counter() - began
+
+    def plan_task(self, task):
+        if not self.planning.done():
+            return Task.cont
+        self.planner, self.path, seconds = self.planning.result()
+        self.planning_executor.shutdown(wait=False)
+        self.startup['planning'] = (seconds, "distance field for D* Lite, worker thread")
+        if self.planner_changes:
+            self.update_planner(self.planner_changes)
+        print(f"Path length: {len(self.path)}")
+        if len(self.path) == 0:
+            print("Warning: No path found from drone to SOS!")
+        if self.minimap is not None:
+            self.minimap.set_cells('path', self.path)
+        return Task.done
+
+    def add_obstacle_ahead(self):
+        # Simulate an obstacle the drone spots on its route, short of the SOS itself
+        if self.planner is None:
+            return
+        ahead = self.planner.path()[2:-1]
+        if ahead:
+            self.report_obstacle(ahead[self.rng.integers(len(ahead))])
+
+    def report_obstacle(self, pos, blocked=True):
+        # Newly discovered obstacle (or cleared cell); the planner repairs the route on the next step
+        change = [(pos, 1 if blocked else 0)]
+        self.connectivity.update_cells(change)  # Writes self.terrain as well
+        if self.chunks is not None:
+            self.chunks.invalidate([pos])
+        if self.minimap is not None:
+            self.minimap.update_terrain([pos])
+        if self.planner is None:
+            self.planner_changes.extend(change)  # Replayed once the first search is in
+            return
+        self.update_planner(change)
+        if self.minimap is not None:
+            self.minimap.set_cells('path', self.path)
+
+    def update_planner(self, changes):
+        self.planner.update_cells(changes)
+        if self.connectivity.connected(self.drone_grid_pos, self.sos_grid_pos):
+            self.path = self.planner.path()
+        else:
+            self.path = []
 
     def flash_sos_task(self, task):
-        import math
         period = 1.0
         phase = task.time % period
         intensity = (math.sin(phase * 2 * math.pi) + 1) / 2
@@ -260,6 +320,21 @@ class DroneSim3D(ShowBase):
 
         return Task.cont
 
+    def frame_time_task(self, task):
+        FRAME_SECONDS.observe(self.clock.get_dt())
+        return Task.cont
+
+    def startup_report_task(self, task):
+        # Where startup time went, printed once terrain, models, scenery and planning are done
+        if len(self.startup) < 4:
+            return Task.cont
+        print(f"Startup: window up after {self.startup_blocking:.2f} s, "
+              f"everything ready after {time.perf_counter() - self.startup_began:.2f} s")
+        for phase in ('terrain', 'models', 'scenery', 'planning'):
+            seconds, note = self.startup[phase]
+            print(f"  {phase:<9} {seconds * 1000:8.1f} ms  ({note})")
+        return Task.done
+
     def setup_lighting(self):
         dlight = DirectionalLight("dlight")
         dlight.set_color((0.9, 0.9, 0.8, 1))
@@ -273,20 +348,46 @@ class DroneSim3D(ShowBase):
         self.render.set_light(alnp)
 
     def setup_minimap(self):
+        self.minimap = None
+        if MINIMAP_MODE == 'terrain':
+            self.setup_terrain_minimap()
+        elif MINIMAP_MODE == 'render':
+            self.setup_render_minimap()
+
+    def setup_terrain_minimap(self):
+        # Texture built from self.terrain with path, SOS and drone markers; moves only
+        # rewrite the texels they change
+        self.minimap = TerrainMinimap(self.terrain)
+        self.minimap.add_layer('path', GREEN)
+        self.minimap.add_layer('sos', RED, marker=True)
+        self.minimap.add_layer('drone', BLUE, marker=True)
+        self.minimap.set_cells('path', self.path)
+        self.minimap.set_cells('sos', [self.sos_grid_pos])
+        self.minimap.set_cells('drone', [self.drone_grid_pos])
+        self.minimap.refresh()
+
+        # Right side of the screen, shaped like the map
+        longest = max(self.minimap.tw, self.minimap.th)
+        half_w, half_h = 0.2 * self.minimap.tw / longest, 0.2 * self.minimap.th / longest
+        self.minimap_frame = DirectFrame(frameColor=(1, 1, 1, 1), frameTexture=self.minimap.texture,
+                                         frameSize=(-half_w, half_w, -half_h, half_h),
+                                         pos=(1 - 0.22, 0, 0.8))
+        self.task_mgr.do_method_later(MINIMAP_INTERVAL, self.refresh_minimap_task, "RefreshMinimap")
+
+    @metrics.timed('task_seconds', task='refresh_minimap')
+    def refresh_minimap_task(self, task):
+        self.minimap.refresh()
+        return Task.again
+
+    def setup_render_minimap(self):
         # Create a frame on the right side of the screen for the minimap
-        self.minimap_frame = DirectFrame(frameColor=(0, 0, 0, 0.5),
+        self.minimap_frame = DirectFrame(frameColor=(1, 1, 1, 1),
                                         frameSize=(-0.2, 0.2, -0.2, 0.2),
                                         pos=(1 - 0.22, 0, 0.8))
 
-        # Create an offscreen buffer for the minimap render
-        win_props = self.win.get_properties()
-        buffer_props = self.win.get_fb_properties()
-
-        self.minimap_buffer = self.graphicsEngine.make_output(
-            self.pipe, "minimap buffer", -2,
-            buffer_props, win_props,
-            GraphicsPipe.BF_refuse_window,
-            self.win.get_gsg(), self.win)
+        # A small offscreen buffer, rendered once per refresh instead of every frame
+        self.minimap_buffer = self.win.make_texture_buffer("minimap buffer", MINIMAP_RTT_SIZE, MINIMAP_RTT_SIZE)
+        self.minimap_buffer.set_one_shot(True)
 
         # Create a new camera for the minimap
         self.minimap_cam = self.make_camera(self.minimap_buffer)
@@ -297,20 +398,21 @@ class DroneSim3D(ShowBase):
         self.minimap_cam.set_hpr(0, -90, 0)
 
         # Attach the buffer texture to the frame
-        tex = self.minimap_buffer.get_texture()
-        self.minimap_frame.set_texture(tex)
+        self.minimap_frame['frameTexture'] = self.minimap_buffer.get_texture()
 
-        # Update minimap camera each frame
-        self.task_mgr.add(self.update_minimap_camera, "UpdateMinimapCam")
+        self.task_mgr.do_method_later(MINIMAP_INTERVAL, self.update_minimap_camera, "UpdateMinimapCam")
 
+    @metrics.timed('task_seconds', task='update_minimap_camera')
     def update_minimap_camera(self, task):
-        # Follow drone position on X,Y, keep altitude fixed
+        # Follow drone position on X,Y, keep altitude fixed, and render one frame
         drone_pos = self.drone.get_pos()
         self.minimap_cam.set_pos(drone_pos.x, drone_pos.y, 50)
         self.minimap_cam.set_hpr(0, -90, 0)
-        return Task.cont
+        self.minimap_buffer.set_one_shot(True)
+        return Task.again
 
 
 if __name__ == "__main__":
+    start_export()
     app = DroneSim3D()
     app.run()
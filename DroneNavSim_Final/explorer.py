@@ -0,0 +1,152 @@
+import numpy as np
+from pathfinding import pad_grid, to_index, to_pos
+
+SENSOR_RADIUS = 4  # Cells the downward camera sees around the drone
+
+def footprint(radius):
+    # Disk of cells within radius of the center, as a (2r + 1, 2r + 1) mask
+    r = np.arange(-radius, radius + 1)
+    return r[:, None] ** 2 + r[None, :] ** 2 <= radius * radius
+
+class CoverageExplorer:
+    # Sweeps a map for something at an unknown position. sensed marks every cell the
+    # camera has seen; frontier marks seen free cells next to unseen free ones. A step
+    # only recomputes both in the window around the new footprint, so it costs the same
+    # on any map size. The next target is the frontier cell cheapest to reach: a
+    # breadth-first search from the drone that stops at the first ring touching the
+    # frontier, so it only covers the area up to the nearest unexplored edge.
+    def __init__(self, terrain, start, radius=SENSOR_RADIUS):
+        # Frontier targets are seen cells next to unseen ones; the footprint must reach
+        # those neighbours, or arriving at a target reveals nothing
+        if radius < 1:
+            raise ValueError(f"Sensor radius must be at least 1, got {radius}")
+        self.terrain = terrain
+        self.rows, self.cols = np.shape(terrain)
+        self.width = self.cols + 2
+        self.radius = radius
+        self.mask = footprint(radius)
+        # All grids are padded like pathfinding.pad_grid so flat indices line up; the
+        # border counts as seen and blocked
+        self.blocked = pad_grid(terrain)[0].astype(bool)
+        self.free = ~self.blocked.reshape(self.rows + 2, self.width)
+        self.sensed = np.ones_like(self.free)
+        self.sensed[1:-1, 1:-1] = False
+        self.frontier = np.zeros_like(self.free)
+        self.frontier_count = 0
+        self.seen_count = 0
+        self.distances = np.full(self.blocked.size, -1, dtype=np.int64)  # Search scratch, kept at -1
+        self.offsets = np.array([-1, 1, -self.width, self.width])
+        self.pos = tuple(start)
+        self.route = []      # Cells still to fly to reach target
+        self.target = None
+        self.searches = 0
+        self.expanded = 0
+        self.sense(self.pos)
+
+    def seen(self, pos):
+        return bool(self.sensed[pos[1] + 1, pos[0] + 1])
+
+    def sense(self, pos):
+        # Marks the footprint around pos as seen; returns the newly seen cells as (xs, ys)
+        x, y = pos
+        r = self.radius
+        x0, y0 = max(x - r, 0), max(y - r, 0)
+        x1, y1 = min(x + r + 1, self.cols), min(y + r + 1, self.rows)
+        mask = self.mask[y0 - y + r:y1 - y + r, x0 - x + r:x1 - x + r]
+        window = self.sensed[y0 + 1:y1 + 1, x0 + 1:x1 + 1]
+        new = mask & ~window
+        window |= mask
+        self.seen_count += int(new.sum())
+        self.update_frontier(x0 - 1, y0 - 1, x1 + 1, y1 + 1)
+        ys, xs = np.nonzero(new)
+        return xs + x0, ys + y0
+
+    def update_frontier(self, x0, y0, x1, y1):
+        # Recomputes the frontier over cells [x0, x1) x [y0, y1), clipped to the map
+        x0, y0 = max(x0, 0) + 1, max(y0, 0) + 1
+        x1, y1 = min(x1, self.cols) + 1, min(y1, self.rows) + 1
+        unseen = self.free[y0 - 1:y1 + 1, x0 - 1:x1 + 1] & ~self.sensed[y0 - 1:y1 + 1, x0 - 1:x1 + 1]
+        touches = unseen[:-2, 1:-1] | unseen[2:, 1:-1] | unseen[1:-1, :-2] | unseen[1:-1, 2:]
+        inner = self.frontier[y0:y1, x0:x1]
+        new = self.free[y0:y1, x0:x1] & self.sensed[y0:y1, x0:x1] & touches
+        self.frontier_count += int(new.sum()) - int(inner.sum())
+        inner[...] = new
+
+    def plan(self):
+        # Route to the nearest reachable frontier cell, not counting the current cell;
+        # [] once every cell the drone can reach has been seen
+        self.searches += 1
+        frontier = self.frontier.ravel()
+        dist = self.distances
+        ring = np.array([to_index(self.pos, self.width)])
+        dist[ring] = 0
+        rings = [ring]
+        hits = ring[:0]
+        step = 0
+        while ring.size and not hits.size and self.frontier_count:
+            step += 1
+            candidates = (ring[:, None] + self.offsets).ravel()
+            ring = np.unique(candidates[(dist[candidates] < 0) & ~self.blocked[candidates]])
+            dist[ring] = step
+            rings.append(ring)
+            hits = ring[frontier[ring]]
+        route = []
+        if hits.size:
+            # Walk back down the distances from the target to the drone
+            current = int(hits[0])
+            while dist[current] > 0:
+                route.append(to_pos(current, self.width))
+                current = next(n for n in current + self.offsets if dist[n] == dist[current] - 1)
+            route.reverse()
+        searched = np.concatenate(rings)
+        self.expanded += searched.size
+        dist[searched] = -1
+        self.target = route[-1] if route else None
+        return route
+
+    def step(self):
+        # Flies one cell towards the current target, sensing on arrival, and picks a new
+        # target whenever the old one has been seen around. Returns the newly seen cells,
+        # or None once there is nothing reachable left to see.
+        if self.target is None or not self.frontier[self.target[1] + 1, self.target[0] + 1] or not self.route:
+            self.route = self.plan()
+            if not self.route:
+                return None
+        self.pos = self.route.pop(0)
+        return self.sense(self.pos)
+
+    def coverage(self):
+        # Share of the free cells seen so far
+        free = self.free[1:-1, 1:-1]
+        return float((free & self.sensed[1:-1, 1:-1]).sum() / max(free.sum(), 1))
+
+def rescan_frontier(sensed, free):
+    # Whole-map frontier the way it would be recomputed without incremental updates
+    unseen = free & ~sensed
+    touches = unseen[:-2, 1:-1] | unseen[2:, 1:-1] | unseen[1:-1, :-2] | unseen[1:-1, 2:]
+    return free[1:-1, 1:-1] & sensed[1:-1, 1:-1] & touches
+
+if __name__ == "__main__":
+    import time
+    from distance_field import compute_distance_field
+    from terrain_generator import generate_terrain
+
+    # Per-step cost on growing maps, against rescanning the frontier and rebuilding a
+    # full distance field from the drone on every step
+    for size, steps in ((64, None), (512, 2000), (2048, 2000)):
+        terrain = generate_terrain(size, size, obstacle_prob=0.2, seed=np.random.default_rng(0))
+        terrain[0][0] = 0
+        explorer = CoverageExplorer(terrain, (0, 0))
+        began = time.perf_counter()
+        moves = 0
+        while (steps is None or moves < steps) and explorer.step() is not None:
+            moves += 1
+        per_step = (time.perf_counter() - began) / max(moves, 1)
+        began = time.perf_counter()
+        for _ in range(20):
+            rescan_frontier(explorer.sensed, explorer.free)
+            compute_distance_field(terrain, explorer.pos)
+        rescan = (time.perf_counter() - began) / 20
+        print(f"{size}x{size}: {moves} steps, {explorer.coverage() * 100:.1f}% covered, "
+              f"{explorer.searches} target searches, {per_step * 1e6:.0f} us/step "
+              f"(full rescan {rescan * 1e3:.1f} ms/step)")
@@ -0,0 +1,173 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+
+# Decode flags per downscale factor; JPEG decodes at 1/2, 1/4 or 1/8 straight from the
+# DCT coefficients, other formats are decoded and then shrunk
+REDUCED_FLAGS = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+# Same weights cv2 uses for BGR -> gray, so stacks and videos match IMREAD_GRAYSCALE
+GRAY_WEIGHTS = np.array([0.114, 0.587, 0.299])
+STACK_CHUNK = 64  # Frames of a memory-mapped stack reduced per step
+MAX_WORKERS = min(8, os.cpu_count() or 1)
+
+class BrightnessCache:
+    # Mean brightness per image file, keyed by path, mtime and size so a rewritten or
+    # replaced frame is decoded again while unchanged ones never are
+    def __init__(self, maxsize=65536):
+        self.maxsize = maxsize
+        self.values = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, path, reduce=1):
+        stat = os.stat(path)
+        return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, reduce)
+
+    def get(self, key):
+        with self.lock:
+            value = self.values.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.values.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.values[key] = value
+            if len(self.values) > self.maxsize:
+                self.values.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.values.clear()
+
+brightness_cache = BrightnessCache()
+executor = None
+executor_lock = threading.Lock()
+
+def shared_executor():
+    # One decode pool per process, created on first use
+    global executor
+    with executor_lock:
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='frame-ingest')
+    return executor
+
+def image_brightness(path, reduce=1):
+    # Mean gray level of one image file, or None if it can't be read
+    img = cv2.imread(path, REDUCED_FLAGS[reduce])
+    return None if img is None else float(np.mean(img))
+
+def folder_brightness(folder, num_frames=60, reduce=1, workers=MAX_WORKERS, cache=True):
+    # Brightness of frame_000.png, frame_001.png, ... in order, skipping missing frames.
+    # Cached values are looked up first; only the misses are decoded, in parallel (cv2
+    # releases the GIL while decoding)
+    paths = [os.path.join(folder, f'frame_{i:03}.png') for i in range(num_frames)]
+    values = [None] * num_frames
+    keys = [None] * num_frames
+    todo = []
+    for i, path in enumerate(paths):
+        try:
+            keys[i] = brightness_cache.key(path, reduce) if cache else None
+        except FileNotFoundError:
+            continue
+        if cache:
+            values[i] = brightness_cache.get(keys[i])
+        if values[i] is None and (cache or os.path.exists(path)):
+            todo.append(i)
+
+    decode = lambda i: image_brightness(paths[i], reduce)
+    if workers > 1 and len(todo) > 1:
+        decoded = shared_executor().map(decode, todo)
+    else:
+        decoded = map(decode, todo)
+    for i, value in zip(todo, decoded):
+        values[i] = value
+        if cache and value is not None:
+            brightness_cache.put(keys[i], value)
+    return [value for value in values if value is not None]
+
+def video_brightness(path, max_frames=None, reduce=1):
+    # Per-frame brightness of a video file, decoded sequentially
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Cannot open video '{path}'")
+    values = []
+    try:
+        while max_frames is None or len(values) < max_frames:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            if reduce > 1:
+                frame = frame[::reduce, ::reduce]
+            values.append(frame_brightness(frame))
+    finally:
+        capture.release()
+    return values
+
+def frame_brightness(frame):
+    # Gray-level mean of a grayscale or BGR frame without converting it first
+    if frame.ndim == 2:
+        return float(cv2.mean(frame)[0])
+    return float(np.dot(cv2.mean(frame)[:3], GRAY_WEIGHTS))
+
+def stack_brightness(path, shape=None, dtype=np.uint8, chunk=STACK_CHUNK, max_frames=None, reduce=1):
+    # Per-frame brightness of a (T, H, W) or (T, H, W, 3) BGR frame stack stored as .npy,
+    # or as raw bytes with the given shape/dtype. The file is memory-mapped and reduced a
+    # chunk at a time, so stacks larger than RAM are fine; frames past max_frames are
+    # never read. reduce > 1 samples every reduce-th pixel, as video_brightness does.
+    if path.endswith('.npy'):
+        frames = np.load(path, mmap_mode='r')
+    else:
+        if shape is None:
+            raise ValueError("Raw frame stacks need an explicit shape")
+        frames = np.memmap(path, dtype=dtype, mode='r', shape=shape)
+    frames = frames[:max_frames, ::reduce, ::reduce]
+    values = np.empty(len(frames))
+    for i in range(0, len(frames), chunk):
+        block = frames[i:i + chunk]
+        if block.ndim == 4:
+            values[i:i + chunk] = block.mean(axis=(1, 2), dtype=np.float64) @ GRAY_WEIGHTS
+        else:
+            values[i:i + chunk] = block.reshape(len(block), -1).mean(axis=1, dtype=np.float64)
+    return values.tolist()
+
+def write_frame_stack(folder, path, num_frames=60):
+    # Packs frame_000.png ... into one .npy stack, read the way the ROI detector reads them
+    from roi_detector import load_frames  # Imported here: it imports this module via sos_detector
+    frames = load_frames(folder, num_frames)
+    np.save(path, frames)
+    return len(frames)
+
+def load_brightness(source, num_frames=60, reduce=1, **kwargs):
+    # Brightness sequence from a frame folder, a video file or a .npy/raw frame stack
+    if os.path.isdir(source):
+        return folder_brightness(source, num_frames, reduce, **kwargs)
+    if source.lower().endswith(VIDEO_EXTENSIONS):
+        return video_brightness(source, num_frames, reduce)
+    return stack_brightness(source, max_frames=num_frames, reduce=reduce, **kwargs)
+
+if __name__ == "__main__":
+    import time
+    folder = 'assets/sos_sequence'
+    for label, run in [
+        ("cold, full resolution", lambda: folder_brightness(folder, cache=False)),
+        ("cold, 1/4 resolution", lambda: folder_brightness(folder, reduce=4, cache=False)),
+        ("warm cache", lambda: folder_brightness(folder)),
+    ]:
+        folder_brightness(folder)  # Warm the cache (and the OS page cache)
+        began = time.perf_counter()
+        values = run()
+        print(f"{label:<24} {len(values)} frames in {(time.perf_counter() - began) * 1000:.2f} ms")
@@ -0,0 +1,371 @@
+from collections import OrderedDict
+import numpy as np
+import pygame
+
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+GRAY = (160, 160, 160)
+
+TILE_PIXELS = 256      # Target edge of a cached tile, in screen pixels
+TILE_CACHE_SIZE = 128  # Rendered tiles kept (at most ~256 KB each)
+MIN_DETAIL_PITCH = 5   # Gaps and outlines are only drawn at this many pixels per cell or more
+MARKER_SIZE = 6        # Marker layers (drone, goal) never shrink below this many pixels
+MAX_ZOOM_OUT = 32      # Deepest zoom-out, in cells per pixel
+BULK_CELLS = 256       # Layer changes larger than this rebuild the index in one vectorized pass
+
+class TileCache:
+    # Rendered tile surfaces keyed by (zoom, tx, ty), least recently used evicted first
+    def __init__(self, maxsize=TILE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.tiles = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        tile = self.tiles.get(key)
+        if tile is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.tiles.move_to_end(key)
+        return tile
+
+    def peek(self, key):
+        # Lookup that doesn't count or refresh, for patching cached tiles in place
+        return self.tiles.get(key)
+
+    def put(self, key, tile):
+        self.tiles[key] = tile
+        if len(self.tiles) > self.maxsize:
+            self.tiles.popitem(last=False)
+
+    def clear(self):
+        self.tiles.clear()
+
+def zoom_levels(pitch):
+    # Pixels per cell from 2x the base pitch down to 1 / MAX_ZOOM_OUT; fractional levels are
+    # powers of two so every zoomed-out pixel covers a whole block of cells
+    levels = {pitch * 2, pitch}
+    while pitch > 1:
+        pitch //= 2
+        levels.add(pitch)
+    f = 2
+    while f <= MAX_ZOOM_OUT:
+        levels.add(1 / f)
+        f *= 2
+    return sorted(levels)
+
+def block_mean(colors):
+    # 2x2 mean of an (H, W, 3) color array; odd edges average the cells that exist
+    h, w = colors.shape[:2]
+    colors = np.pad(colors, ((0, h % 2), (0, w % 2), (0, 0)), mode='edge')
+    total = colors[0::2, 0::2].astype(np.uint16)
+    total += colors[1::2, 0::2]
+    total += colors[0::2, 1::2]
+    total += colors[1::2, 1::2]
+    return (total // 4).astype(np.uint8)
+
+class GridRenderer:
+    # Draws a terrain grid through a scrolling, zoomable viewport. Terrain and dynamic
+    # layers (trail, goal, drone, ...) are kept as one palette index per cell; the view
+    # is assembled from cached tiles, so a frame costs a few blits however big the map
+    # is. Layers are drawn in the order they were added; changing one repaints only the
+    # cells that changed, and flush() hands back just those rectangles for
+    # pygame.display.update instead of a full-window flip. By default the viewport is
+    # the whole map at the given cell size.
+    def __init__(self, surface, terrain, cell_size, gap=0, origin=(0, 0), free_color=WHITE,
+                 blocked_color=BLACK, gap_color=GRAY, outline=None, view_size=None):
+        self.surface = surface
+        self.base_pitch = cell_size + gap
+        self.base_gap = gap
+        self.origin = origin
+        self.view_size = view_size
+        self.gap_color = gap_color
+        self.outline = outline  # Color of a 1-pixel border around every terrain cell
+        self.palette = np.array([free_color, blocked_color], dtype=np.uint8)
+        self.outlined = np.array([True, True])
+        self.layers = {}  # name -> [palette index, set of (x, y) cells, marker]
+        self.zooms = zoom_levels(self.base_pitch)
+        self.tiles = TileCache()
+        self.dirty = []
+        self.set_terrain(terrain)
+
+    def set_terrain(self, terrain):
+        # New map: empties every layer, drops cached tiles and resets the view
+        self.terrain = terrain
+        for layer in self.layers.values():
+            layer[1] = set()
+        self.rebuild()
+        size = self.view_size or (self.width * self.base_pitch, self.height * self.base_pitch)
+        self.view = pygame.Rect(self.origin, size)
+        self.offset = (0, 0)
+        self.scale = None
+        self.set_zoom(self.zooms.index(self.base_pitch), redraw=False)
+
+    def rebuild(self):
+        # Index, mean colors and tiles from scratch: terrain, then every layer in order
+        self.index = (np.asarray(self.terrain) != 0).astype(np.uint8)
+        self.height, self.width = self.index.shape
+        for index, cells, _ in self.layers.values():
+            if cells:
+                xs, ys = np.array(list(cells)).T
+                self.index[ys, xs] = index
+        self.build_pyramid()
+        self.tiles.clear()
+
+    def build_pyramid(self):
+        # pyramid[k]: mean colors of 2^k x 2^k cell blocks, k >= 1, for zoomed-out tiles.
+        # Level 1 is built a band of rows at a time to bound the temporary color array.
+        self.pyramid = [None]
+        level = np.empty(((self.height + 1) // 2, (self.width + 1) // 2, 3), dtype=np.uint8)
+        for y in range(0, self.height, 512):
+            level[y // 2:(y + 512) // 2] = block_mean(self.palette[self.index[y:y + 512]])
+        self.pyramid.append(level)
+        while 2 ** len(self.pyramid) <= MAX_ZOOM_OUT:
+            self.pyramid.append(block_mean(self.pyramid[-1]))
+
+    def add_layer(self, name, color, outlined=False, marker=False):
+        # outlined layers keep the terrain outline around their cells; marker layers are
+        # drawn at least MARKER_SIZE pixels wide so they stay visible when zoomed out
+        self.palette = np.vstack([self.palette, np.array(color, dtype=np.uint8)])
+        self.outlined = np.append(self.outlined, outlined)
+        self.layers[name] = [len(self.palette) - 1, set(), marker]
+
+    # --- View ---
+
+    def set_zoom(self, level, focus=None, redraw=True):
+        # Zooms to self.zooms[level], keeping the cell under `focus` (a screen point,
+        # default the view center) in place
+        focus = focus or self.view.center
+        level = min(max(level, 0), len(self.zooms) - 1)
+        rescaled = self.zooms[level] != self.scale
+        if self.scale is not None:
+            fx = (self.offset[0] + focus[0] - self.view.x) / self.scale
+            fy = (self.offset[1] + focus[1] - self.view.y) / self.scale
+        else:
+            fx, fy = self.width / 2, self.height / 2
+        self.zoom = level
+        self.scale = self.zooms[level]
+        self.gap = self.base_gap if self.scale >= MIN_DETAIL_PITCH else 0
+        if self.scale >= 1:
+            self.tile_cells = max(1, TILE_PIXELS // self.scale)
+            self.tile_pixels = self.tile_cells * self.scale
+        else:
+            self.tile_cells = int(TILE_PIXELS / self.scale)
+            self.tile_pixels = TILE_PIXELS
+        # A new level needs a redraw even when the clamped offset stays put (at the top-left
+        # corner, or with the map centered because it is smaller than the view)
+        moved = self.set_offset(fx * self.scale - (focus[0] - self.view.x),
+                                fy * self.scale - (focus[1] - self.view.y), redraw=False)
+        if redraw and (rescaled or moved):
+            self.draw()
+        return rescaled or moved
+
+    def zoom_by(self, steps, focus=None):
+        return self.set_zoom(self.zoom + steps, focus)
+
+    def map_pixels(self):
+        return int(np.ceil(self.width * self.scale)), int(np.ceil(self.height * self.scale))
+
+    def set_offset(self, x, y, redraw=True):
+        # Top-left of the view in map pixels, clamped to the map; a map smaller than the
+        # view is centered in it
+        offset = []
+        for value, view, size in zip((x, y), self.view.size, self.map_pixels()):
+            if size <= view:
+                offset.append(-((view - size) // 2))
+            else:
+                offset.append(int(min(max(round(value), 0), size - view)))
+        offset = tuple(offset)
+        changed = offset != self.offset
+        self.offset = offset
+        if redraw and changed:
+            self.draw()
+        return changed
+
+    def scroll(self, dx, dy):
+        return self.set_offset(self.offset[0] + dx, self.offset[1] + dy)
+
+    def follow(self, pos, margin=0.2):
+        # Scrolls just enough to keep `pos` out of the outer `margin` of the view, so
+        # the view doesn't shift on every step
+        targets = []
+        for cell, offset, view in zip(pos, self.offset, self.view.size):
+            center = (cell + 0.5) * self.scale
+            low, high = offset + margin * view, offset + (1 - margin) * view
+            targets.append(offset + min(center - low, 0) + max(center - high, 0))
+        return self.set_offset(*targets)
+
+    def center_on(self, pos):
+        return self.set_offset((pos[0] + 0.5) * self.scale - self.view.w / 2,
+                               (pos[1] + 0.5) * self.scale - self.view.h / 2)
+
+    def cell_rect(self, pos):
+        # Screen rectangle of a cell (one pixel when zoomed out past 1 pixel per cell)
+        x, y = pos
+        if self.scale >= 1:
+            size = self.scale - self.gap
+            return pygame.Rect(self.view.x + x * self.scale - self.offset[0],
+                               self.view.y + y * self.scale - self.offset[1], size, size)
+        f = int(1 / self.scale)
+        return pygame.Rect(self.view.x + x // f - self.offset[0], self.view.y + y // f - self.offset[1], 1, 1)
+
+    def marker_rect(self, pos):
+        rect = self.cell_rect(pos)
+        if rect.w >= MARKER_SIZE:
+            return rect
+        return pygame.Rect(0, 0, MARKER_SIZE, MARKER_SIZE).move(rect.centerx - MARKER_SIZE // 2,
+                                                                 rect.centery - MARKER_SIZE // 2)
+
+    # --- Tiles ---
+
+    def cell_pixels(self, index, pitch, gap):
+        # (H * pitch, W * pitch, 3) pixels for a block of palette indices
+        h, w = index.shape
+        size = pitch - gap
+        pixels = self.palette[index].repeat(pitch, axis=0).repeat(pitch, axis=1)
+        cells = pixels.reshape(h, pitch, w, pitch, 3)
+        if gap:
+            cells[:, size:] = self.gap_color
+            cells[:, :, :, size:] = self.gap_color
+        if self.outline is not None and pitch >= MIN_DETAIL_PITCH:
+            outlined = self.outlined[index]
+            for edge in (0, size - 1):
+                cells[:, edge, :, :size][outlined] = self.outline
+                cells[:, :size, :, edge].transpose(0, 2, 1, 3)[outlined] = self.outline
+        return pixels
+
+    def render_tile(self, tx, ty):
+        n = self.tile_cells
+        x0, y0 = tx * n, ty * n
+        if self.scale >= 1:
+            pixels = self.cell_pixels(self.index[y0:y0 + n, x0:x0 + n], self.scale, self.gap)
+        else:
+            f = int(1 / self.scale)
+            level = self.pyramid[f.bit_length() - 1]
+            pixels = level[y0 // f:(y0 + n) // f, x0 // f:(x0 + n) // f]
+        return pygame.surfarray.make_surface(pixels.transpose(1, 0, 2))
+
+    def tile(self, tx, ty):
+        key = (self.scale, tx, ty)
+        tile = self.tiles.get(key)
+        if tile is None:
+            tile = self.render_tile(tx, ty)
+            self.tiles.put(key, tile)
+        return tile
+
+    def repaint(self, rect):
+        # Redraws a screen rectangle from the tiles under it, then any markers on top
+        rect = rect.clip(self.view)
+        if not rect.w or not rect.h:
+            return
+        clip = self.surface.get_clip()
+        self.surface.set_clip(rect)
+        self.surface.fill(self.gap_color, rect)
+        ox, oy = self.offset[0] - self.view.x, self.offset[1] - self.view.y
+        t = self.tile_pixels
+        columns = -(-self.width // self.tile_cells)
+        rows = -(-self.height // self.tile_cells)
+        for ty in range(max((rect.top + oy) // t, 0), min((rect.bottom - 1 + oy) // t + 1, rows)):
+            for tx in range(max((rect.left + ox) // t, 0), min((rect.right - 1 + ox) // t + 1, columns)):
+                self.surface.blit(self.tile(tx, ty), (tx * t - ox, ty * t - oy))
+        if self.scale < MARKER_SIZE:
+            for index, cells, marker in self.layers.values():
+                if marker:
+                    for pos in cells:
+                        marker_rect = self.marker_rect(pos)
+                        if marker_rect.colliderect(rect):
+                            self.surface.fill(self.palette[index], marker_rect)
+        self.surface.set_clip(clip)
+        self.dirty.append(rect)
+
+    # --- Cells ---
+
+    def set_cells(self, name, cells):
+        # Replaces a layer's cells; only the symmetric difference is repainted
+        layer = self.layers[name]
+        cells = set(map(tuple, cells))
+        changed = layer[1] ^ cells
+        layer[1] = cells
+        if len(changed) > BULK_CELLS:
+            self.rebuild()
+            self.draw()
+            return
+        for pos in changed:
+            self.paint(pos)
+
+    def add_cells(self, name, cells):
+        # Grows a layer (e.g. the newest trail cells) without rescanning what it holds
+        layer = self.layers[name][1]
+        new = [pos for pos in map(tuple, cells) if pos not in layer]
+        layer.update(new)
+        if len(new) > BULK_CELLS:
+            self.rebuild()
+            self.draw()
+            return
+        for pos in new:
+            self.paint(pos)
+
+    def update_terrain(self, cells):
+        # Picks up changed terrain cells (e.g. a newly found obstacle)
+        for pos in map(tuple, cells):
+            self.paint(pos)
+
+    def paint(self, pos):
+        # One cell: the topmost layer holding it, else the terrain. The index, the mean
+        # colors above it and any cached tile holding it are patched in place.
+        x, y = pos
+        value = int(self.terrain[y][x] != 0)
+        for index, cells, _ in self.layers.values():
+            if pos in cells:
+                value = index
+        if self.index[y, x] != value:
+            self.index[y, x] = value
+            self.patch_pyramid(x, y)
+            self.patch_tiles(x, y)
+        # A marker may be (or have been) drawn larger than the cell itself
+        if self.scale < MARKER_SIZE and any(marker for _, _, marker in self.layers.values()):
+            self.repaint(self.marker_rect(pos))
+        else:
+            self.repaint(self.cell_rect(pos))
+
+    def patch_pyramid(self, x, y):
+        for k in range(1, len(self.pyramid)):
+            x0, y0 = (x >> k) << 1, (y >> k) << 1
+            if k == 1:
+                block = self.palette[self.index[y0:y0 + 2, x0:x0 + 2]]
+            else:
+                block = self.pyramid[k - 1][y0:y0 + 2, x0:x0 + 2]
+            block = block.reshape(-1, 3)
+            # Integer floor of the mean, as in block_mean (whose edge padding repeats
+            # cells without changing their mean)
+            self.pyramid[k][y >> k, x >> k] = block.sum(axis=0, dtype=np.int64) // len(block)
+
+    def patch_tiles(self, x, y):
+        for scale in self.zooms:
+            if scale >= 1:
+                n = max(1, TILE_PIXELS // scale)
+            else:
+                n = int(TILE_PIXELS / scale)
+            tile = self.tiles.peek((scale, x // n, y // n))
+            if tile is None:
+                continue
+            cx, cy = x % n, y % n
+            if scale >= 1:
+                gap = self.base_gap if scale >= MIN_DETAIL_PITCH else 0
+                pixels = self.cell_pixels(self.index[y:y + 1, x:x + 1], scale, gap)
+                pygame.surfarray.blit_array(tile.subsurface((cx * scale, cy * scale, scale, scale)),
+                                            pixels.transpose(1, 0, 2))
+            else:
+                f = int(1 / scale)
+                tile.set_at((cx // f, cy // f), tuple(self.pyramid[f.bit_length() - 1][y // f, x // f]))
+
+    def draw(self):
+        # Full repaint of the view, for the first frame, a reset or a scroll/zoom
+        self.dirty = []
+        self.repaint(self.view)
+
+    def flush(self):
+        # Rectangles repainted since the last flush
+        dirty, self.dirty = self.dirty, []
+        return dirty
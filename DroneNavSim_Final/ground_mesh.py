@@ -0,0 +1,82 @@
+import numpy as np
+from panda3d.core import Geom, GeomNode, GeomTriangles, GeomVertexData, GeomVertexFormat, NodePath
+
+CHUNK_CELLS = 64  # Cells per chunk edge: 65 x 65 vertices, one draw call per chunk
+
+def corner_heights(heights):
+    # Per-cell heights (H, W) -> per-corner heights (H + 1, W + 1), each corner the mean
+    # of the cells that touch it
+    heights = np.pad(np.asarray(heights, dtype=np.float32), 1, mode='edge')
+    return (heights[:-1, :-1] + heights[1:, :-1] + heights[:-1, 1:] + heights[1:, 1:]) / 4
+
+def ground_normals(corners, cell_size):
+    # Unit normals of a per-corner height field, (H + 1, W + 1, 3)
+    dzdy, dzdx = np.gradient(corners, cell_size)
+    normals = np.stack([-dzdx, -dzdy, np.ones_like(corners)], axis=-1)
+    return normals / np.linalg.norm(normals, axis=-1, keepdims=True)
+
+def ground_chunk(x0, y0, x1, y1, cell_size, corners=None, normals=None, name='ground'):
+    # GeomNode covering cells [x0, x1) x [y0, y1), centered on the cells like the old
+    # per-cell cards. Vertices are shared between neighbouring cells and UVs are in
+    # cells, so a repeating texture tiles once per cell. corners/normals are the full
+    # map's per-corner heights and normals, or None for flat ground.
+    gx, gy = np.meshgrid(np.arange(x0, x1 + 1), np.arange(y0, y1 + 1))
+    rows = gx.size
+    vertices = np.empty((rows, 8), dtype=np.float32)
+    vertices[:, 0] = (gx * cell_size - cell_size / 2).ravel()
+    vertices[:, 1] = (gy * cell_size - cell_size / 2).ravel()
+    if corners is None:
+        vertices[:, 2] = 0
+        vertices[:, 3:6] = (0, 0, 1)
+    else:
+        vertices[:, 2] = corners[y0:y1 + 1, x0:x1 + 1].ravel()
+        vertices[:, 3:6] = normals[y0:y1 + 1, x0:x1 + 1].reshape(-1, 3)
+    vertices[:, 6] = gx.ravel()
+    vertices[:, 7] = gy.ravel()
+
+    vdata = GeomVertexData(name, GeomVertexFormat.get_v3n3t2(), Geom.UH_static)
+    vdata.unclean_set_num_rows(rows)
+    np.frombuffer(memoryview(vdata.modify_array(0)).cast('B'), dtype=np.float32)[:] = vertices.ravel()
+
+    # Two counter-clockwise (seen from above) triangles per cell
+    stride = x1 - x0 + 1
+    a = (np.arange(y1 - y0)[:, None] * stride + np.arange(x1 - x0)[None, :]).ravel()
+    b, c, d = a + 1, a + stride + 1, a + stride
+    index_type = np.uint16 if rows < 65536 else np.uint32
+    indices = np.stack([a, b, c, a, c, d], axis=1).astype(index_type)
+    triangles = GeomTriangles(Geom.UH_static)
+    triangles.set_index_type(Geom.NT_uint16 if index_type is np.uint16 else Geom.NT_uint32)
+    handle = triangles.modify_vertices()
+    handle.unclean_set_num_rows(indices.size)
+    np.frombuffer(memoryview(handle).cast('B'), dtype=index_type)[:] = indices.ravel()
+
+    geom = Geom(vdata)
+    geom.add_primitive(triangles)
+    node = GeomNode(name)
+    node.add_geom(geom)
+    return node
+
+def build_ground(parent, width, height, cell_size, texture=None, heights=None, chunk=CHUNK_CELLS):
+    # Ground for a width x height grid as a few chunk meshes under one node, instead of
+    # a node per cell. heights: optional per-cell (H, W) or per-corner (H + 1, W + 1) array.
+    root = parent.attach_new_node('ground')
+    corners = normals = None
+    if heights is not None:
+        heights = np.asarray(heights, dtype=np.float32)
+        corners = corner_heights(heights) if heights.shape == (height, width) else heights
+        normals = ground_normals(corners, cell_size)
+    for y0 in range(0, height, chunk):
+        for x0 in range(0, width, chunk):
+            node = ground_chunk(x0, y0, min(x0 + chunk, width), min(y0 + chunk, height), cell_size, corners,
+                                normals, name=f'ground_{x0 // chunk}_{y0 // chunk}')
+            root.attach_new_node(node)
+    if texture is not None:
+        root.set_texture(texture)
+    return root
+
+if __name__ == "__main__":
+    import time
+    for size in (50, 512, 2048):
+        began = time.perf_counter()
+        ground = build_ground(NodePath('render'), size, size, 2)
+        print(f"{size}x{size}: {ground.get_num_children()} chunks in {(time.perf_counter() - began) * 1000:.1f} ms")
@@ -0,0 +1,269 @@
+import heapq
+import itertools
+import numpy as np
+from pathfinding import astar, heuristic
+from distance_field import compute_distance_field
+
+# Border runs at least this long get an entrance at each end instead of one in the middle
+LONG_ENTRANCE = 6
+
+class HierarchicalPlanner:
+    # HPA*-style planner: the grid is cut into square clusters, entrance cells are
+    # placed along the free stretches of every cluster border, and the costs between
+    # entrances of the same cluster are precomputed. Queries search that small abstract
+    # graph first and then refine each hop with a local A* inside a single cluster.
+    def __init__(self, grid, cluster_size=32):
+        self.grid = np.array(grid)  # Own copy; update_cells edits it, not the caller's terrain
+        self.rows, self.cols = grid.shape
+        self.cluster_size = cluster_size
+        self.clusters_x = -(-self.cols // cluster_size)
+        self.clusters_y = -(-self.rows // cluster_size)
+        self.border_pairs = {}
+        self.inter = {}
+        self.intra = {}
+        self.cluster_nodes = {}
+        self.expanded = 0  # Nodes expanded by the last query, abstract search and refinement
+
+        for border in self.all_borders():
+            self.build_border(border)
+        clusters = [(cx, cy) for cy in range(self.clusters_y) for cx in range(self.clusters_x)]
+        for cluster in clusters:
+            self.cluster_nodes[cluster] = self.collect_nodes(cluster)
+        self.build_intra(clusters, (0, 0, self.clusters_x, self.clusters_y))
+
+    # --- abstraction -------------------------------------------------------
+
+    def cluster_of(self, pos):
+        return (pos[0] // self.cluster_size, pos[1] // self.cluster_size)
+
+    def cluster_bounds(self, cluster):
+        cs = self.cluster_size
+        x0, y0 = cluster[0] * cs, cluster[1] * cs
+        return x0, y0, min(x0 + cs, self.cols), min(y0 + cs, self.rows)
+
+    def all_borders(self):
+        # ('v', cx, cy) separates cluster (cx, cy) from (cx + 1, cy); ('h', cx, cy) from (cx, cy + 1)
+        for cy in range(self.clusters_y):
+            for cx in range(self.clusters_x):
+                if cx + 1 < self.clusters_x:
+                    yield ('v', cx, cy)
+                if cy + 1 < self.clusters_y:
+                    yield ('h', cx, cy)
+
+    def cluster_borders(self, cluster):
+        cx, cy = cluster
+        borders = [('v', cx - 1, cy), ('v', cx, cy), ('h', cx, cy - 1), ('h', cx, cy)]
+        return [b for b in borders if b in self.border_pairs]
+
+    def build_border(self, border):
+        for a, b in self.border_pairs.get(border, []):
+            self.inter.get(a, {}).pop(b, None)
+            self.inter.get(b, {}).pop(a, None)
+
+        kind, cx, cy = border
+        x0, y0, x1, y1 = self.cluster_bounds((cx, cy))
+        if kind == 'v':
+            # Column x1 - 1 on the left, x1 on the right, over the cluster's rows
+            open_cells = (self.grid[y0:y1, x1 - 1] == 0) & (self.grid[y0:y1, x1] == 0)
+            make_pair = lambda i: ((x1 - 1, y0 + i), (x1, y0 + i))
+        else:
+            open_cells = (self.grid[y1 - 1, x0:x1] == 0) & (self.grid[y1, x0:x1] == 0)
+            make_pair = lambda i: ((x0 + i, y1 - 1), (x0 + i, y1))
+
+        pairs = []
+        for run_start, run_end in free_runs(open_cells):
+            if run_end - run_start >= LONG_ENTRANCE:
+                pairs += [make_pair(run_start), make_pair(run_end - 1)]
+            else:
+                pairs.append(make_pair((run_start + run_end - 1) // 2))
+        for a, b in pairs:
+            self.inter.setdefault(a, {})[b] = 1
+            self.inter.setdefault(b, {})[a] = 1
+        self.border_pairs[border] = pairs
+
+    def collect_nodes(self, cluster):
+        nodes = set()
+        for border in self.cluster_borders(cluster):
+            for pair in self.border_pairs[border]:
+                nodes.update(cell for cell in pair if self.cluster_of(cell) == cluster)
+        return nodes
+
+    def build_intra(self, clusters, region):
+        # Distances between the entrances of each cluster. All clusters in the region are
+        # searched together: round k runs one vectorized BFS from the k-th entrance of every
+        # cluster at once, with moves across cluster borders masked out.
+        cs = self.cluster_size
+        rx0, ry0, rx1, ry1 = region
+        x0, y0 = rx0 * cs, ry0 * cs
+        x1, y1 = min(rx1 * cs, self.cols), min(ry1 * cs, self.rows)
+        sub = self.grid[y0:y1, x0:x1]
+        height, width = sub.shape[0] + 2, sub.shape[1] + 2
+        free = np.pad(sub == 0, 1, constant_values=False)
+        cluster_ids = np.full((height, width), -1, dtype=np.int32)
+        ys = np.arange(y0, y1) // cs
+        xs = np.arange(x0, x1) // cs
+        cluster_ids[1:-1, 1:-1] = ys[:, None] * self.clusters_x + xs[None, :]
+        # For each direction, the cells whose neighbor that way is free and in the same cluster
+        moves = []
+        for offset, dy, dx in [(-1, 0, -1), (1, 0, 1), (-width, -1, 0), (width, 1, 0)]:
+            target_free = np.roll(free, (-dy, -dx), axis=(0, 1))
+            target_cluster = np.roll(cluster_ids, (-dy, -dx), axis=(0, 1))
+            moves.append((offset, (target_free & (target_cluster == cluster_ids)).ravel()))
+
+        def local_index(cell):
+            return (cell[1] - y0 + 1) * width + cell[0] - x0 + 1
+
+        # Entrances grouped per cluster; cluster c owns all_nodes[lo:hi]
+        all_nodes, spans = [], []
+        for cluster in clusters:
+            nodes = sorted(self.cluster_nodes[cluster])
+            spans.append((len(all_nodes), len(all_nodes) + len(nodes)))
+            all_nodes += nodes
+            for node in nodes:
+                self.intra[node] = {}
+        if not all_nodes:
+            return
+        node_index = np.array([local_index(node) for node in all_nodes], dtype=np.int32)
+
+        rounds = max(hi - lo for lo, hi in spans)
+        dist = np.empty(height * width, dtype=np.int32)
+        for k in range(rounds):
+            active = [(lo, hi) for lo, hi in spans if hi - lo > k]
+            dist.fill(-1)
+            frontier = node_index[[lo + k for lo, _ in active]]
+            dist[frontier] = 0
+            level = 0
+            while frontier.size:
+                level += 1
+                candidates = np.concatenate([frontier[allowed[frontier]] + offset for offset, allowed in moves])
+                candidates = candidates[dist[candidates] < 0]
+                # Drop duplicates without sorting (see distance_field.wavefront)
+                order = -2 - np.arange(candidates.size, dtype=np.int32)
+                dist[candidates] = order
+                frontier = candidates[dist[candidates] == order]
+                dist[frontier] = level
+
+            reached = dist[node_index].tolist()
+            for lo, hi in active:
+                edges = self.intra[all_nodes[lo + k]]
+                for node, cost in zip(all_nodes[lo:hi], reached[lo:hi]):
+                    if cost > 0:
+                        edges[node] = cost
+
+    def update_cells(self, changes):
+        # changes: iterable of ((x, y), value). Only clusters the edits touch are rebuilt
+        cs = self.cluster_size
+        dirty_clusters, dirty_borders = set(), set()
+        for (x, y), value in changes:
+            self.grid[y][x] = value
+            cx, cy = x // cs, y // cs
+            dirty_clusters.add((cx, cy))
+            touching = []
+            if x % cs == 0:
+                touching.append((('v', cx - 1, cy), (cx - 1, cy)))
+            if x % cs == cs - 1 or x == self.cols - 1:
+                touching.append((('v', cx, cy), (cx + 1, cy)))
+            if y % cs == 0:
+                touching.append((('h', cx, cy - 1), (cx, cy - 1)))
+            if y % cs == cs - 1 or y == self.rows - 1:
+                touching.append((('h', cx, cy), (cx, cy + 1)))
+            for border, neighbor in touching:
+                if border in self.border_pairs:
+                    dirty_borders.add(border)
+                    dirty_clusters.add(neighbor)
+
+        for border in dirty_borders:
+            self.build_border(border)
+        for cluster in dirty_clusters:
+            for node in self.cluster_nodes[cluster]:
+                self.intra.pop(node, None)
+            self.cluster_nodes[cluster] = self.collect_nodes(cluster)
+            self.build_intra([cluster], (cluster[0], cluster[1], cluster[0] + 1, cluster[1] + 1))
+        return dirty_clusters
+
+    # --- queries -----------------------------------------------------------
+
+    def local_costs(self, pos):
+        # Distances from pos to the entrances of its own cluster
+        x0, y0, x1, y1 = self.cluster_bounds(self.cluster_of(pos))
+        field = compute_distance_field(self.grid[y0:y1, x0:x1], (pos[0] - x0, pos[1] - y0))
+        costs = {}
+        for node in self.cluster_nodes[self.cluster_of(pos)]:
+            d = field.distance((node[0] - x0, node[1] - y0))
+            if np.isfinite(d):
+                costs[node] = d
+        return costs, field, (x0, y0)
+
+    def abstract_path(self, start, goal):
+        start, goal = tuple(int(v) for v in start), tuple(int(v) for v in goal)
+        if not (0 <= goal[0] < self.cols and 0 <= goal[1] < self.rows) or self.grid[goal[1]][goal[0]]:
+            return []
+        if start == goal:
+            return [start]
+        start_edges, start_field, origin = self.local_costs(start)
+        goal_edges, _, _ = self.local_costs(goal)
+        if self.cluster_of(start) == self.cluster_of(goal):
+            direct = start_field.distance((goal[0] - origin[0], goal[1] - origin[1]))
+            if np.isfinite(direct):
+                start_edges[goal] = direct
+
+        def neighbors(node):
+            if node == start:
+                return itertools.chain(start_edges.items(), self.inter.get(start, {}).items())
+            edges = itertools.chain(self.intra.get(node, {}).items(), self.inter.get(node, {}).items())
+            if node in goal_edges:
+                edges = itertools.chain(edges, [(goal, goal_edges[node])])
+            return edges
+
+        tie = itertools.count()
+        self.expanded = 0
+        open_set = [(heuristic(start, goal), 0, next(tie), start)]
+        g_score = {start: 0}
+        came_from = {}
+        closed = set()
+        while open_set:
+            _, neg_g, _, current = heapq.heappop(open_set)
+            if current in closed:
+                continue
+            if current == goal:
+                path = [current]
+                while current in came_from:
+                    current = came_from[current]
+                    path.append(current)
+                return path[::-1]
+            closed.add(current)
+            self.expanded += 1
+            for neighbor, cost in neighbors(current):
+                tentative_g = -neg_g + cost
+                if tentative_g < g_score.get(neighbor, np.inf):
+                    g_score[neighbor] = tentative_g
+                    came_from[neighbor] = current
+                    f = tentative_g + heuristic(neighbor, goal)
+                    heapq.heappush(open_set, (f, -tentative_g, next(tie), neighbor))
+        return []
+
+    def refine(self, waypoints):
+        # Yields the cell-level segment for each abstract hop, one cluster at a time
+        for a, b in zip(waypoints, waypoints[1:]):
+            if abs(a[0] - b[0]) + abs(a[1] - b[1]) == 1:
+                yield [b]  # Hop across a cluster border
+                continue
+            x0, y0, x1, y1 = self.cluster_bounds(self.cluster_of(a))
+            stats = {}
+            local = astar(self.grid[y0:y1, x0:x1], (a[0] - x0, a[1] - y0), (b[0] - x0, b[1] - y0), stats=stats)
+            self.expanded += stats.get('expanded', 0)
+            yield [(x + x0, y + y0) for x, y in local[1:]]
+
+    def find_path(self, start, goal):
+        waypoints = self.abstract_path(start, goal)
+        if not waypoints:
+            return []
+        path = [waypoints[0]]
+        for segment in self.refine(waypoints):
+            path.extend(segment)
+        return path
+
+def free_runs(mask):
+    # (start, end) index pairs of the True runs in a 1-D boolean array
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return zip(np.flatnonzero(edges == 1).tolist(), np.flatnonzero(edges == -1).tolist())
@@ -0,0 +1,165 @@
+import heapq
+import numpy as np
+from pathfinding import pad_grid, neighbor_offsets, to_index, to_pos, in_bounds
+
+INF = float('inf')
+
+class DStarLite:
+    # D* Lite on a 4-connected, uniform-cost grid. The search runs backwards from
+    # the goal and keeps its g/rhs values between calls, so when the drone moves or
+    # cells change only the vertices whose cost-to-goal is affected are re-expanded.
+    # distances: optional flat, padded cost-to-goal for this grid and goal, such as a
+    # cached distance_field's. Every vertex then starts out consistent and the first
+    # query needs no search at all.
+    def __init__(self, grid, start, goal, distances=None):
+        self.rows, self.cols = grid.shape
+        self.width = self.cols + 2
+        blocked, _ = pad_grid(grid)
+        self.blocked_arr = blocked
+        self.g_arr = np.full(blocked.size, INF)
+        self.rhs_arr = np.full(blocked.size, INF)
+        self.blocked = memoryview(self.blocked_arr)
+        self.g = memoryview(self.g_arr)
+        self.rhs = memoryview(self.rhs_arr)
+        self.offsets = [offset for offset, _, _, _ in neighbor_offsets(self.width)]
+
+        self.start = to_index(start, self.width)
+        self.goal = to_index(goal, self.width)
+        self.last = self.start
+        self.km = 0
+        self.open_set = []
+        self.open_keys = {}  # Valid queue entries; heap items not matching are stale
+        self.expanded = 0
+        self.total_expanded = 0
+        self.dirty = True
+
+        if distances is not None:
+            self.g_arr[:] = distances
+            self.rhs_arr[:] = distances
+        else:
+            self.rhs[self.goal] = 0.0
+            self.push(self.goal)
+
+    # --- queue helpers -----------------------------------------------------
+
+    def h(self, a, b):
+        ay, ax = divmod(a, self.width)
+        by, bx = divmod(b, self.width)
+        return abs(ax - bx) + abs(ay - by)
+
+    def key(self, idx):
+        best = min(self.g[idx], self.rhs[idx])
+        return (best + self.h(self.start, idx) + self.km, best)
+
+    def push(self, idx):
+        key = self.key(idx)
+        self.open_keys[idx] = key
+        heapq.heappush(self.open_set, (key, idx))
+
+    def top(self):
+        while self.open_set:
+            key, idx = self.open_set[0]
+            if self.open_keys.get(idx) == key:
+                return key, idx
+            heapq.heappop(self.open_set)  # Stale entry
+        return (INF, INF), None
+
+    def update_vertex(self, idx):
+        if idx != self.goal:
+            best = INF
+            if not self.blocked[idx]:
+                for offset in self.offsets:
+                    succ = idx + offset
+                    if not self.blocked[succ] and self.g[succ] + 1 < best:
+                        best = self.g[succ] + 1
+            self.rhs[idx] = best
+        if self.g[idx] != self.rhs[idx]:
+            self.push(idx)
+        else:
+            self.open_keys.pop(idx, None)
+
+    def compute_shortest_path(self):
+        self.expanded = 0
+        while True:
+            top_key, u = self.top()
+            if u is None:
+                break
+            if top_key >= self.key(self.start) and self.rhs[self.start] == self.g[self.start]:
+                break
+            self.expanded += 1
+            new_key = self.key(u)
+            if top_key < new_key:
+                self.push(u)  # Key went stale after km grew; requeue
+            elif self.g[u] > self.rhs[u]:
+                # Locally overconsistent: settle it and relax its predecessors
+                self.g[u] = self.rhs[u]
+                self.open_keys.pop(u, None)
+                heapq.heappop(self.open_set)
+                for offset in self.offsets:
+                    self.update_vertex(u + offset)
+            else:
+                # Underconsistent: invalidate and let the neighborhood re-derive its costs
+                self.g[u] = INF
+                self.update_vertex(u)
+                for offset in self.offsets:
+                    self.update_vertex(u + offset)
+        self.total_expanded += self.expanded
+        self.dirty = False
+
+    # --- public API --------------------------------------------------------
+
+    def update_cells(self, changes):
+        # changes: iterable of ((x, y), value); the repair happens on the next query
+        touched = []
+        for pos, value in changes:
+            if not in_bounds(pos, self.rows, self.cols):
+                continue
+            idx = to_index(pos, self.width)
+            if self.blocked[idx] != bool(value):
+                self.blocked[idx] = bool(value)
+                touched.append(idx)
+        if not touched:
+            return
+        self.km += self.h(self.last, self.start)
+        self.last = self.start
+        for idx in touched:
+            self.update_vertex(idx)
+            for offset in self.offsets:
+                self.update_vertex(idx + offset)
+        self.dirty = True
+
+    def move_to(self, pos):
+        idx = to_index(pos, self.width)
+        if idx != self.start:
+            self.start = idx
+            self.dirty = True
+
+    def best_successor(self, idx):
+        best, best_cost = None, INF
+        for offset in self.offsets:
+            succ = idx + offset
+            if not self.blocked[succ] and self.g[succ] + 1 < best_cost:
+                best, best_cost = succ, self.g[succ] + 1
+        return best
+
+    def next_step(self):
+        # The cell to move to from the current start, or None if the goal is cut off
+        if self.dirty:
+            self.compute_shortest_path()
+        if self.start == self.goal or self.g[self.start] == INF:
+            return None
+        return to_pos(self.best_successor(self.start), self.width)
+
+    def path(self):
+        if self.dirty:
+            self.compute_shortest_path()
+        if self.g[self.start] == INF and self.start != self.goal:
+            return []
+        current = self.start
+        path = [to_pos(current, self.width)]
+        while current != self.goal and len(path) <= len(self.blocked):
+            current = self.best_successor(current)
+            if current is None:
+                return []
+            path.append(to_pos(current, self.width))
+        return path
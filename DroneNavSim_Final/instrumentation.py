@@ -0,0 +1,243 @@
+import atexit
+import bisect
+import contextlib
+import functools
+import json
+import math
+import os
+import threading
+import time
+
+# Point DRONENAV_METRICS at a file to turn instrumentation on. A .prom file is rewritten
+# with Prometheus text exposition on every export; anything else gets one JSON object
+# appended per export.
+METRICS_PATH = os.environ.get('DRONENAV_METRICS')
+EXPORT_INTERVAL = float(os.environ.get('DRONENAV_METRICS_INTERVAL', 10.0))  # Seconds
+# Histogram upper bounds in seconds, from fast searches to slow loads; 16.7 and 33.3 ms
+# are the 60 and 30 fps frame budgets
+TIME_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.0167, 0.0333,
+                0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+NO_STOPWATCH = contextlib.nullcontext()
+
+# Updates aren't locked: the GIL makes a lost increment between threads rare, and a
+# lock would cost more than the update itself on the hot paths
+
+class Counter:
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.value = 0
+
+    def inc(self, amount=1):
+        if self.registry.enabled:
+            self.value += amount
+
+    def reset(self):
+        self.value = 0
+
+class Histogram:
+    # Counts per bucket plus count and sum, like a Prometheus histogram
+    def __init__(self, registry, name, labels, buckets=TIME_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.bounds = list(buckets)
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(self.bounds) + 1)  # Last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        if self.registry.enabled:
+            self.counts[bisect.bisect_left(self.bounds, value)] += 1
+            self.count += 1
+            self.sum += value
+
+    def time(self):
+        # with histogram.time(): ... records how long the block took
+        return Stopwatch(self) if self.registry.enabled else NO_STOPWATCH
+
+    def quantile(self, q):
+        # Upper bound of the bucket the q-th quantile falls in; None before any value
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.bounds + [math.inf], self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+
+class Stopwatch:
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.began = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.began)
+
+def label_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}'
+
+class Registry:
+    # Named counters and histograms, optionally labelled. Callers create their
+    # instruments once, usually at import, and keep them; while the registry is disabled
+    # every update returns after one flag check, so instrumented code costs next to
+    # nothing with metrics off.
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.metrics = {}  # (name, sorted label pairs) -> Counter or Histogram
+        self.lock = threading.Lock()
+
+    def get(self, kind, name, labels, *args):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self.lock:
+            metric = self.metrics.get(key)
+            if metric is None:
+                metric = self.metrics[key] = kind(self, name, key[1], *args)
+        return metric
+
+    def counter(self, name, **labels):
+        return self.get(Counter, name, labels)
+
+    def histogram(self, name, buckets=TIME_BUCKETS, **labels):
+        return self.get(Histogram, name, labels, buckets)
+
+    def timed(self, name, **labels):
+        # Decorator recording each call's duration in a histogram
+        histogram = self.histogram(name, **labels)
+
+        def wrap(function):
+            @functools.wraps(function)
+            def timed_call(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                began = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - began)
+            return timed_call
+        return wrap
+
+    def items(self):
+        with self.lock:
+            return sorted(self.metrics.items())
+
+    def reset(self):
+        for _, metric in self.items():
+            metric.reset()
+
+    def snapshot(self):
+        # Current values as one JSON-ready dict; histograms carry bucket-bound quantiles
+        counters, histograms = {}, {}
+        for (name, labels), metric in self.items():
+            key = name + label_text(labels).replace('"', '')
+            if isinstance(metric, Counter):
+                counters[key] = metric.value
+            elif metric.count:
+                histograms[key] = {
+                    'count': metric.count,
+                    'sum': metric.sum,
+                    'p50': metric.quantile(0.5),
+                    'p95': metric.quantile(0.95),
+                    'p99': metric.quantile(0.99),
+                    'buckets': dict(zip([str(b) for b in metric.bounds] + ['+Inf'], metric.counts)),
+                }
+        return {'time': time.time(), 'pid': os.getpid(), 'counters': counters, 'histograms': histograms}
+
+    def prometheus(self):
+        # Prometheus text exposition format
+        lines, typed = [], set()
+        for (name, labels), metric in self.items():
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {'counter' if isinstance(metric, Counter) else 'histogram'}")
+            if isinstance(metric, Counter):
+                lines.append(f"{name}{label_text(labels)} {metric.value}")
+                continue
+            total = 0
+            for bound, count in zip([str(b) for b in metric.bounds] + ['+Inf'], metric.counts):
+                total += count
+                lines.append(f"{name}_bucket{label_text(labels, [('le', bound)])} {total}")
+            lines.append(f"{name}_sum{label_text(labels)} {metric.sum}")
+            lines.append(f"{name}_count{label_text(labels)} {metric.count}")
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path):
+        if path.endswith('.prom'):
+            # Written aside and swapped in, so a scraper never reads half a file
+            with open(path + '.tmp', 'w') as f:
+                f.write(self.prometheus())
+            os.replace(path + '.tmp', path)
+        else:
+            with open(path, 'a') as f:
+                f.write(json.dumps(self.snapshot()) + '\n')
+
+class PeriodicExporter:
+    # Exports a registry every interval seconds from a daemon thread, and once more when
+    # closed or at interpreter exit
+    def __init__(self, registry, path, interval=EXPORT_INTERVAL):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='metrics-export', daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.registry.export(self.path)
+
+    def close(self):
+        if not self.stopped.is_set():
+            self.stopped.set()
+            self.registry.export(self.path)
+
+# Shared by every module; on when DRONENAV_METRICS is set
+metrics = Registry(enabled=bool(METRICS_PATH))
+exporter = None
+
+def start_export(path=METRICS_PATH, interval=EXPORT_INTERVAL):
+    # Called from the front ends' entry points; does nothing unless a path is given
+    global exporter
+    if path and exporter is None:
+        metrics.enabled = True
+        exporter = PeriodicExporter(metrics, path, interval)
+    return exporter
+
+if __name__ == "__main__":
+    import numpy as np
+    from pathfinding import astar
+    from terrain_generator import generate_terrain
+
+    # What instrumentation costs the planner, off and on, and what it exports
+    grid = generate_terrain(256, 256, obstacle_prob=0.2, seed=np.random.default_rng(0))
+    grid[0][0] = grid[-1][-1] = 0
+    for enabled in (False, True):
+        metrics.enabled = enabled
+        began = time.perf_counter()
+        for _ in range(20):
+            astar(grid, (0, 0), (255, 255))
+        print(f"astar 256x256 with metrics {'on ' if enabled else 'off'}: "
+              f"{(time.perf_counter() - began) / 20 * 1000:.2f} ms")
+    counter, histogram = metrics.counter('example_total'), metrics.histogram('example_seconds')
+    for enabled in (False, True):
+        metrics.enabled = enabled
+        began = time.perf_counter()
+        for _ in range(100_000):
+            counter.inc()
+            with histogram.time():
+                pass
+        print(f"counter + timed block with metrics {'on ' if enabled else 'off'}: "
+              f"{(time.perf_counter() - began) / 100_000 * 1e9:.0f} ns")
+    print(metrics.prometheus())
@@ -0,0 +1,77 @@
+import time
+import numpy as np
+from strobe_simulator import SOS_PATTERN
+
+# Windows flatter than this (max - min brightness) contain no flashing at all
+MIN_CONTRAST = 64.0
+# A clean SOS binarizes to exactly the template with a wide margin: every lit frame at
+# least ON_LEVEL and every dark frame at most OFF_LEVEL, so no brightness split the
+# classifier learned between the two can disagree
+ON_LEVEL = 200.0
+OFF_LEVEL = 56.0
+
+class MatchedFilterClassifier:
+    # Cheap signal-processing stage in front of the pickled model. Flat windows are
+    # settled as "no SOS" and clean binarized template matches as "SOS" with a few
+    # vector ops; only the rest go to the model. Exposes predict/predict_proba/classes_
+    # like the model itself, so it drops into every caller unchanged.
+    def __init__(self, model, template=SOS_PATTERN):
+        self.model = model
+        self.template = np.asarray(template, dtype=np.float64)
+        self.lit = np.flatnonzero(self.template > 0)
+        self.dark = np.flatnonzero(self.template == 0)
+        self.classes_ = np.asarray(getattr(model, 'classes_', [0, 1]))
+        self.sos_column = list(self.classes_).index(1)
+        self.stats = {'windows': 0, 'flat': 0, 'matched': 0, 'escalated': 0,
+                      'filter_seconds': 0.0, 'model_seconds': 0.0}
+
+    def sos_probability(self, X):
+        began = time.perf_counter()
+        X = np.asarray(X, dtype=np.float64).reshape(-1, len(self.template))
+        flat = X.max(axis=1) - X.min(axis=1) < MIN_CONTRAST
+        matched = (X[:, self.lit].min(axis=1) >= ON_LEVEL) & (X[:, self.dark].max(axis=1) <= OFF_LEVEL)
+        probability = matched.astype(np.float64)
+        escalate = ~(flat | matched)
+        filtered = time.perf_counter()
+
+        if escalate.any():
+            probability[escalate] = self.model.predict_proba(X[escalate])[:, self.sos_column]
+        stats = self.stats
+        stats['windows'] += len(X)
+        stats['flat'] += int(flat.sum())
+        stats['matched'] += int(matched.sum())
+        stats['escalated'] += int(escalate.sum())
+        stats['filter_seconds'] += filtered - began
+        stats['model_seconds'] += time.perf_counter() - filtered
+        return probability
+
+    def predict_proba(self, X):
+        sos = self.sos_probability(X)
+        proba = np.empty((len(sos), len(self.classes_)))
+        proba[:] = ((1 - sos) / max(len(self.classes_) - 1, 1))[:, None]
+        proba[:, self.sos_column] = sos
+        return proba
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def report(self):
+        stats = self.stats
+        windows = max(stats['windows'], 1)
+        settled = stats['flat'] + stats['matched']
+        return (f"{stats['windows']} windows: {stats['flat']} flat, {stats['matched']} clean SOS, "
+                f"{stats['escalated']} escalated ({settled / windows * 100:.1f}% settled without the model); "
+                f"filter {stats['filter_seconds'] * 1e6 / windows:.1f} us/window, "
+                f"model {stats['model_seconds'] * 1000:.2f} ms total")
+
+if __name__ == "__main__":
+    from sos_detector import load_model
+    from strobe_simulator import labeled_batch
+    rng = np.random.default_rng(0)
+    model = load_model()
+    fast = MatchedFilterClassifier(model)
+    for label, kwargs in [("clean", {}), ("noisy", dict(phase=3, jitter=0.05, noise=15, distractors=1))]:
+        X, _ = labeled_batch(rng, 20000, **kwargs)
+        agree = (fast.predict(X) == model.predict(X)).mean()
+        print(f"{label}: {fast.report()}; agrees with the model on {agree * 100:.2f}%")
+        fast.stats = dict.fromkeys(fast.stats, 0)
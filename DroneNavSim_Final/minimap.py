@@ -0,0 +1,116 @@
+import numpy as np
+from panda3d.core import SamplerState, Texture
+
+MINIMAP_TEXELS = 256     # Largest texture edge; bigger maps put a block of cells in each texel
+
+# Same colors as the 2D views
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+
+def block_fraction(terrain, x0, y0, x1, y1, factor):
+    # Share of obstacle cells in each factor x factor block of cells [x0, x1) x [y0, y1)
+    cells = np.asarray(terrain)[y0:y1, x0:x1] != 0
+    h, w = -(-cells.shape[0] // factor), -(-cells.shape[1] // factor)
+    counts = np.zeros((h, w))
+    sizes = np.zeros((h, w))
+    for dy in range(factor):
+        for dx in range(factor):
+            part = cells[dy::factor, dx::factor]
+            counts[:part.shape[0], :part.shape[1]] += part
+            sizes[:part.shape[0], :part.shape[1]] += 1
+    return counts / sizes
+
+class TerrainMinimap:
+    # Top-down map texture built straight from the terrain grid: one texel per cell (or per
+    # block of cells on big maps) with marker layers on top, instead of rendering the scene
+    # a second time. Edits only mark the texels they touch; refresh() writes just those into
+    # the texture's RAM image, and nothing is uploaded when nothing changed.
+    def __init__(self, terrain, max_size=MINIMAP_TEXELS, free_color=WHITE, blocked_color=BLACK):
+        self.terrain = terrain
+        self.height, self.width = np.shape(terrain)
+        self.factor = max(1, -(-max(self.width, self.height) // max_size))  # Cells per texel edge
+        self.tw, self.th = -(-self.width // self.factor), -(-self.height // self.factor)
+        self.free_color = np.array(free_color, dtype=np.float64)
+        self.blocked_color = np.array(blocked_color, dtype=np.float64)
+        # Markers cover a square this many texels out from their cell, so they stay visible
+        self.marker_radius = max(1, max(self.tw, self.th) // 64)
+        self.layers = {}  # name -> [color, set of texels], later layers drawn on top
+        self.dirty = set()
+        self.base = self.terrain_colors(block_fraction(terrain, 0, 0, self.width, self.height, self.factor))
+
+        self.texture = Texture('minimap')
+        self.texture.setup_2d_texture(self.tw, self.th, Texture.T_unsigned_byte, Texture.F_rgb)
+        self.texture.set_minfilter(SamplerState.FT_nearest)
+        self.texture.set_magfilter(SamplerState.FT_nearest)
+        self.texture.set_wrap_u(SamplerState.WM_clamp)
+        self.texture.set_wrap_v(SamplerState.WM_clamp)
+        # Texture rows run bottom to top like grid y (north up) and channels are BGR
+        self.texture.set_ram_image(np.ascontiguousarray(self.base[..., ::-1]).tobytes())
+
+    def terrain_colors(self, fraction):
+        colors = self.free_color + (self.blocked_color - self.free_color) * fraction[..., None]
+        return np.rint(colors).astype(np.uint8)
+
+    def add_layer(self, name, color, marker=False):
+        self.layers[name] = [np.array(color, dtype=np.uint8), set(), marker]
+
+    def texels(self, cells, marker):
+        # Texels covered by a set of grid cells
+        texels = {(int(x) // self.factor, int(y) // self.factor) for x, y in cells}
+        if not marker:
+            return texels
+        r = self.marker_radius
+        return {(tx + dx, ty + dy) for tx, ty in texels for dy in range(-r, r + 1) for dx in range(-r, r + 1)
+                if 0 <= tx + dx < self.tw and 0 <= ty + dy < self.th}
+
+    def set_cells(self, name, cells):
+        # Replaces a layer's cells; only the texels that differ are marked for the next refresh
+        layer = self.layers[name]
+        texels = self.texels(cells, layer[2])
+        self.dirty |= layer[1] ^ texels
+        layer[1] = texels
+
+    def update_terrain(self, cells):
+        # Picks up changed terrain cells (e.g. a newly found obstacle)
+        f = self.factor
+        for tx, ty in {(int(x) // f, int(y) // f) for x, y in cells}:
+            fraction = block_fraction(self.terrain, tx * f, ty * f, (tx + 1) * f, (ty + 1) * f, f)
+            self.base[ty, tx] = self.terrain_colors(fraction)[0, 0]
+            self.dirty.add((tx, ty))
+
+    def refresh(self):
+        # Writes the dirty texels into the texture; returns how many were written
+        if not self.dirty:
+            return 0
+        dirty = list(self.dirty)
+        self.dirty = set()
+        xs, ys = np.array(dirty).T
+        colors = self.base[ys, xs]
+        for color, texels, _ in self.layers.values():
+            colors[[pos in texels for pos in dirty]] = color
+        image = np.frombuffer(memoryview(self.texture.modify_ram_image()), dtype=np.uint8)
+        image.reshape(self.th, self.tw, 3)[ys, xs] = colors[:, ::-1]
+        return len(dirty)
+
+if __name__ == "__main__":
+    import time
+    from terrain_generator import generate_terrain
+
+    # Build cost and per-step refresh cost for a drone walking across maps of growing size
+    for size in (50, 512, 4096):
+        terrain = generate_terrain(size, size, obstacle_prob=0.2, seed=np.random.default_rng(0))
+        began = time.perf_counter()
+        minimap = TerrainMinimap(terrain)
+        minimap.add_layer('path', (0, 255, 0))
+        minimap.add_layer('drone', (0, 0, 255), marker=True)
+        minimap.set_cells('path', [(i, i) for i in range(size)])
+        minimap.refresh()
+        built = time.perf_counter() - began
+        began = time.perf_counter()
+        written = 0
+        for i in range(size):
+            minimap.set_cells('drone', [(i, i)])
+            written += minimap.refresh()
+        step = (time.perf_counter() - began) / size
+        print(f"{size}x{size}: {minimap.tw}x{minimap.th} texture built in {built * 1000:.1f} ms, "
+              f"{step * 1e6:.0f} us and {written / size:.1f} texels per step")
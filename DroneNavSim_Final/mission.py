@@ -0,0 +1,215 @@
+import os
+import time
+import numpy as np
+from terrain_generator import generate_terrain
+from connectivity import ConnectivityIndex
+from incremental_planner import DStarLite
+from distance_field import field_cache, terrain_fingerprint
+from explorer import CoverageExplorer, SENSOR_RADIUS
+from sos_detector import SOSDetectorService
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(BASE_DIR, 'models', 'sos_classifier.pkl')
+SOS_FRAMES = os.path.join(BASE_DIR, 'assets', 'sos_sequence')
+
+# One cached classifier per process; batch workers load it once instead of per mission
+bundled_detector = SOSDetectorService(MODEL_PATH, SOS_FRAMES)
+
+def detect_bundled_sos():
+    # Default detector: the bundled strobe frames, independent of the working directory
+    return bundled_detector.detect()
+
+class MissionBase:
+    # Detection and the run loop shared by Mission and SearchMission. Subclasses provide
+    # step() and metrics() and set up detector, trail and the detection fields.
+    def detect(self):
+        if self.detector is None:
+            self.success = True  # Navigation-only run: reaching the goal is enough
+            return
+        began = time.perf_counter()
+        found, confidence = self.detector()
+        self.record_detection(found, confidence, time.perf_counter() - began)
+
+    def record_detection(self, found, confidence, seconds):
+        # Also used by front ends that run the detector asynchronously
+        self.detection_time += seconds
+        self.detected_sos, self.confidence = bool(found), float(confidence)
+        self.success = self.detected_sos
+
+    def run(self, max_steps=None):
+        # Flies the whole mission as fast as the CPU allows
+        max_steps = max_steps or 4 * self.width * self.height
+        while len(self.trail) < max_steps and self.step():
+            pass
+        self.done = True
+        return self.metrics()
+
+class Mission(MissionBase):
+    # Headless core of one search-and-rescue run: terrain, a reachable SOS goal, a D* Lite
+    # planner and detection on arrival. step() advances exactly one cell with no rendering
+    # or clock, so the GUIs can pace it in real time and batch runs can go flat out.
+    def __init__(self, seed=None, width=30, height=30, obstacle_prob=0.25, start=(0, 0),
+                 goal_margin=5, obstacle_rate=0.0, detector=detect_bundled_sos):
+        # seed: None, an int or a np.random.Generator (shared with the caller)
+        self.rng = np.random.default_rng(seed)
+        self.seed = seed if isinstance(seed, (int, np.integer)) else -1
+        self.width, self.height = width, height
+        self.start = start
+        self.obstacle_rate = obstacle_rate  # Chance per step of discovering a new obstacle ahead
+        self.detector = detector
+
+        self.goal = None
+        while self.goal is None:
+            # Regenerate in the rare case nothing past the margin is reachable from the start
+            self.terrain = generate_terrain(width, height, obstacle_prob=obstacle_prob, seed=self.rng)
+            self.terrain[start[1]][start[0]] = 0
+            self.connectivity = ConnectivityIndex(self.terrain)
+            self.goal = self.connectivity.random_reachable(start, self.rng, x_min=goal_margin, y_min=goal_margin)
+
+        # D* Lite starts from the goal's distance field, shared through field_cache with
+        # any other mission on the same terrain and goal
+        began = time.perf_counter()
+        self.fingerprint = terrain_fingerprint(self.terrain)
+        field = field_cache.get(self.terrain, self.goal, fingerprint=self.fingerprint)
+        self.planner = DStarLite(self.terrain, start, self.goal, field.distances)
+        self.path = self.planner.path()
+        self.planning_time = time.perf_counter() - began
+        self.planned_length = len(self.path) - 1
+
+        self.drone_pos = start
+        self.trail = []
+        self.obstacles_added = 0
+        self.detected_sos = False
+        self.confidence = 0.0
+        self.detection_time = 0.0
+        self.done = False
+        self.success = False
+
+    def add_obstacle_ahead(self):
+        # Simulate a newly discovered obstacle on the planned route; the planner repairs its path
+        ahead = self.planner.path()[2:-1]
+        if not ahead:
+            return None
+        x, y = ahead[self.rng.integers(len(ahead))]
+        self.connectivity.update_cells([((x, y), 1)])  # Writes self.terrain as well
+        self.planner.update_cells([((x, y), 1)])
+        self.obstacles_added += 1
+        if self.connectivity.connected(self.drone_pos, self.goal):
+            self.path = self.planner.path()
+        else:
+            self.path = []
+        return (x, y)
+
+    def step(self):
+        # Moves one cell towards the goal and runs detection on arrival. Returns False once
+        # the mission is over, either at the goal or with the goal cut off.
+        if self.done:
+            return False
+        if self.obstacle_rate and self.rng.random() < self.obstacle_rate:
+            self.add_obstacle_ahead()
+
+        if self.drone_pos != self.goal:
+            next_pos = None
+            if self.connectivity.connected(self.drone_pos, self.goal):
+                began = time.perf_counter()
+                next_pos = self.planner.next_step()
+                self.planning_time += time.perf_counter() - began
+            if next_pos is None:
+                self.done = True  # Nothing reopens cells, so a cut-off goal stays cut off
+                return False
+            self.trail.append(self.drone_pos)
+            self.drone_pos = next_pos
+            self.planner.move_to(next_pos)
+
+        if self.drone_pos == self.goal:
+            self.detect()
+            self.done = True
+        return not self.done
+
+    def metrics(self):
+        return {
+            'seed': self.seed,
+            'success': self.success,
+            'reached_goal': self.drone_pos == self.goal,
+            'detected': self.detected_sos,
+            'confidence': self.confidence,
+            'path_length': len(self.trail),
+            'planned_length': self.planned_length,
+            'expanded': self.planner.total_expanded,
+            'obstacles_added': self.obstacles_added,
+            'planning_time': self.planning_time,
+            'detection_time': self.detection_time,
+            'coverage': float('nan'),  # Nothing is swept; the goal is known
+        }
+
+class SearchMission(MissionBase):
+    # A mission where the SOS position is unknown: the drone sweeps the map with a
+    # CoverageExplorer and hands off to the detector as soon as the beacon comes into its
+    # camera footprint. Same step()/run()/metrics() as Mission, so batch runs can mix them.
+    def __init__(self, seed=None, width=30, height=30, obstacle_prob=0.25, start=(0, 0),
+                 radius=SENSOR_RADIUS, detector=detect_bundled_sos):
+        self.rng = np.random.default_rng(seed)
+        self.seed = seed if isinstance(seed, (int, np.integer)) else -1
+        self.width, self.height = width, height
+        self.start = start
+        self.detector = detector
+
+        self.goal = None
+        while self.goal is None:
+            self.terrain = generate_terrain(width, height, obstacle_prob=obstacle_prob, seed=self.rng)
+            self.terrain[start[1]][start[0]] = 0
+            self.connectivity = ConnectivityIndex(self.terrain)
+            self.goal = self.connectivity.random_reachable(start, self.rng)
+
+        began = time.perf_counter()
+        self.explorer = CoverageExplorer(self.terrain, start, radius)
+        self.planning_time = time.perf_counter() - began
+
+        self.drone_pos = start
+        self.trail = []
+        self.spotted = False
+        self.detected_sos = False
+        self.confidence = 0.0
+        self.detection_time = 0.0
+        self.done = False
+        self.success = False
+        self.check_beacon()
+
+    def check_beacon(self):
+        # The goal is never given to the planner; it only counts once the camera sees it
+        if not self.spotted and self.explorer.seen(self.goal):
+            self.spotted = True
+            self.detect()
+            self.done = True
+
+    def step(self):
+        # Sweeps one cell. Returns False once the beacon was found and checked, or the
+        # whole reachable map has been seen without it.
+        if self.done:
+            return False
+        began = time.perf_counter()
+        seen = self.explorer.step()
+        self.planning_time += time.perf_counter() - began
+        if seen is None:
+            self.done = True
+            return False
+        self.trail.append(self.drone_pos)
+        self.drone_pos = self.explorer.pos
+        self.check_beacon()
+        return not self.done
+
+    def metrics(self):
+        return {
+            'seed': self.seed,
+            'success': self.success,
+            'reached_goal': self.spotted,
+            'detected': self.detected_sos,
+            'confidence': self.confidence,
+            'path_length': len(self.trail),
+            'planned_length': -1,  # No route is planned up front
+            'expanded': self.explorer.expanded,
+            'obstacles_added': 0,
+            'planning_time': self.planning_time,
+            'detection_time': self.detection_time,
+            'coverage': self.explorer.coverage(),
+        }
@@ -1,35 +1,435 @@
 
+import functools
 import heapq
+import inspect
+import math
+import threading
+import time
 import numpy as np
+from instrumentation import metrics
 
-def astar(grid, start, goal):
+SQRT2 = math.sqrt(2)
+
+# Instrumented searches running on this thread; searches nested in another (HPA*
+# refining its hops with A*) are left to the outer one, so the series can be summed
+active_searches = threading.local()
+
+# Per-cell search states; anything >= CLOSED is never expanded again
+UNSEEN, OPEN, CLOSED, BLOCKED = 0, 1, 2, 3
+
+def instrumented_search(planner):
+    # Times a planner and totals its search stats in the shared metrics, when they're on
+    seconds = metrics.histogram('search_seconds', planner=planner)
+    counters = {key: metrics.counter(f'search_{key}_total', planner=planner)
+                for key in ('expanded', 'scanned', 'heap_pushes', 'heap_pops')}
+
+    def wrap(search):
+        signature = inspect.signature(search)
+
+        @functools.wraps(search)
+        def instrumented(*args, **kwargs):
+            if not metrics.enabled or getattr(active_searches, 'depth', 0):
+                return search(*args, **kwargs)
+            # stats may come positionally or by name; hand the search one if it has none
+            bound = signature.bind(*args, **kwargs)
+            stats = bound.arguments.get('stats')
+            if stats is None:
+                stats = bound.arguments['stats'] = {}
+            began = time.perf_counter()
+            active_searches.depth = 1
+            try:
+                path = search(*bound.args, **bound.kwargs)
+            finally:
+                active_searches.depth = 0
+            seconds.observe(time.perf_counter() - began)
+            for key, counter in counters.items():
+                counter.inc(stats.get(key, 0))
+            return path
+        return instrumented
+    return wrap
+
+@instrumented_search('astar')
+def astar(grid, start, goal, diagonal=False, cost_grid=None, stats=None, connectivity=None):
+    # connectivity: optional connectivity.ConnectivityIndex for this grid; walled-off
+    # goals are then rejected before any search
+    if connectivity is not None and not connectivity.connected(start, goal):
+        record_stats(stats, 0)
+        return []  # Start and goal are in different components
     rows, cols = grid.shape
-    open_set = []
-    heapq.heappush(open_set, (0, start))
-    came_from = {}
-    g_score = {start: 0}
-    f_score = {start: heuristic(start, goal)}
+    width = cols + 2
+    blocked, cost = pad_grid(grid, cost_grid)
+    if not in_bounds(start, rows, cols) or not in_bounds(goal, rows, cols):
+        return []
 
-    while open_set:
-        _, current = heapq.heappop(open_set)
+    start_idx = to_index(start, width)
+    goal_idx = to_index(goal, width)
+    if blocked[goal_idx]:
+        return []  # Goal is an obstacle
 
-        if current == goal:
-            return reconstruct_path(came_from, current)
+    # Per-cell search state: obstacles are pre-marked so one lookup rejects
+    # both walls and finished cells. np.empty is lazily backed, so only the
+    # pages the search actually touches become resident on very large maps
+    state_arr = blocked * BLOCKED
+    g_arr = np.empty(state_arr.size, dtype=np.float64)
+    parent_arr = np.empty(state_arr.size, dtype=np.int64)
+    state = memoryview(state_arr)
+    g_score = memoryview(g_arr)
+    came_from = memoryview(parent_arr)
+    cost = memoryview(cost) if cost is not None else None
 
-        for neighbor in get_neighbors(current, rows, cols):
-            x, y = neighbor
-            if grid[y][x] == 1:
-                continue  # Skip obstacles
+    offsets = neighbor_offsets(width, diagonal)
+    # Scale the heuristic by the cheapest cell so it stays admissible
+    h_scale = min_cost(cost_grid, grid) if cost is not None else 1.0
+    diag_bonus = h_scale * (SQRT2 - 2)
+    # Padded coordinates of the goal, so divmod(idx, width) can be compared directly
+    gx, gy = int(goal[0]) + 1, int(goal[1]) + 1
 
-            tentative_g_score = g_score[current] + 1
-            if neighbor not in g_score or tentative_g_score < g_score[neighbor]:
+    g_score[start_idx] = 0.0
+    came_from[start_idx] = -1
+    state[start_idx] = OPEN
+    # Ties on f are broken towards larger g so the search runs deep instead of wide
+    open_set = [(0.0, 0.0, start_idx)]
+    push, pop = heapq.heappush, heapq.heappop
+    expanded = pops = 0
+
+    while open_set:
+        current = pop(open_set)[2]
+        pops += 1
+        if state[current] == CLOSED:
+            continue  # Stale heap entry
+        if current == goal_idx:
+            record_stats(stats, expanded, pops=pops, pushes=pops + len(open_set))
+            return reconstruct_path(came_from, current, width)
+        state[current] = CLOSED
+        expanded += 1
+        current_g = g_score[current]
+        cy, cx = divmod(current, width)
+
+        for offset, step, dx, dy in offsets:
+            neighbor = current + offset
+            neighbor_state = state[neighbor]
+            if neighbor_state >= CLOSED:
+                continue  # Skip obstacles and finished cells
+            if dx and dy and (state[current + dx] == BLOCKED or state[current + dy * width] == BLOCKED):
+                continue  # Don't cut corners past obstacles
+
+            tentative_g = current_g + (step * cost[neighbor] if cost is not None else step)
+            if neighbor_state == UNSEEN or tentative_g < g_score[neighbor]:
                 came_from[neighbor] = current
-                g_score[neighbor] = tentative_g_score
-                f_score[neighbor] = tentative_g_score + heuristic(neighbor, goal)
-                heapq.heappush(open_set, (f_score[neighbor], neighbor))
+                g_score[neighbor] = tentative_g
+                state[neighbor] = OPEN
+                hx = abs(cx + dx - gx)
+                hy = abs(cy + dy - gy)
+                h = h_scale * (hx + hy)
+                if diagonal:
+                    h += diag_bonus * min(hx, hy)  # Octile distance
+                push(open_set, (tentative_g + h, -tentative_g, neighbor))
+
+    record_stats(stats, expanded, pops=pops, pushes=pops)
+    return []  # No path found
+
+@instrumented_search('jps')
+def jps(grid, start, goal, stats=None, connectivity=None):
+    # Jump Point Search for 4-connected, uniform-cost grids. Shortest paths are
+    # taken horizontal-first: horizontal jumps probe up and down at every cell,
+    # vertical jumps only stop where a turn sideways is forced
+    if connectivity is not None and not connectivity.connected(start, goal):
+        record_stats(stats, 0)
+        return []  # Start and goal are in different components
+    rows, cols = grid.shape
+    width = cols + 2
+    blocked, _ = pad_grid(grid)
+    if not in_bounds(start, rows, cols) or not in_bounds(goal, rows, cols):
+        return []
+
+    start_idx = to_index(start, width)
+    goal_idx = to_index(goal, width)
+    if blocked[goal_idx]:
+        return []  # Goal is an obstacle
+
+    state_arr = blocked * BLOCKED
+    g_arr = np.empty(state_arr.size, dtype=np.int64)
+    parent_arr = np.empty(state_arr.size, dtype=np.int64)
+    state = memoryview(state_arr)
+    g_score = memoryview(g_arr)
+    came_from = memoryview(parent_arr)
+    blocked = memoryview(blocked)
+    gy, gx = divmod(goal_idx, width)
+    scanned = 0
+
+    def jump_vertical(idx, d):
+        nonlocal scanned
+        while True:
+            idx += d
+            scanned += 1
+            if blocked[idx]:
+                return -1
+            if idx == goal_idx:
+                return idx
+            # Turning sideways is forced where the cell beside the previous one is blocked
+            if (blocked[idx - d + 1] and not blocked[idx + 1]) or (blocked[idx - d - 1] and not blocked[idx - 1]):
+                return idx
+
+    def jump_horizontal(idx, d):
+        nonlocal scanned
+        while True:
+            idx += d
+            scanned += 1
+            if blocked[idx]:
+                return -1
+            if idx == goal_idx:
+                return idx
+            if jump_vertical(idx, width) != -1 or jump_vertical(idx, -width) != -1:
+                return idx
+
+    g_score[start_idx] = 0
+    came_from[start_idx] = -1
+    state[start_idx] = OPEN
+    open_set = [(0, 0, start_idx)]
+    push, pop = heapq.heappush, heapq.heappop
+    expanded = pops = 0
+
+    while open_set:
+        current = pop(open_set)[2]
+        pops += 1
+        if state[current] == CLOSED:
+            continue  # Stale heap entry
+        if current == goal_idx:
+            record_stats(stats, expanded, scanned, pops, pops + len(open_set))
+            return reconstruct_jump_path(came_from, current, width)
+        state[current] = CLOSED
+        expanded += 1
+
+        # Prune successors by the direction we arrived from
+        parent = came_from[current]
+        if parent == -1:
+            directions = [1, -1, width, -width]
+        elif abs(current - parent) < width:
+            directions = [1 if current > parent else -1, width, -width]
+        else:
+            forward = width if current > parent else -width
+            directions = [forward]
+            for side in (1, -1):
+                if blocked[current - forward + side] and not blocked[current + side]:
+                    directions.append(side)
+
+        current_g = g_score[current]
+        for d in directions:
+            if d == 1 or d == -1:
+                jump_point = jump_horizontal(current, d)
+            else:
+                jump_point = jump_vertical(current, d)
+            if jump_point == -1 or state[jump_point] == CLOSED:
+                continue
+
+            steps = abs(jump_point - current)
+            if steps >= width:
+                steps //= width  # Vertical jump
+            tentative_g = current_g + steps
+            if state[jump_point] == UNSEEN or tentative_g < g_score[jump_point]:
+                came_from[jump_point] = current
+                g_score[jump_point] = tentative_g
+                state[jump_point] = OPEN
+                jy, jx = divmod(jump_point, width)
+                h = abs(jx - gx) + abs(jy - gy)
+                push(open_set, (tentative_g + h, -tentative_g, jump_point))
 
+    record_stats(stats, expanded, scanned, pops, pops)
     return []  # No path found
 
+@instrumented_search('hpa')
+def hpa(grid, start, goal, stats=None, connectivity=None, cluster_size=32):
+    # One-off HPA* query: builds the cluster abstraction, then searches it. Paths are
+    # near-optimal, not optimal. To answer many queries on one map, keep a
+    # hierarchical_planner.HierarchicalPlanner around and reuse its abstraction.
+    from hierarchical_planner import HierarchicalPlanner  # It builds on this module
+    if connectivity is not None and not connectivity.connected(start, goal):
+        record_stats(stats, 0)
+        return []
+    rows, cols = grid.shape
+    if not in_bounds(start, rows, cols) or not in_bounds(goal, rows, cols):
+        return []
+    planner = HierarchicalPlanner(grid, cluster_size)
+    path = planner.find_path(start, goal)
+    record_stats(stats, planner.expanded)
+    return path
+
+PLANNERS = {'astar': astar, 'jps': jps, 'hpa': hpa}
+
+def plan_path(grid, start, goal, method='astar', **kwargs):
+    # Pick a planner by name: 'astar' (any costs/connectivity), 'jps' (uniform,
+    # 4-connected) or 'hpa' (hierarchical, near-optimal)
+    if method not in PLANNERS:
+        raise ValueError(f"Unknown planner '{method}', expected one of {sorted(PLANNERS)}")
+    return PLANNERS[method](grid, start, goal, **kwargs)
+
+class ReservationTable:
+    # Space-time reservations for cooperative planning: which drone holds a (padded, flat)
+    # cell at each tick, plus cells held for good by drones parked at their goals
+    def __init__(self):
+        self.cells = {}   # (tick, idx) -> drone
+        self.parked = {}  # idx -> (first tick, drone)
+        self.latest = {}  # idx -> last tick anyone holds it before parking (never lowered)
+
+    def holder(self, idx, t):
+        drone = self.cells.get((t, idx))
+        if drone is None and idx in self.parked:
+            since, parked = self.parked[idx]
+            if t >= since:
+                return parked
+        return drone
+
+    def can_move(self, a, b, t, drone=None):
+        # Whether `drone` may go from cell a at tick t to cell b at tick t + 1: b must be
+        # free then, and nobody may come the other way through the same edge
+        if self.holder(b, t + 1) not in (None, drone):
+            return False
+        other = self.cells.get((t, b))
+        return other is None or other == drone or self.cells.get((t + 1, a)) != other
+
+    def can_park(self, idx, t, drone=None):
+        # Whether `drone` can stay in idx from tick t on without blocking anyone
+        if idx in self.parked and self.parked[idx][1] != drone:
+            return False
+        return self.latest.get(idx, -1) < t or all(
+            self.cells.get((tick, idx)) in (None, drone) for tick in range(t, self.latest[idx] + 1))
+
+    def reserve(self, drone, cells, start_time=0):
+        # cells: one flat index per tick from start_time; the last one is held for good
+        # unless another drone already parks there
+        for t, idx in enumerate(cells, start_time):
+            self.cells[(t, idx)] = drone
+            if t > self.latest.get(idx, -1):
+                self.latest[idx] = t
+        self.parked.setdefault(cells[-1], (start_time + len(cells) - 1, drone))
+
+    def release(self, drone, cells, start_time=0, from_time=0):
+        # Drops a drone's reservations from from_time on, e.g. before it replans
+        for t, idx in enumerate(cells, start_time):
+            if t >= from_time and self.cells.get((t, idx)) == drone:
+                del self.cells[(t, idx)]
+        if self.parked.get(cells[-1], (0, None))[1] == drone:
+            del self.parked[cells[-1]]
+
+@instrumented_search('space_time_astar')
+def space_time_astar(grid, start, goal, reservations, start_time=0, drone=None, distances=None,
+                     max_time=None, stats=None):
+    # Cooperative A* over (cell, tick) on a 4-connected grid: each tick a drone moves to a
+    # neighbor or waits, never into a cell another drone holds then and never swapping
+    # places with one. Returns one cell per tick from start_time, ending where the drone
+    # can park at the goal for good, or [] if it can't get there by max_time.
+    # distances: optional flat, padded cost-to-goal such as distance_field's, a much
+    # sharper heuristic than Manhattan distance on cluttered maps.
+    rows, cols = grid.shape
+    width = cols + 2
+    blocked, _ = pad_grid(grid)
+    if not in_bounds(start, rows, cols) or not in_bounds(goal, rows, cols):
+        return []
+    start_idx = to_index(start, width)
+    goal_idx = to_index(goal, width)
+    if blocked[goal_idx]:
+        return []
+    blocked = memoryview(blocked)
+    gy, gx = divmod(goal_idx, width)
+    if distances is not None:
+        heuristic = memoryview(distances)
+    else:
+        heuristic = None
+
+    def h(idx):
+        if heuristic is not None:
+            return heuristic[idx]
+        y, x = divmod(idx, width)
+        return abs(x - gx) + abs(y - gy)
+
+    h0 = h(start_idx)
+    if h0 == math.inf:
+        record_stats(stats, 0)
+        return []
+    if max_time is None:
+        max_time = start_time + 2 * int(h0) + 64  # Room for detours and waits
+    moves = (0, -1, 1, -width, width)  # Waiting first, so ties prefer holding still
+    came_from = {(start_idx, start_time): None}
+    # Cost is elapsed ticks, so f = tick + h and ties go to later ticks (deeper)
+    open_set = [(start_time + h0, -start_time, start_idx)]
+    push, pop = heapq.heappush, heapq.heappop
+    closed = set()
+    expanded = pops = 0
+
+    while open_set:
+        _, neg_t, current = pop(open_set)
+        pops += 1
+        t = -neg_t
+        if (current, t) in closed:
+            continue
+        if current == goal_idx and reservations.can_park(current, t, drone):
+            record_stats(stats, expanded, pops=pops, pushes=pops + len(open_set))
+            path = []
+            state = (current, t)
+            while state is not None:
+                path.append(to_pos(state[0], width))
+                state = came_from[state]
+            path.reverse()
+            return path
+        closed.add((current, t))
+        expanded += 1
+        if t >= max_time:
+            continue
+        for move in moves:
+            neighbor = current + move
+            if blocked[neighbor] or (neighbor, t + 1) in closed:
+                continue
+            if not reservations.can_move(current, neighbor, t, drone):
+                continue
+            h_next = h(neighbor)
+            if h_next == math.inf:
+                continue
+            if (neighbor, t + 1) not in came_from:
+                came_from[(neighbor, t + 1)] = (current, t)
+                push(open_set, (t + 1 + h_next, -(t + 1), neighbor))
+
+    record_stats(stats, expanded, pops=pops, pushes=pops)
+    return []  # No conflict-free path within max_time
+
+def record_stats(stats, expanded, scanned=None, pops=0, pushes=0):
+    # Optional search counters for callers that pass a dict
+    if stats is not None:
+        stats['expanded'] = expanded
+        stats['scanned'] = expanded if scanned is None else scanned
+        stats['heap_pushes'] = pushes
+        stats['heap_pops'] = pops
+
+def pad_grid(grid, cost_grid=None):
+    # One-cell obstacle border so flat neighbor offsets never wrap or leave the grid
+    blocked = np.pad(np.asarray(grid) != 0, 1, constant_values=True).astype(np.uint8).ravel()
+    cost = None
+    if cost_grid is not None:
+        cost = np.pad(np.asarray(cost_grid, dtype=np.float64), 1, constant_values=np.inf).ravel()
+        blocked |= ~np.isfinite(cost)
+    return blocked, cost
+
+def neighbor_offsets(width, diagonal=False):
+    # (flat offset, step length, dx, dy) for a padded row width
+    moves = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+    if diagonal:
+        moves += [(-1, -1), (1, -1), (-1, 1), (1, 1)]
+    return [(dy * width + dx, SQRT2 if dx and dy else 1.0, dx, dy) for dx, dy in moves]
+
+def min_cost(cost_grid, grid):
+    cost = np.asarray(cost_grid, dtype=np.float64)
+    usable = np.isfinite(cost) & (np.asarray(grid) == 0)
+    return float(cost[usable].min()) if usable.any() else 1.0
+
+def in_bounds(pos, rows, cols):
+    return 0 <= pos[0] < cols and 0 <= pos[1] < rows
+
+def to_index(pos, width):
+    return (int(pos[1]) + 1) * width + int(pos[0]) + 1
+
+def to_pos(idx, width):
+    y, x = divmod(idx, width)
+    return (x - 1, y - 1)
+
 def heuristic(a, b):
     return abs(a[0] - b[0]) + abs(a[1] - b[1])
 
@@ -42,10 +442,54 @@ def get_neighbors(pos, rows, cols):
             neighbors.append((nx, ny))
     return neighbors
 
-def reconstruct_path(came_from, current):
-    path = [current]
-    while current in came_from:
+def reconstruct_path(came_from, current, width):
+    path = [to_pos(current, width)]
+    while came_from[current] != -1:
         current = came_from[current]
-        path.append(current)
+        path.append(to_pos(current, width))
+    path.reverse()
+    return path
+
+def reconstruct_jump_path(came_from, current, width):
+    # Jump points are joined by straight runs; fill in the cells between them
+    path = [to_pos(current, width)]
+    while came_from[current] != -1:
+        parent = came_from[current]
+        step = 1 if abs(current - parent) < width else width
+        step = step if parent > current else -step
+        while current != parent:
+            current += step
+            path.append(to_pos(current, width))
     path.reverse()
     return path
+
+def compare_planners(sizes=(64, 256, 512), densities=(0.0, 0.05, 0.2), runs=3, seed=0):
+    # Expansion counts and wall-clock time of each planner on corner-to-corner queries.
+    # HPA* times include building its abstraction.
+    rng = np.random.default_rng(seed)
+    results = []
+    for size in sizes:
+        for density in densities:
+            for _ in range(runs):
+                grid = (rng.random((size, size)) < density).astype(np.uint8)
+                grid[0, 0] = grid[-1, -1] = 0
+                start, goal = (0, 0), (size - 1, size - 1)
+                row = {'size': size, 'density': density}
+                for method in PLANNERS:
+                    stats = {}
+                    began = time.perf_counter()
+                    path = plan_path(grid, start, goal, method, stats=stats)
+                    row[method] = (len(path), stats['expanded'], time.perf_counter() - began)
+                results.append(row)
+    return results
+
+if __name__ == "__main__":
+    print(f"{'size':>6} {'density':>8} {'path':>6} {'HPA path':>9} {'A* exp':>9} {'JPS exp':>9} {'HPA exp':>9} "
+          f"{'A* ms':>9} {'JPS ms':>9} {'HPA ms':>9}")
+    for row in compare_planners():
+        a_len, a_exp, a_time = row['astar']
+        j_len, j_exp, j_time = row['jps']
+        h_len, h_exp, h_time = row['hpa']
+        assert a_len == j_len, "JPS and A* disagree on path length"
+        print(f"{row['size']:>6} {row['density']:>8.2f} {a_len:>6} {h_len:>9} {a_exp:>9} {j_exp:>9} {h_exp:>9} "
+              f"{a_time * 1000:>9.1f} {j_time * 1000:>9.1f} {h_time * 1000:>9.1f}")
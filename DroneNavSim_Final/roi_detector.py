@@ -0,0 +1,114 @@
+import os
+import cv2
+import numpy as np
+from matched_filter import MatchedFilterClassifier
+from sos_detector import load_model
+from streaming_detector import WINDOW, sos_column
+
+def block_means(frames, grid=(8, 8)):
+    # Mean brightness of a rows x cols grid of regions in each frame.
+    # frames: (T, H, W) grayscale stack -> (rows * cols, T). Edge pixels that don't
+    # fill a whole block are dropped so the reduction is a single reshape + mean.
+    frames = np.asarray(frames)
+    rows, cols = grid
+    t, h, w = frames.shape
+    bh, bw = h // rows, w // cols
+    blocks = frames[:, :bh * rows, :bw * cols].reshape(t, rows, bh, cols, bw)
+    return blocks.mean(axis=(2, 4), dtype=np.float64).reshape(t, rows * cols).T
+
+def grid_boxes(shape, grid=(8, 8)):
+    # (x0, y0, x1, y1) of every block_means region, row by row
+    rows, cols = grid
+    bh, bw = shape[0] // rows, shape[1] // cols
+    ys, xs = np.mgrid[0:rows, 0:cols]
+    return np.stack([xs * bw, ys * bh, (xs + 1) * bw, (ys + 1) * bh], axis=-1).reshape(-1, 4)
+
+def integral_images(frames):
+    # Summed-area tables with a zero row/column in front: (T, H + 1, W + 1). 32-bit
+    # sums are enough for 8-bit frames up to ~8 megapixels and keep the tables small
+    frames = np.asarray(frames)
+    t, h, w = frames.shape
+    depth = cv2.CV_32S if frames.dtype == np.uint8 and 255 * h * w < 2**31 else cv2.CV_64F
+    return np.stack([cv2.integral(frame, sdepth=depth) for frame in frames])
+
+def box_means(frames, boxes):
+    # Mean brightness inside arbitrary (x0, y0, x1, y1) boxes in every frame, four table
+    # lookups per box no matter its size: -> (N, T)
+    boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+    if not len(boxes):
+        return np.empty((0, len(frames)))
+    sat = integral_images(frames)
+    x0, y0, x1, y1 = boxes.T
+    corner = lambda y, x: sat[:, y, x].astype(np.float64)
+    sums = corner(y1, x1) - corner(y0, x1) - corner(y1, x0) + corner(y0, x0)
+    area = np.maximum((x1 - x0) * (y1 - y0), 1)
+    return (sums / area).T
+
+def find_blobs(frames, threshold=200, min_area=4, pad=0):
+    # Candidate light sources: connected bright areas of the per-pixel maximum over the
+    # sequence, since a strobe is lit in at least some frames. Returns (N, 4) boxes.
+    peak = np.asarray(frames).max(axis=0)
+    mask = (peak >= threshold).astype(np.uint8)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    stats = stats[1:]  # Component 0 is the background
+    stats = stats[stats[:, cv2.CC_STAT_AREA] >= min_area]
+    h, w = peak.shape
+    x0 = np.maximum(stats[:, cv2.CC_STAT_LEFT] - pad, 0)
+    y0 = np.maximum(stats[:, cv2.CC_STAT_TOP] - pad, 0)
+    x1 = np.minimum(stats[:, cv2.CC_STAT_LEFT] + stats[:, cv2.CC_STAT_WIDTH] + pad, w)
+    y1 = np.minimum(stats[:, cv2.CC_STAT_TOP] + stats[:, cv2.CC_STAT_HEIGHT] + pad, h)
+    return np.stack([x0, y0, x1, y1], axis=1)
+
+def classify_sequences(model, sequences):
+    # One batched predict_proba over an (N, 60) matrix -> (found, confidence) arrays
+    sequences = np.asarray(sequences, dtype=np.float64)
+    if sequences.ndim != 2 or sequences.shape[1] != WINDOW:
+        raise ValueError(f"Expected an (N, {WINDOW}) matrix of brightness sequences, got {sequences.shape}")
+    if not len(sequences):
+        return np.zeros(0, dtype=bool), np.zeros(0)
+    confidence = model.predict_proba(sequences)[:, sos_column(model)]
+    return confidence >= 0.5, confidence
+
+def load_frames(folder='assets/sos_sequence', num_frames=WINDOW):
+    # Grayscale (T, H, W) stack of frame_000.png ... Frames of a different size (the
+    # bundled sequence mixes 100x100 and 200x200) are resized to match the first one,
+    # so regions line up across the stack
+    frames = []
+    for i in range(num_frames):
+        img = cv2.imread(os.path.join(folder, f'frame_{i:03}.png'), cv2.IMREAD_GRAYSCALE)
+        if img is None:
+            continue
+        if frames and img.shape != frames[0].shape:
+            img = cv2.resize(img, frames[0].shape[::-1], interpolation=cv2.INTER_AREA)
+        frames.append(img)
+    return np.stack(frames) if frames else np.empty((0, 0, 0), dtype=np.uint8)
+
+def detect_sos_regions(frames, model, grid=None, boxes=None, blobs=False):
+    # Detects every SOS strobe in a 60-frame stack. Candidates come from explicit boxes,
+    # bright blobs (blobs=True) or a regular grid (the default, 8x8). Returns a list of
+    # (box, confidence) for the candidates classified as SOS.
+    if boxes is None and blobs:
+        boxes = find_blobs(frames)
+    if boxes is not None:
+        boxes = np.asarray(boxes).reshape(-1, 4)
+        sequences = box_means(frames, boxes)
+    else:
+        grid = grid or (8, 8)
+        boxes = grid_boxes(frames.shape[1:], grid)
+        sequences = block_means(frames, grid)
+    found, confidence = classify_sequences(model, sequences)
+    return [(tuple(int(v) for v in boxes[i]), float(confidence[i])) for i in np.flatnonzero(found)]
+
+if __name__ == "__main__":
+    # A search area with several lights: two SOS strobes, a steady lamp and a fast blinker
+    rng = np.random.default_rng(0)
+    frames = rng.integers(0, 30, (WINDOW, 240, 320)).astype(np.uint8)
+    sos = np.array([255] * 15 + [0] * 10 + [255] * 35, dtype=np.uint8)
+    frames[:, 20:30, 40:50] = sos[:, None, None]
+    frames[:, 150:162, 250:262] = sos[:, None, None]
+    frames[:, 100:110, 100:110] = 255
+    frames[:, 200:208, 20:28] = (np.arange(WINDOW) // 3 % 2 * 255)[:, None, None]
+    model = MatchedFilterClassifier(load_model())
+    for box, confidence in detect_sos_regions(frames, model, blobs=True):
+        print(f"🚨 SOS strobe at {box} (confidence {confidence:.2f})")
+    print(model.report())
@@ -0,0 +1,177 @@
+import numpy as np
+from panda3d.core import Geom, GeomNode, GeomTriangles, GeomVertexData, GeomVertexFormat, LODNode, NodePath
+
+SCENERY_CHUNK = 16   # Cells per chunk edge; each chunk is flattened into a handful of Geoms
+LOD_NEAR = 60.0      # Full models up to this distance from the camera (world units)
+LOD_FAR = 150.0      # Crossed-quad impostors up to here; beyond it a chunk isn't drawn
+TREE_CHANCE = 0.7    # Obstacles that are trees; the rest are rocks
+TREE, ROCK = 0, 1
+
+# Fallback colors, used for the built-in models and for impostors
+TREE_COLOR = (0.15, 0.45, 0.15, 1)
+TRUNK_COLOR = (0.4, 0.26, 0.13, 1)
+ROCK_COLOR = (0.45, 0.45, 0.45, 1)
+
+def geom_node(name, vertices, normals, colors, indices):
+    # GeomNode from numpy arrays: (N, 3) vertices/normals, (N, 4) float colors, (M, 3) triangles
+    vertices = np.asarray(vertices, dtype=np.float32)
+    rows = len(vertices)
+    # v3n3c4 rows: 3 float32 position, 3 float32 normal, 4 uint8 RGBA
+    data = np.empty(rows, dtype=[('vertex', np.float32, 3), ('normal', np.float32, 3), ('color', np.uint8, 4)])
+    data['vertex'] = vertices
+    data['normal'] = normals
+    data['color'] = np.clip(np.rint(np.asarray(colors) * 255), 0, 255)
+    vdata = GeomVertexData(name, GeomVertexFormat.get_v3n3c4(), Geom.UH_static)
+    vdata.unclean_set_num_rows(rows)
+    np.frombuffer(memoryview(vdata.modify_array(0)).cast('B'), dtype=data.dtype)[:] = data
+
+    triangles = GeomTriangles(Geom.UH_static)
+    triangles.set_index_type(Geom.NT_uint32)
+    handle = triangles.modify_vertices()
+    handle.unclean_set_num_rows(np.size(indices))
+    np.frombuffer(memoryview(handle).cast('B'), dtype=np.uint32)[:] = np.asarray(indices, dtype=np.uint32).ravel()
+    geom = Geom(vdata)
+    geom.add_primitive(triangles)
+    node = GeomNode(name)
+    node.add_geom(geom)
+    return node
+
+def cone(radius, z0, z1, color, sides=8):
+    # Side of a cone (or prism when given a radius pair) around the z axis, flat shaded
+    r0, r1 = radius if isinstance(radius, tuple) else (radius, 0.0)
+    a = np.linspace(0, 2 * np.pi, sides + 1)
+    x, y = np.cos(a), np.sin(a)
+    vertices, normals = [], []
+    for i in range(sides):
+        quad = [(r0 * x[i], r0 * y[i], z0), (r0 * x[i + 1], r0 * y[i + 1], z0),
+                (r1 * x[i + 1], r1 * y[i + 1], z1), (r1 * x[i], r1 * y[i], z1)]
+        mid = (a[i] + a[i + 1]) / 2
+        normal = np.array([np.cos(mid) * (z1 - z0), np.sin(mid) * (z1 - z0), r0 - r1])
+        vertices += quad
+        normals += [normal / np.linalg.norm(normal)] * 4
+    quads = np.arange(sides)[:, None] * 4
+    indices = np.concatenate([quads + [0, 1, 2], quads + [0, 2, 3]])
+    return np.array(vertices), np.array(normals), np.tile(color, (len(vertices), 1)), indices
+
+def merge_parts(*parts):
+    vertices, normals, colors, indices, offset = [], [], [], [], 0
+    for v, n, c, i in parts:
+        vertices.append(v)
+        normals.append(n)
+        colors.append(c)
+        indices.append(i + offset)
+        offset += len(v)
+    return [np.concatenate(p) for p in (vertices, normals, colors, indices)]
+
+def builtin_model(kind):
+    # Low-poly stand-ins for tree.egg / rock.egg when those aren't installed
+    if kind == TREE:
+        parts = merge_parts(cone((0.15, 0.15), 0, 0.6, TRUNK_COLOR, 6), cone(0.7, 0.5, 2.2, TREE_COLOR))
+        return NodePath(geom_node('tree', *parts))
+    parts = merge_parts(cone((0.9, 0.6), 0, 0.5, ROCK_COLOR, 7), cone(0.6, 0.5, 0.8, ROCK_COLOR, 7))
+    return NodePath(geom_node('rock', *parts))
+
+def load_scenery_models(loader, callback=None):
+    # {TREE: model, ROCK: model} from models/tree.egg and rock.egg, or the built-in shapes.
+    # With a callback the files are read on Panda's loader thread and callback(models) runs
+    # on the main thread once they're in; nothing is returned.
+    kinds, paths = (TREE, ROCK), ["models/tree.egg", "models/rock.egg"]
+    def finish(loaded):
+        return {kind: model if model is not None else builtin_model(kind) for kind, model in zip(kinds, loaded)}
+    if callback is not None:
+        loader.load_model(paths, okMissing=True, callback=lambda loaded: callback(finish(loaded)))
+        return None
+    return finish([loader.load_model(path, okMissing=True) for path in paths])
+
+def scenery_instances(terrain, rng):
+    # One instance per obstacle cell with its kind, random scale and heading, drawn in
+    # one vectorized pass: arrays x, y, kind, scale, heading
+    ys, xs = np.nonzero(np.asarray(terrain) == 1)
+    kind = np.where(rng.random(len(xs)) < TREE_CHANCE, TREE, ROCK)
+    r = rng.random(len(xs))
+    scale = np.where(kind == TREE, 1.0 + 0.5 * r, 0.5 + 0.3 * r)  # Taller trees, smaller rocks
+    heading = rng.integers(0, 361, size=len(xs))
+    return {'x': xs, 'y': ys, 'kind': kind, 'scale': scale, 'heading': heading}
+
+def model_extent(model):
+    # (half width, height) of a model's bounds, for sizing its impostor
+    low, high = model.get_tight_bounds()
+    return max(high.x - low.x, high.y - low.y) / 2, high.z - low.z
+
+def impostor_node(instances, cell_size, extents):
+    # Two crossed, vertex-colored quads per instance in one Geom: a few triangles each
+    n = len(instances['x'])
+    half = np.array([extents[k][0] for k in (TREE, ROCK)])[instances['kind']] * instances['scale']
+    height = np.array([extents[k][1] for k in (TREE, ROCK)])[instances['kind']] * instances['scale']
+    cx, cy = instances['x'] * cell_size, instances['y'] * cell_size
+    corners = np.array([[-1, 0, 0], [1, 0, 0], [1, 0, 1], [-1, 0, 1],
+                        [0, -1, 0], [0, 1, 0], [0, 1, 1], [0, -1, 1]], dtype=np.float32)
+    vertices = np.empty((n, 8, 3), dtype=np.float32)
+    vertices[..., 0] = cx[:, None] + corners[:, 0] * half[:, None]
+    vertices[..., 1] = cy[:, None] + corners[:, 1] * half[:, None]
+    vertices[..., 2] = corners[:, 2] * height[:, None]
+    colors = np.array([TREE_COLOR, ROCK_COLOR], dtype=np.float32)[instances['kind']]
+    quads = (np.arange(n)[:, None] * 8 + np.array([0, 4])).reshape(-1, 1)
+    indices = np.concatenate([quads + [0, 1, 2], quads + [0, 2, 3]])
+    node = NodePath(geom_node('impostors', vertices.reshape(-1, 3), np.tile([0, 0, 1], (n * 8, 1)),
+                              np.repeat(colors, 8, axis=0), indices))
+    node.set_two_sided(True)
+    return node
+
+def build_chunk(instances, models, extents, cell_size, name='scenery'):
+    # LODNode for one chunk: flattened full models near the camera, impostors further out
+    full = NodePath('full')
+    for i in range(len(instances['x'])):
+        model = models[int(instances['kind'][i])].copy_to(full)
+        model.set_pos(instances['x'][i] * cell_size, instances['y'][i] * cell_size, 0)
+        model.set_scale(float(instances['scale'][i]))
+        model.set_h(int(instances['heading'][i]))
+    # Bakes every copy's transform into shared vertex data, so the chunk is a few Geoms
+    # rather than one node per obstacle
+    full.flatten_strong()
+
+    lod = LODNode(name)
+    chunk = NodePath(lod)
+    center = ((instances['x'].min() + instances['x'].max()) / 2 * cell_size,
+              (instances['y'].min() + instances['y'].max()) / 2 * cell_size, 0)
+    lod.set_center(center)
+    full.reparent_to(chunk)
+    lod.add_switch(LOD_NEAR, 0)
+    impostor_node(instances, cell_size, extents).reparent_to(chunk)
+    lod.add_switch(LOD_FAR, LOD_NEAR)
+    return chunk
+
+def chunk_groups(instances, chunk=SCENERY_CHUNK):
+    # {(cx, cy): instances in that chunk}, via one stable sort on the chunk key
+    if len(instances['x']) == 0:
+        return {}
+    key = (instances['y'] // chunk) * (1 << 32) + instances['x'] // chunk
+    order = np.argsort(key, kind='stable')
+    key = key[order]
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    ends = np.r_[starts[1:], len(key)]
+    groups = {}
+    for start, end in zip(starts, ends):
+        rows = order[start:end]
+        groups[(int(instances['x'][rows[0]] // chunk), int(instances['y'][rows[0]] // chunk))] = \
+            {name: values[rows] for name, values in instances.items()}
+    return groups
+
+def scenery_block(cells, rng, models, cell_size, origin=(0, 0), extents=None, chunk=SCENERY_CHUNK):
+    # Detached node with the scenery of a terrain window whose top-left cell is origin,
+    # grouped into LOD chunks aligned to the whole map
+    if extents is None:
+        extents = {kind: model_extent(model) for kind, model in models.items()}
+    root = NodePath('scenery')
+    instances = scenery_instances(cells, rng)
+    instances['x'] = instances['x'] + origin[0]
+    instances['y'] = instances['y'] + origin[1]
+    for (cx, cy), group in chunk_groups(instances, chunk).items():
+        build_chunk(group, models, extents, cell_size, f'scenery_{cx}_{cy}').reparent_to(root)
+    return root
+
+def build_scenery(parent, terrain, rng, models, cell_size, chunk=SCENERY_CHUNK):
+    # Trees and rocks for every obstacle cell, merged per chunk with distance LOD
+    root = scenery_block(terrain, rng, models, cell_size, chunk=chunk)
+    root.reparent_to(parent)
+    return root
@@ -1,32 +1,105 @@
 import pickle
-import cv2
-import numpy as np
-import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from frame_ingest import folder_brightness
+from instrumentation import metrics
+from matched_filter import MatchedFilterClassifier
 
+# Detection job states reported by SOSDetectorService.status()
+IDLE, PENDING, COMPLETE, FAILED = 'idle', 'pending', 'complete', 'failed'
+
+# Detection results by outcome; stage timings go to sos_stage_seconds
+DETECTIONS = {found: metrics.counter('sos_detections_total', found=found) for found in (True, False)}
+
+@metrics.timed('sos_stage_seconds', stage='load')
 def load_model(model_path='models/sos_classifier.pkl'):
     with open(model_path, 'rb') as f:
         model = pickle.load(f)
     return model
 
-def get_brightness_sequence(folder='assets/sos_sequence'):
-    brightness_values = []
-    for i in range(60):
-        img_path = os.path.join(folder, f'frame_{i:03}.png')
-        if not os.path.exists(img_path):
-            continue
-        img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
-        brightness = np.mean(img)
-        brightness_values.append(brightness)
-    return brightness_values
-
-def detect_sos_pattern():
-    model = load_model()
-    brightness_values = get_brightness_sequence()
+@metrics.timed('sos_stage_seconds', stage='decode')
+def get_brightness_sequence(folder='assets/sos_sequence', num_frames=60, reduce=1, cache=True):
+    # Decoding is shared with frame_ingest: parallel reads, and frames that haven't
+    # changed since the last call come from the brightness cache
+    return folder_brightness(folder, num_frames, reduce=reduce, cache=cache)
+
+@metrics.timed('sos_stage_seconds', stage='predict')
+def classify_sequence(model, brightness_values):
     if len(brightness_values) != 60:
         return False, 0.0  # Incomplete sequence
-    prediction = model.predict([brightness_values])[0]
-    confidence = model.predict_proba([brightness_values])[0][prediction] if hasattr(model, "predict_proba") else 1.0
-    return bool(prediction), confidence
+    if not hasattr(model, "predict_proba"):
+        found, confidence = bool(model.predict([brightness_values])[0]), 1.0
+    else:
+        # One predict_proba pass; its argmax is what predict() would return
+        proba = model.predict_proba([brightness_values])[0]
+        prediction = int(proba.argmax())
+        found, confidence = bool(prediction), proba[prediction]
+    DETECTIONS[found].inc()
+    return found, confidence
+
+def detect_sos_pattern(model_path='models/sos_classifier.pkl', folder='assets/sos_sequence', fast_path=True):
+    model = load_model(model_path)
+    if fast_path:
+        model = MatchedFilterClassifier(model)
+    return classify_sequence(model, get_brightness_sequence(folder))
+
+class SOSDetectorService:
+    # Keeps the classifier loaded and runs detections on a background thread, so a
+    # render loop can submit a job and poll status() instead of blocking on disk reads
+    # and unpickling. Jobs resolve to (found, confidence, seconds). With fast_path the
+    # model sits behind the matched filter, which settles clear-cut sequences itself.
+    def __init__(self, model_path='models/sos_classifier.pkl', folder='assets/sos_sequence', fast_path=True):
+        self.model_path = model_path
+        self.folder = folder
+        self.fast_path = fast_path
+        self.model = None
+        self.model_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sos-detector')
+        self.job = None
+
+    def get_model(self):
+        with self.model_lock:
+            if self.model is None:
+                self.model = load_model(self.model_path)
+                if self.fast_path:
+                    self.model = MatchedFilterClassifier(self.model)
+        return self.model
+
+    def preload(self):
+        # Unpickle in the background so the first detection doesn't pay for it
+        return self.executor.submit(self.get_model)
+
+    def detect(self, folder=None):
+        # Synchronous detection with the cached model
+        return classify_sequence(self.get_model(), get_brightness_sequence(folder or self.folder))
+
+    def timed_detect(self, folder=None):
+        began = time.perf_counter()
+        found, confidence = self.detect(folder)
+        return found, confidence, time.perf_counter() - began
+
+    def submit(self, folder=None):
+        self.job = self.executor.submit(self.timed_detect, folder)
+        return self.job
+
+    def status(self):
+        if self.job is None:
+            return IDLE
+        if not self.job.done():
+            return PENDING
+        return FAILED if self.job.exception() is not None else COMPLETE
+
+    def result(self):
+        # (found, confidence, seconds) of the latest job once it completed, else None
+        return self.job.result() if self.status() == COMPLETE else None
+
+    def reset(self):
+        # Forget the latest job; if it is still running its result is simply dropped
+        self.job = None
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
 
 # Only show output when run directly
 if __name__ == "__main__":
@@ -0,0 +1,106 @@
+from collections import namedtuple
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from matched_filter import MatchedFilterClassifier
+from sos_detector import load_model
+
+WINDOW = 60  # Frames per classification, fixed by the trained model
+
+# frame: index of the frame that triggered the event; start: first frame of the matching
+# window; onset: first bright frame in that window; latency: frames from onset to the
+# event; confidence: model probability
+DetectionEvent = namedtuple('DetectionEvent', ['frame', 'start', 'onset', 'latency', 'confidence'])
+
+class StreamingSOSDetector:
+    # Online detector for a continuous feed: one brightness value per frame goes into a
+    # ring buffer and the most recent window is classified every `stride` frames, so the
+    # pattern can start at any frame. After an event, classification pauses for
+    # `cooldown` frames so one flash sequence isn't reported once per window offset.
+    # A model loaded from model_path sits behind the matched filter unless fast_path=False.
+    def __init__(self, model=None, model_path='models/sos_classifier.pkl', stride=1, cooldown=WINDOW,
+                 threshold=0.5, fast_path=True):
+        if model is None:
+            model = load_model(model_path)
+            if fast_path:
+                model = MatchedFilterClassifier(model)
+        self.model = model
+        self.stride = stride
+        self.cooldown = cooldown
+        self.threshold = threshold
+        self.sos_column = sos_column(self.model)
+        # Every value is written twice, WINDOW apart, so the latest window is always the
+        # contiguous slice buffer[head:head + WINDOW] and no copy or roll is needed
+        self.buffer = np.zeros(2 * WINDOW, dtype=np.float64)
+        self.head = 0
+        self.frames = 0
+        self.quiet_until = 0
+        self.classified = 0
+        self.events = []
+
+    def window(self):
+        # The last WINDOW values, oldest first (a view, valid until the next push)
+        return self.buffer[self.head:self.head + WINDOW]
+
+    def push(self, brightness):
+        # Adds one frame's brightness; returns a DetectionEvent or None
+        self.buffer[self.head] = self.buffer[self.head + WINDOW] = brightness
+        self.head = (self.head + 1) % WINDOW
+        self.frames += 1
+        frame = self.frames - 1
+        if self.frames < WINDOW or self.frames < self.quiet_until or frame % self.stride:
+            return None
+
+        self.classified += 1
+        window = self.window()
+        confidence = float(self.model.predict_proba(window[None, :])[0][self.sos_column])
+        if confidence < self.threshold:
+            return None
+        start = frame - WINDOW + 1
+        onset = start + int(np.argmax(window > (window.min() + window.max()) / 2))
+        event = DetectionEvent(frame, start, onset, frame - onset, confidence)
+        self.events.append(event)
+        self.quiet_until = self.frames + self.cooldown
+        return event
+
+    def push_frame(self, frame):
+        # Same as push() for an image: grayscale or BGR array, reduced to its mean
+        return self.push(float(np.mean(frame)))
+
+    def feed(self, values):
+        # Pushes a batch of brightness values and returns the events they produced
+        events = []
+        for value in values:
+            event = self.push(value)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def reset(self):
+        self.buffer.fill(0)
+        self.head = self.frames = self.quiet_until = self.classified = 0
+        self.events = []
+
+def classify_windows(model, values, stride=1):
+    # Offline counterpart of the streaming detector: SOS probability of every window
+    # start (every `stride`-th) in a long brightness trace, in one batched predict_proba
+    values = np.asarray(values, dtype=np.float64)
+    if values.size < WINDOW:
+        return np.empty(0)
+    windows = sliding_window_view(values, WINDOW)[::stride]
+    return model.predict_proba(windows)[:, sos_column(model)]
+
+def sos_column(model):
+    # Column of predict_proba that holds the SOS class
+    return list(getattr(model, 'classes_', [0, 1])).index(1)
+
+if __name__ == "__main__":
+    # Quiet sky, then the bundled strobe pattern starting at an arbitrary frame
+    rng = np.random.default_rng(0)
+    pattern = [255.0] * 15 + [0.0] * 10 + [255.0] * 35
+    stream = np.concatenate([rng.uniform(0, 40, 137), pattern, rng.uniform(0, 40, 100)])
+    detector = StreamingSOSDetector()
+    for event in detector.feed(stream):
+        print(f"🚨 SOS at frame {event.frame}: flashing since frame {event.onset}, "
+              f"{event.latency} frames latency, confidence {event.confidence:.2f}")
+    print(f"{detector.frames} frames, {detector.classified} windows classified")
+    print(detector.model.report())
@@ -1,15 +1,160 @@
 import os
+from concurrent.futures import ProcessPoolExecutor
 import cv2
 import numpy as np
 
-def generate_sos_pattern(output_dir, frame_size=(100, 100), on_color=(255, 255, 255), off_color=(0, 0, 0)):
+FRAMES = 60  # Sequence length sos_detector's classifier expects
+# On/off frames of the bundled assets/sos_sequence, which the classifier was trained on
+SOS_PATTERN = np.array([1] * 15 + [0] * 10 + [1] * 35, dtype=np.uint8)
+
+MORSE = {
+    'A': '.-', 'B': '-...', 'C': '-.-.', 'D': '-..', 'E': '.', 'F': '..-.', 'G': '--.',
+    'H': '....', 'I': '..', 'J': '.---', 'K': '-.-', 'L': '.-..', 'M': '--', 'N': '-.',
+    'O': '---', 'P': '.--.', 'Q': '--.-', 'R': '.-.', 'S': '...', 'T': '-', 'U': '..-',
+    'V': '...-', 'W': '.--', 'X': '-..-', 'Y': '-.--', 'Z': '--..',
+    '0': '-----', '1': '.----', '2': '..---', '3': '...--', '4': '....-',
+    '5': '.....', '6': '-....', '7': '--...', '8': '---..', '9': '----.',
+}
+
+def morse_pattern(message, unit=2):
+    # On/off frames for a Morse message: dot 1 unit, dash 3, gaps of 1 inside a letter,
+    # 3 between letters and 7 between words; `unit` is frames per unit
+    units = []
+    for w, word in enumerate(message.upper().split()):
+        if w:
+            units += [0] * 7
+        for c, char in enumerate(word):
+            if c:
+                units += [0] * 3
+            for s, symbol in enumerate(MORSE[char]):
+                if s:
+                    units.append(0)
+                units += [1] * (1 if symbol == '.' else 3)
+    return np.repeat(np.array(units, dtype=np.uint8), unit)
+
+def sequence_batch(rng, count, pattern=SOS_PATTERN, length=FRAMES, phase=0, jitter=0.0, noise=0.0,
+                   distractors=0, on_level=255.0, off_level=0.0):
+    # (count, length) float32 brightness traces built without touching disk. `pattern` is
+    # one on/off sequence shared by all rows or a (count, P) array with one per row. Per row:
+    #   phase       - random start offset in [-phase, phase] frames
+    #   jitter      - timing scale drawn from [1 - jitter, 1 + jitter] (strobe clock drift)
+    #   noise       - std of additive Gaussian sensor noise
+    #   distractors - number of other blinking lights mixed into the frame
+    pattern = np.asarray(pattern, dtype=np.float32)
+    t = np.arange(length, dtype=np.float32)
+    offset = rng.integers(-phase, phase + 1, size=(count, 1)) if phase else np.zeros((count, 1))
+    scale = rng.uniform(1 - jitter, 1 + jitter, size=(count, 1)) if jitter else np.ones((count, 1))
+    idx = np.floor((t - offset) * scale).astype(np.int64)
+    valid = (idx >= 0) & (idx < pattern.shape[-1])
+    idx = np.clip(idx, 0, pattern.shape[-1] - 1)
+    if pattern.ndim == 1:
+        lit = pattern[idx]
+    else:
+        lit = np.take_along_axis(pattern, idx, axis=1)
+    lit[~valid] = 0.0
+    out = (off_level + (on_level - off_level) * lit).astype(np.float32)
+
+    for _ in range(distractors):
+        # Periodic light with its own period, duty cycle, phase and strength
+        period = rng.integers(2, 25, size=(count, 1))
+        duty = rng.uniform(0.2, 0.8, size=(count, 1))
+        start = rng.integers(0, 25, size=(count, 1))
+        strength = rng.uniform(0.1, 0.6, size=(count, 1)) * (on_level - off_level)
+        out += (((t + start) % period) < duty * period) * strength.astype(np.float32)
+    if noise:
+        out += rng.normal(0, noise, size=out.shape).astype(np.float32)
+    return np.clip(out, 0, 255, out=out)
+
+def negative_patterns(rng, count, length=FRAMES, unit=2):
+    # (count, P) on/off patterns of non-SOS lights: other Morse words, steady lamps,
+    # regular blinkers and darkness
+    kinds = rng.integers(0, 4, size=count)
+    words = [morse_pattern(''.join(rng.choice(list(MORSE), size=rng.integers(1, 4))), unit)
+             for _ in range(int(np.count_nonzero(kinds == 0)))]
+    width = max([length] + [len(word) for word in words])
+    patterns = np.zeros((count, width), dtype=np.uint8)
+    for row, word in zip(np.flatnonzero(kinds == 0), words):
+        patterns[row, :len(word)] = word
+    patterns[kinds == 1] = 1
+    blinkers = np.flatnonzero(kinds == 2)
+    period = rng.integers(2, 20, size=(len(blinkers), 1))
+    patterns[blinkers] = np.arange(width) % period < period // 2
+    return patterns
+
+def labeled_batch(rng, count, positive_fraction=0.5, pattern=SOS_PATTERN, length=FRAMES, **kwargs):
+    # (X, y): brightness traces and 1/0 SOS labels, shuffled; kwargs go to sequence_batch
+    positives = int(round(count * positive_fraction))
+    X = np.empty((count, length), dtype=np.float32)
+    X[:positives] = sequence_batch(rng, positives, pattern, length, **kwargs)
+    negatives = negative_patterns(rng, count - positives, length)
+    X[positives:] = sequence_batch(rng, count - positives, negatives, length, **kwargs)
+    y = np.zeros(count, dtype=np.uint8)
+    y[:positives] = 1
+    order = rng.permutation(count)
+    return X[order], y[order]
+
+def render_frames(brightness, frame_size=(100, 100)):
+    # Frames for one brightness trace as a read-only (T, H, W) uint8 view; every pixel
+    # of a frame shares one value, so nothing is copied per pixel
+    values = np.clip(np.rint(brightness), 0, 255).astype(np.uint8)
+    return np.broadcast_to(values[:, None, None], (len(values), frame_size[1], frame_size[0]))
+
+def generate_sos_pattern(output_dir, frame_size=(100, 100), on_color=(255, 255, 255), off_color=(0, 0, 0),
+                         pattern=SOS_PATTERN):
+    # Writes the pattern as frame_000.png ... (60 frames by default, matching the detector)
     os.makedirs(output_dir, exist_ok=True)
-    pattern = [1]*15 + [0]*10 + [1]*30
     for i, val in enumerate(pattern):
         frame = np.full((frame_size[1], frame_size[0], 3), on_color if val else off_color, dtype=np.uint8)
         cv2.imwrite(os.path.join(output_dir, f"frame_{i:03d}.png"), frame)
 
+def write_shard(path, seed, shard, start, count, fmt, kwargs):
+    # Worker side of bulk_generate; every shard has its own deterministic stream
+    rng = np.random.default_rng([seed, shard])
+    X, y = labeled_batch(rng, count, **kwargs)
+    if fmt == 'npz':
+        np.savez_compressed(os.path.join(path, f'shard_{shard:05d}.npz'), X=X, y=y)
+    else:
+        np.lib.format.open_memmap(os.path.join(path, 'X.npy'), mode='r+')[start:start + count] = X
+        np.lib.format.open_memmap(os.path.join(path, 'y.npy'), mode='r+')[start:start + count] = y
+    return count
+
+def bulk_generate(path, count, shard_size=100_000, workers=None, seed=0, fmt='npz', **kwargs):
+    # Labeled dataset of `count` sequences, generated in shards across a process pool.
+    # fmt='npz' writes compressed shard_00000.npz, ... files; fmt='npy' writes one
+    # memory-mapped X.npy / y.npy pair that workers fill in place.
+    if fmt not in ('npz', 'npy'):
+        raise ValueError(f"Unknown dataset format '{fmt}', expected 'npz' or 'npy'")
+    os.makedirs(path, exist_ok=True)
+    length = kwargs.get('length', FRAMES)
+    if fmt == 'npy':
+        np.lib.format.open_memmap(os.path.join(path, 'X.npy'), mode='w+', dtype=np.float32, shape=(count, length))
+        np.lib.format.open_memmap(os.path.join(path, 'y.npy'), mode='w+', dtype=np.uint8, shape=(count,))
+    starts = list(range(0, count, shard_size))
+    jobs = [(path, seed, shard, start, min(shard_size, count - start), fmt, kwargs)
+            for shard, start in enumerate(starts)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return sum(pool.map(write_shard, *zip(*jobs))) if jobs else 0
+
 if __name__ == "__main__":
-    output_path = "assets/sos_sequence"
-    generate_sos_pattern(output_path)
-    print(f"✅ Saved {len(os.listdir(output_path))} SOS frames to {output_path}")
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Write the SOS frame sequence, or a labeled bulk dataset")
+    parser.add_argument('--dataset', help="directory for a bulk dataset instead of frames")
+    parser.add_argument('--count', type=int, default=1_000_000)
+    parser.add_argument('--format', choices=['npz', 'npy'], default='npz')
+    parser.add_argument('--shard-size', type=int, default=100_000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--phase', type=int, default=0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--noise', type=float, default=0.0)
+    parser.add_argument('--distractors', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.dataset:
+        count = bulk_generate(args.dataset, args.count, args.shard_size, args.workers, args.seed, args.format,
+                              phase=args.phase, jitter=args.jitter, noise=args.noise, distractors=args.distractors)
+        print(f"✅ Saved {count} labeled sequences to {args.dataset}")
+    else:
+        output_path = "assets/sos_sequence"
+        generate_sos_pattern(output_path)
+        print(f"✅ Saved {len(os.listdir(output_path))} SOS frames to {output_path}")
@@ -0,0 +1,312 @@
+import argparse
+import time
+import numpy as np
+from pathfinding import ReservationTable, space_time_astar, to_index, in_bounds
+from distance_field import DistanceFieldCache, compute_distance_field, terrain_fingerprint
+from terrain_generator import generate_terrain
+
+HASH_BUCKET = 4.0        # Spatial hash bucket edge, in cells; also the largest query radius
+NEIGHBOR_RADIUS = 3.0    # Drones this close (in cells) count as neighbors
+COLLISION_RADIUS = 0.5   # Drones closer than this are in the same cell
+
+# Bucket offsets that cover each unordered pair of neighboring buckets exactly once
+HALF_NEIGHBORHOOD = ((0, 0), (1, 0), (-1, 1), (0, 1), (1, 1))
+
+class SpatialHash:
+    # Uniform grid of buckets over drone positions, rebuilt every tick with one sort. Pair
+    # queries only compare drones in the same or adjacent buckets, so the cost grows with
+    # the number of drones plus close pairs rather than with all N^2 pairs.
+    def __init__(self, bucket=HASH_BUCKET):
+        self.bucket = bucket
+        self.positions = np.zeros((0, 2))
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.order = np.zeros(0, dtype=np.int64)
+
+    def key(self, bx, by):
+        return (by.astype(np.int64) << 32) + bx
+
+    def build(self, positions):
+        # positions: (N, 2) array of x, y in cells
+        self.positions = np.asarray(positions, dtype=np.float64)
+        buckets = np.floor(self.positions / self.bucket).astype(np.int64)
+        keys = self.key(buckets[:, 0], buckets[:, 1])
+        self.order = np.argsort(keys, kind='stable')
+        self.keys = keys[self.order]
+        self.buckets = buckets[self.order]
+
+    def pairs(self, radius):
+        # Every pair (i, j), i < j, of drones within radius of each other, with distances
+        if radius > self.bucket:
+            raise ValueError(f"radius {radius} exceeds the bucket size {self.bucket}")
+        n = len(self.keys)
+        firsts, seconds = [], []
+        for dx, dy in HALF_NEIGHBORHOOD:
+            target = self.key(self.buckets[:, 0] + dx, self.buckets[:, 1] + dy)
+            if (dx, dy) == (0, 0):
+                lo = np.arange(1, n + 1)  # Later drones in the same bucket only
+            else:
+                lo = np.searchsorted(self.keys, target, 'left')
+            hi = np.searchsorted(self.keys, target, 'right')
+            counts = np.maximum(hi - lo, 0)
+            total = int(counts.sum())
+            if not total:
+                continue
+            # Expand each drone's [lo, hi) run of candidates without a Python loop
+            first = np.repeat(np.arange(n), counts)
+            runs = np.cumsum(counts) - counts
+            second = np.repeat(lo, counts) + np.arange(total) - np.repeat(runs, counts)
+            firsts.append(first)
+            seconds.append(second)
+        if not firsts:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, np.zeros(0)
+        i = self.order[np.concatenate(firsts)]
+        j = self.order[np.concatenate(seconds)]
+        distance = np.hypot(*(self.positions[i] - self.positions[j]).T)
+        close = distance <= radius
+        i, j, distance = i[close], j[close], distance[close]
+        return np.minimum(i, j), np.maximum(i, j), distance
+
+    def query(self, point, radius):
+        # Indices of drones within radius of a point
+        if radius > self.bucket:
+            raise ValueError(f"radius {radius} exceeds the bucket size {self.bucket}")
+        bx, by = np.floor(np.asarray(point, dtype=np.float64) / self.bucket).astype(np.int64)
+        found = []
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                target = int(self.key(np.int64(bx + dx), np.int64(by + dy)))
+                lo, hi = np.searchsorted(self.keys, target, 'left'), np.searchsorted(self.keys, target, 'right')
+                found.append(self.order[lo:hi])
+        found = np.concatenate(found)
+        distance = np.hypot(*(self.positions[found] - point).T)
+        return found[distance <= radius]
+
+class Swarm:
+    # Many drones on one terrain. Paths are planned one drone at a time against a shared
+    # reservation table, so later drones route and wait around earlier ones. Per-tick
+    # state lives in arrays: paths[d, t] is drone d's flat cell index at tick t, padded
+    # with its last cell once it has arrived, and step() advances every drone at once.
+    def __init__(self, terrain, starts, goals, bucket=HASH_BUCKET):
+        self.terrain = terrain
+        self.rows, self.cols = np.shape(terrain)
+        self.width = self.cols + 2
+        self.starts = [tuple(map(int, s)) for s in starts]
+        self.goals = [tuple(map(int, g)) for g in goals]
+        self.count = len(self.starts)
+        self.reservations = ReservationTable()
+        self.hash = SpatialHash(bucket)
+        self.tick = 0
+        self.expanded = 0
+        self.planning_time = 0.0
+        self.routes = [None] * self.count       # Flat cells per tick from route_starts[d]
+        self.route_starts = np.zeros(self.count, dtype=np.int64)
+        self.failed = np.zeros(self.count, dtype=bool)
+        # One distance field per goal, reused by every plan and replan until the terrain changes
+        self.fields = DistanceFieldCache(maxsize=len(set(self.goals)))
+        self.fingerprint = terrain_fingerprint(terrain)
+        self.plan()
+
+    def plan(self):
+        # Everyone starts out holding their start cell, then plans
+        self.routes = [[to_index(start, self.width)] for start in self.starts]
+        self.replan(range(self.count))
+
+    def current(self, d):
+        # Drone d's flat cell at the current tick
+        route = self.routes[d]
+        return route[min(self.tick - int(self.route_starts[d]), len(route) - 1)]
+
+    def hold(self, d):
+        # Drone d gives up its future route and stays where it is for good
+        cell = self.current(d)
+        self.reservations.release(d, self.routes[d], int(self.route_starts[d]), self.tick)
+        self.routes[d] = [cell]
+        self.route_starts[d] = self.tick
+        self.reservations.reserve(d, self.routes[d], self.tick)
+
+    def crossing(self, d):
+        # Drones other than d whose routes pass through or end at d's cell after this tick
+        cell = self.current(d)
+        return [e for e in range(self.count) if e != d and any(
+            idx == cell for idx in self.routes[e][min(self.tick - int(self.route_starts[e]) + 1, len(self.routes[e]) - 1):])]
+
+    def replan(self, drones):
+        # Plans drones from where they are now, one at a time against the reservations.
+        # They hold their cells until they've planned, so nobody routes through a drone
+        # that hasn't moved yet. A drone that can't get out keeps holding and retries once
+        # the others have planned, and anyone whose route runs into it replans as well.
+        pending = list(drones)
+        for d in pending:
+            self.hold(d)
+        for _ in range(2 * self.count + 1):
+            retry = [d for d in pending if not self.plan_drone(d)]
+            blocked = sorted({e for d in retry for e in self.crossing(d)})
+            for e in blocked:
+                self.hold(e)
+            if not blocked and len(retry) == len(pending):
+                break
+            pending = retry + blocked
+        self.build_arrays()
+
+    def plan_drone(self, d):
+        # Replaces drone d's hold with a conflict-free route to its goal, if there is one
+        began = time.perf_counter()
+        cell = self.current(d)
+        y, x = divmod(cell, self.width)
+        field = self.fields.get(self.terrain, self.goals[d], fingerprint=self.fingerprint)
+        stats = {}
+        self.reservations.release(d, [cell], self.tick, self.tick)
+        path = space_time_astar(self.terrain, (x - 1, y - 1), self.goals[d], self.reservations, self.tick, d,
+                                field.distances, stats=stats)
+        self.expanded += stats.get('expanded', 0)
+        self.failed[d] = not path
+        self.routes[d] = [to_index(pos, self.width) for pos in path] or [cell]
+        self.route_starts[d] = self.tick
+        self.reservations.reserve(d, self.routes[d], self.tick)
+        self.planning_time += time.perf_counter() - began
+        return bool(path)
+
+    def build_arrays(self):
+        # (drones, ticks) table of flat cells from tick 0 to the last arrival
+        ends = self.route_starts + np.array([len(r) for r in self.routes])
+        horizon = int(ends.max())
+        self.paths = np.empty((self.count, horizon), dtype=np.int64)
+        for d, route in enumerate(self.routes):
+            s = self.route_starts[d]
+            if s:
+                self.paths[d, :s] = self.history[d, :s]
+            self.paths[d, s:s + len(route)] = route
+            self.paths[d, s + len(route):] = route[-1]
+        self.history = self.paths
+        self.arrival = ends - 1
+        self.update_state()
+
+    def update_state(self):
+        # Current cells, positions and arrival flags for every drone, vectorized
+        column = min(self.tick, self.paths.shape[1] - 1)
+        self.cells = self.paths[:, column]
+        y, x = np.divmod(self.cells, self.width)
+        self.positions = np.stack([x - 1, y - 1], axis=1).astype(np.float64)
+        self.arrived = self.tick >= self.arrival
+        self.hash.build(self.positions)
+
+    def positions_at(self, t):
+        # Positions between ticks (t may be fractional), for smooth drawing
+        base = int(np.floor(t))
+        a = self.paths[:, min(base, self.paths.shape[1] - 1)]
+        b = self.paths[:, min(base + 1, self.paths.shape[1] - 1)]
+        frac = t - base
+        ay, ax = np.divmod(a, self.width)
+        by, bx = np.divmod(b, self.width)
+        return np.stack([ax + (bx - ax) * frac - 1, ay + (by - ay) * frac - 1], axis=1)
+
+    def step(self):
+        # Advances every drone one tick; returns False once all have arrived
+        if self.arrived.all():
+            return False
+        self.tick += 1
+        self.update_state()
+        return True
+
+    def neighbors(self, radius=NEIGHBOR_RADIUS):
+        i, j, _ = self.hash.pairs(radius)
+        return i, j
+
+    def collisions(self):
+        # Pairs of drones sharing a cell this tick (none, if the reservations held)
+        i, j, _ = self.hash.pairs(COLLISION_RADIUS)
+        return i, j
+
+    def report_obstacle(self, pos):
+        # A newly found obstacle: drones whose remaining route crosses it replan from where
+        # they are now, around everyone else's reservations. A cell with a drone in it is
+        # evidently not an obstacle and is ignored.
+        x, y = pos
+        if not in_bounds(pos, self.rows, self.cols):
+            return []
+        idx = to_index(pos, self.width)
+        if (self.cells == idx).any():
+            return []
+        self.terrain[y][x] = 1
+        self.fingerprint = terrain_fingerprint(self.terrain)
+        self.fields.clear()  # Fields for the old terrain can't come back
+        affected = np.flatnonzero((self.paths[:, self.tick:] == idx).any(axis=1))
+        if len(affected):
+            self.replan(affected)
+        return list(affected)
+
+    def run(self, max_ticks=None):
+        # Flies every drone to its goal, checking collisions each tick
+        max_ticks = max_ticks or self.paths.shape[1]
+        collisions = 0
+        began = time.perf_counter()
+        while self.tick < max_ticks and self.step():
+            collisions += len(self.collisions()[0])
+        return {
+            'drones': self.count,
+            'failed': int(self.failed.sum()),
+            'ticks': self.tick,
+            'collisions': collisions,
+            'expanded': self.expanded,
+            'planning_time': self.planning_time,
+            'tick_time': (time.perf_counter() - began) / max(self.tick, 1),
+        }
+
+def random_swarm(size, drones, obstacle_prob=0.2, seed=None):
+    # Drones start packed into the bottom-left corner and search distinct random goals
+    # reachable from there
+    rng = np.random.default_rng(seed)
+    terrain = generate_terrain(size, size, obstacle_prob=obstacle_prob, seed=rng)
+    side = int(np.ceil(np.sqrt(drones)))
+    starts = [(i % side, i // side) for i in range(drones)]
+    terrain[:side, :side] = 0
+    field = compute_distance_field(terrain, starts[0])
+    taken = set(starts)
+    goals = []
+    for idx in rng.permutation(np.flatnonzero(np.isfinite(field.as_array()).ravel())):
+        pos = (int(idx % size), int(idx // size))
+        if pos not in taken:
+            goals.append(pos)
+            taken.add(pos)
+            if len(goals) == drones:
+                return terrain, starts, goals
+    raise ValueError(f"Only {len(goals)} reachable goals for {drones} drones")
+
+def naive_pairs(positions, radius):
+    # All-pairs reference for the spatial hash
+    diff = positions[:, None, :] - positions[None, :, :]
+    i, j = np.nonzero(np.triu(np.hypot(diff[..., 0], diff[..., 1]) <= radius, 1))
+    return i, j
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fly a swarm of drones with cooperative planning")
+    parser.add_argument('--drones', type=int, nargs='+', default=[10, 50, 100, 200])
+    parser.add_argument('--size', type=int, default=128)
+    parser.add_argument('--obstacles', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    print(f"{'drones':>7} {'failed':>7} {'ticks':>6} {'collide':>8} {'plan s':>8} {'tick ms':>8} "
+          f"{'hash ms':>8} {'all-pairs ms':>13}")
+    for drones in args.drones:
+        terrain, starts, goals = random_swarm(args.size, drones, args.obstacles, args.seed)
+        swarm = Swarm(terrain, starts, goals)
+        result = swarm.run()
+        # Neighbor queries at the busiest tick (the start), hashed vs all pairs
+        positions = swarm.positions_at(0)
+        began = time.perf_counter()
+        for _ in range(20):
+            swarm.hash.build(positions)
+            swarm.hash.pairs(NEIGHBOR_RADIUS)
+        hashed = (time.perf_counter() - began) / 20
+        began = time.perf_counter()
+        for _ in range(20):
+            naive_pairs(positions, NEIGHBOR_RADIUS)
+        naive = (time.perf_counter() - began) / 20
+        print(f"{drones:>7} {result['failed']:>7} {result['ticks']:>6} {result['collisions']:>8} "
+              f"{result['planning_time']:>8.2f} {result['tick_time'] * 1000:>8.3f} {hashed * 1000:>8.3f} "
+              f"{naive * 1000:>13.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,100 @@
+import functools
 import numpy as np
-import random
-
-def generate_terrain(width, height, obstacle_prob=0.2):
-    terrain = np.zeros((height, width), dtype=int)
-    for y in range(height):
-        for x in range(width):
-            if random.random() < obstacle_prob:
-                terrain[y][x] = 1  # Obstacle
-    return terrain
\ No newline at end of file
+
+# Obstacle layouts: independent cells, clustered tree stands, or long ridge lines
+OBSTACLE_MODELS = ('uniform', 'forest', 'ridges')
+FOREST_SCALE = 12
+RIDGE_SCALE = 24
+DEFAULT_TILE = 1024
+
+def generate_terrain(width, height, obstacle_prob=0.2, seed=None, model='uniform', packed=False):
+    # seed: None, an int, or a np.random.Generator to draw from
+    rng = np.random.default_rng(seed)
+    noise_seed = int(rng.integers(2**32))
+    terrain = obstacle_mask(0, 0, width, height, obstacle_prob, rng, noise_seed, model).view(np.uint8)
+    return pack_terrain(terrain) if packed else terrain
+
+def generate_terrain_tiled(width, height, path, obstacle_prob=0.2, seed=0, model='uniform', tile_size=DEFAULT_TILE):
+    # Writes the terrain to a memory-mapped .npy one tile at a time, so maps far
+    # larger than RAM can be built and then opened with np.load(path, mmap_mode='r')
+    terrain = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=(height, width))
+    for x0, y0, tile in iter_terrain_tiles(width, height, obstacle_prob, seed, model, tile_size):
+        terrain[y0:y0 + tile.shape[0], x0:x0 + tile.shape[1]] = tile
+    terrain.flush()
+    return terrain
+
+def iter_terrain_tiles(width, height, obstacle_prob=0.2, seed=0, model='uniform', tile_size=DEFAULT_TILE):
+    # Yields (x0, y0, tile). Each tile depends only on the seed and its position, so
+    # tiles can be produced in any order, in parallel, or regenerated on demand
+    for y0 in range(0, height, tile_size):
+        for x0 in range(0, width, tile_size):
+            yield x0, y0, terrain_tile(x0, y0, min(tile_size, width - x0), min(tile_size, height - y0),
+                                       obstacle_prob, seed, model)
+
+def terrain_tile(x0, y0, width, height, obstacle_prob=0.2, seed=0, model='uniform'):
+    rng = np.random.default_rng([seed, x0, y0])
+    return obstacle_mask(x0, y0, width, height, obstacle_prob, rng, seed, model).view(np.uint8)
+
+def obstacle_mask(x0, y0, width, height, obstacle_prob, rng, noise_seed, model='uniform'):
+    if model == 'uniform':
+        return rng.random((height, width), dtype=np.float32) < obstacle_prob
+    if model not in OBSTACLE_MODELS:
+        raise ValueError(f"Unknown obstacle model '{model}', expected one of {OBSTACLE_MODELS}")
+    jitter = rng.random((height, width), dtype=np.float32)
+    return model_field(model, x0, y0, width, height, noise_seed, jitter) > model_threshold(model, obstacle_prob)
+
+def model_field(model, x0, y0, width, height, noise_seed, jitter):
+    # Continuous score per cell; the highest-scoring cells become obstacles
+    if model == 'forest':
+        stands = value_noise(x0, y0, width, height, FOREST_SCALE, noise_seed)
+        return stands + 0.25 * jitter
+    ridge = value_noise(x0, y0, width, height, RIDGE_SCALE, noise_seed)
+    # Ridged noise peaks along the contour where the smooth noise crosses 0.5
+    return 1 - np.abs(2 * ridge - 1) + 0.1 * jitter
+
+@functools.lru_cache(maxsize=None)
+def model_threshold(model, obstacle_prob):
+    # Score cut-off that gives roughly obstacle_prob coverage, calibrated once on a
+    # fixed reference patch so every tile of a map uses the same threshold
+    rng = np.random.default_rng(0)
+    jitter = rng.random((256, 256), dtype=np.float32)
+    field = model_field(model, 0, 0, 256, 256, 0, jitter)
+    return float(np.quantile(field, 1 - obstacle_prob))
+
+def value_noise(x0, y0, width, height, scale, seed):
+    # Smoothly interpolated lattice noise in [0, 1). Lattice values come from a hash of
+    # their global coordinates, so neighbouring tiles line up without seams
+    if not width or not height:
+        return np.zeros((height, width), dtype=np.float32)  # No lattice to index
+    xs = (x0 + np.arange(width)) / scale
+    ys = (y0 + np.arange(height)) / scale
+    ix, iy = np.floor(xs).astype(np.int64), np.floor(ys).astype(np.int64)
+    fx, fy = smoothstep(xs - ix), smoothstep(ys - iy)
+    lattice = lattice_values(np.arange(ix[0], ix[-1] + 2), np.arange(iy[0], iy[-1] + 2), seed)
+    cx, cy = ix - ix[0], iy - iy[0]
+    top = lattice[cy][:, cx] * (1 - fx) + lattice[cy][:, cx + 1] * fx
+    bottom = lattice[cy + 1][:, cx] * (1 - fx) + lattice[cy + 1][:, cx + 1] * fx
+    return (top * (1 - fy)[:, None] + bottom * fy[:, None]).astype(np.float32)
+
+def lattice_values(lx, ly, seed):
+    with np.errstate(over='ignore'):
+        h = (lx[None, :].astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+             ^ ly[:, None].astype(np.uint64) * np.uint64(0xC2B2AE3D27D4EB4F)
+             ^ np.uint64(seed) * np.uint64(0x165667B19E3779F9))
+        # splitmix64 finalizer
+        h ^= h >> np.uint64(30)
+        h *= np.uint64(0xBF58476D1CE4E5B9)
+        h ^= h >> np.uint64(27)
+        h *= np.uint64(0x94D049BB133111EB)
+        h ^= h >> np.uint64(31)
+    return (h >> np.uint64(11)).astype(np.float64) * 2.0**-53
+
+def smoothstep(t):
+    return t * t * (3 - 2 * t)
+
+def pack_terrain(terrain):
+    # 1 bit per cell, rows padded to whole bytes
+    return np.packbits(np.asarray(terrain, dtype=bool), axis=1)
+
+def unpack_terrain(packed, width):
+    return np.unpackbits(packed, axis=1, count=width)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules are flat files one level up, imported the same way the ui scripts do
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
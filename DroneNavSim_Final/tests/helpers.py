@@ -0,0 +1,58 @@
+import heapq
+import math
+import numpy as np
+import pytest
+from terrain_generator import generate_terrain
+
+def random_grid(seed, size=40, obstacle_prob=0.3):
+    grid = generate_terrain(size, size, obstacle_prob=obstacle_prob, seed=np.random.default_rng(seed))
+    grid[0][0] = grid[-1][-1] = 0
+    return grid
+
+def reference_cost(grid, start, goal, diagonal=False, cost_grid=None):
+    # Plain Dijkstra over (x, y) tuples with the same rules as astar: entering a cell
+    # costs step * cost, and diagonal moves may not cut past an obstacle
+    rows, cols = grid.shape
+    moves = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+    if diagonal:
+        moves += [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+    best = {start: 0.0}
+    queue = [(0.0, start)]
+    while queue:
+        d, (x, y) = heapq.heappop(queue)
+        if (x, y) == goal:
+            return d
+        if d > best[(x, y)]:
+            continue
+        for dx, dy in moves:
+            nx, ny = x + dx, y + dy
+            if not (0 <= nx < cols and 0 <= ny < rows) or grid[ny][nx]:
+                continue
+            if dx and dy and (grid[y][nx] or grid[ny][x]):
+                continue
+            step = math.sqrt(2) if dx and dy else 1.0
+            nd = d + step * (cost_grid[ny][nx] if cost_grid is not None else 1.0)
+            if nd < best.get((nx, ny), math.inf):
+                best[(nx, ny)] = nd
+                heapq.heappush(queue, (nd, (nx, ny)))
+    return None
+
+def path_cost(grid, path, diagonal=False, cost_grid=None):
+    # Checks every step is a legal move and returns the path's cost
+    total = 0.0
+    for (x0, y0), (x1, y1) in zip(path, path[1:]):
+        dx, dy = x1 - x0, y1 - y0
+        assert max(abs(dx), abs(dy)) == 1 and grid[y1][x1] == 0
+        if dx and dy:
+            assert diagonal and not grid[y0][x1] and not grid[y1][x0]
+        step = math.sqrt(2) if dx and dy else 1.0
+        total += step * (cost_grid[y1][x1] if cost_grid is not None else 1.0)
+    return total
+
+def check_optimal(grid, path, start, goal, diagonal=False, cost_grid=None):
+    expected = reference_cost(grid, start, goal, diagonal, cost_grid)
+    if expected is None:
+        assert path == []
+    else:
+        assert path[0] == start and path[-1] == goal
+        assert path_cost(grid, path, diagonal, cost_grid) == pytest.approx(expected)
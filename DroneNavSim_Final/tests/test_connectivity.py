@@ -0,0 +1,67 @@
+from collections import deque
+import numpy as np
+import pytest
+from connectivity import ConnectivityIndex, label_components
+from helpers import random_grid
+
+def bfs_labels(grid):
+    # Reference 4-connected labelling, one breadth-first search per component
+    rows, cols = grid.shape
+    labels = np.zeros((rows, cols), dtype=int)
+    count = 0
+    for y in range(rows):
+        for x in range(cols):
+            if grid[y][x] or labels[y, x]:
+                continue
+            count += 1
+            labels[y, x] = count
+            queue = deque([(x, y)])
+            while queue:
+                cx, cy = queue.popleft()
+                for nx, ny in ((cx + 1, cy), (cx - 1, cy), (cx, cy + 1), (cx, cy - 1)):
+                    if 0 <= nx < cols and 0 <= ny < rows and not grid[ny][nx] and not labels[ny, nx]:
+                        labels[ny, nx] = count
+                        queue.append((nx, ny))
+    return labels, count
+
+def assert_same_partition(labels, expected):
+    # Same obstacles, and the labels map one to one onto the reference's
+    assert np.array_equal(labels == 0, expected == 0)
+    pairs = np.unique(np.stack([labels[expected > 0], expected[expected > 0]]), axis=1)
+    assert len(np.unique(pairs[0])) == len(np.unique(pairs[1])) == pairs.shape[1]
+
+def index_labels(index):
+    return np.array([[index.component((x, y)) for x in range(index.cols)] for y in range(index.rows)])
+
+@pytest.mark.parametrize('seed', range(6))
+@pytest.mark.parametrize('obstacle_prob', [0.1, 0.4, 0.6])
+def test_label_components_matches_bfs(seed, obstacle_prob):
+    grid = random_grid(seed, obstacle_prob=obstacle_prob)
+    labels, count = label_components(grid)
+    expected, expected_count = bfs_labels(grid)
+    assert count == expected_count
+    assert_same_partition(labels, expected)
+
+@pytest.mark.parametrize('seed', range(6))
+def test_index_tracks_random_edits(seed):
+    grid = random_grid(seed, obstacle_prob=0.4)
+    index = ConnectivityIndex(grid)
+    rng = np.random.default_rng(seed)
+    for _ in range(20):
+        changes = [((x, y), int(rng.random() < 0.6)) for x, y in rng.integers(0, 40, (10, 2)).tolist()]
+        index.update_cells(changes)
+        expected = bfs_labels(grid)[0]
+        assert_same_partition(index_labels(index), expected)
+    assert index.connected((0, 0), (39, 39)) == (expected[0, 0] == expected[39, 39] != 0)
+
+def test_wall_splitting_two_large_halves_relabels():
+    # Both halves are past the flood budget, so the split falls back to a full relabel
+    grid = np.zeros((100, 100), dtype=np.uint8)
+    index = ConnectivityIndex(grid)
+    index.update_cells([((50, y), 1) for y in range(99)])
+    assert index.connected((0, 0), (99, 0)) and index.relabels == 1
+    index.update_cells([((50, 99), 1)])
+    assert not index.connected((0, 0), (99, 0))
+    assert index.relabels == 2
+    index.update_cells([((50, 40), 0)])
+    assert index.connected((0, 0), (99, 0))
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from distance_field import DistanceFieldCache, compute_distance_field, terrain_fingerprint
+from incremental_planner import DStarLite
+from helpers import random_grid, reference_cost, check_optimal
+
+@pytest.mark.parametrize('seed', range(6))
+@pytest.mark.parametrize('diagonal', [False, True])
+def test_field_matches_reference(seed, diagonal):
+    grid = random_grid(seed)
+    field = compute_distance_field(grid, (39, 39), diagonal)
+    for start in [(0, 0), (20, 5), (3, 30)]:
+        expected = reference_cost(grid, start, (39, 39), diagonal)
+        if grid[start[1]][start[0]] or expected is None:
+            assert not field.reachable(start)
+            continue
+        assert field.distance(start) == pytest.approx(expected)
+        check_optimal(grid, field.path_from(start), start, (39, 39), diagonal)
+
+def test_cache_reuses_fields_by_fingerprint():
+    grid = random_grid(0)
+    cache = DistanceFieldCache(maxsize=2)
+    fingerprint = terrain_fingerprint(grid)
+    first = cache.get(grid, (39, 39), fingerprint=fingerprint)
+    assert cache.get(grid, (39, 39), fingerprint=fingerprint) is first
+    assert (cache.hits, cache.misses) == (1, 1)
+    changed = np.array(grid)
+    changed[0][1] = 1 - changed[0][1]
+    assert terrain_fingerprint(changed) != fingerprint
+    assert cache.get(changed, (39, 39)) is not first
+
+@pytest.mark.parametrize('seed', range(6))
+def test_seeded_dstar_lite_matches_a_fresh_search(seed):
+    grid = random_grid(seed, obstacle_prob=0.2)
+    field = compute_distance_field(grid, (39, 39))
+    seeded = DStarLite(grid, (0, 0), (39, 39), field.distances)
+    fresh = DStarLite(grid, (0, 0), (39, 39))
+    assert len(seeded.path()) == len(fresh.path())
+    assert seeded.expanded == 0
+    # Repairs after a change work the same from a seeded start
+    path = fresh.path()
+    if len(path) > 4:
+        change = [(path[len(path) // 2], 1)]
+        seeded.update_cells(change)
+        fresh.update_cells(change)
+        assert len(seeded.path()) == len(fresh.path())
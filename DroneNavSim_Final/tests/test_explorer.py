@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from connectivity import ConnectivityIndex
+from explorer import CoverageExplorer, rescan_frontier
+from mission import SearchMission
+from helpers import random_grid
+
+@pytest.mark.parametrize('seed', range(6))
+@pytest.mark.parametrize('radius', [1, 3])
+def test_sweep_keeps_frontier_exact_and_sees_every_reachable_cell(seed, radius):
+    grid = random_grid(seed, size=32)
+    explorer = CoverageExplorer(grid, (0, 0), radius)
+    while explorer.step() is not None:
+        # The incremental frontier matches a whole-map rescan after every step
+        frontier = rescan_frontier(explorer.sensed, explorer.free)
+        assert np.array_equal(explorer.frontier[1:-1, 1:-1], frontier)
+        assert explorer.frontier_count == frontier.sum()
+        assert explorer.seen_count == explorer.sensed[1:-1, 1:-1].sum()
+        assert grid[explorer.pos[1]][explorer.pos[0]] == 0
+    reachable = ConnectivityIndex(np.array(grid)).component_mask((0, 0))
+    assert explorer.sensed[1:-1, 1:-1][reachable].all()
+
+def test_rejects_a_footprint_too_small_to_reveal_anything():
+    grid = random_grid(0, size=16)
+    with pytest.raises(ValueError):
+        CoverageExplorer(grid, (0, 0), radius=0)
+    with pytest.raises(ValueError):
+        SearchMission(seed=3, radius=0, detector=lambda: (True, 1.0))
+
+@pytest.mark.parametrize('seed', range(8))
+@pytest.mark.parametrize('found', [True, False])
+def test_search_mission_hands_off_once_the_goal_is_in_view(seed, found):
+    calls = []
+
+    def detector():
+        calls.append(1)
+        return found, 0.9 if found else 0.1
+
+    mission = SearchMission(seed=seed, radius=2, detector=detector)
+    # The detector runs exactly when the beacon first comes into the camera footprint
+    while mission.step():
+        assert not mission.explorer.seen(mission.goal) and not calls
+    assert mission.explorer.seen(mission.goal) and calls == [1]
+    metrics = mission.metrics()
+    assert metrics['reached_goal'] and metrics['detected'] == metrics['success'] == found
+    assert 0 < metrics['coverage'] <= 1 and metrics['planned_length'] == -1
@@ -0,0 +1,15 @@
+import numpy as np
+import pytest
+from frame_ingest import load_brightness
+
+@pytest.mark.parametrize('reduce', [1, 2, 4])
+@pytest.mark.parametrize('color', [False, True])
+def test_stacks_honor_num_frames_and_reduce(tmp_path, reduce, color):
+    rng = np.random.default_rng(reduce)
+    frames = rng.integers(0, 256, (12, 16, 16, 3) if color else (12, 16, 16), dtype=np.uint8)
+    path = str(tmp_path / 'stack.npy')
+    np.save(path, frames)
+    values = load_brightness(path, num_frames=5, reduce=reduce)
+    sampled = frames[:5, ::reduce, ::reduce].astype(np.float64)
+    expected = sampled.mean(axis=(1, 2)) @ [0.114, 0.587, 0.299] if color else sampled.mean(axis=(1, 2))
+    assert values == pytest.approx(expected.tolist())
@@ -0,0 +1,49 @@
+import numpy as np
+import pygame
+import pytest
+from grid_renderer import GridRenderer
+from helpers import random_grid
+
+def renderer(size, view):
+    surface = pygame.Surface((view, view))
+    grid = random_grid(0, size=size)
+    renderer = GridRenderer(surface, grid, 19, gap=1, view_size=(view, view))
+    renderer.add_layer('drone', (0, 0, 255), marker=True)
+    renderer.set_offset(0, 0, redraw=False)  # Top-left corner, or centered if the map is smaller
+    renderer.draw()
+    renderer.flush()
+    return surface, renderer
+
+def pixels(surface):
+    return pygame.surfarray.array3d(surface).copy()
+
+@pytest.mark.parametrize('size, view', [(40, 200), (8, 400)])
+def test_zoom_redraws_when_the_offset_stays_put(size, view):
+    # (40, 200): zooming at the top-left corner keeps offset (0, 0);
+    # (8, 400): the map is smaller than the view and stays centered
+    surface, r = renderer(size, view)
+    before, offset = pixels(surface), r.offset
+    assert r.zoom_by(1, focus=(0, 0))
+    assert r.scale == 40 and (r.offset == offset or size == 8)
+    assert r.flush() == [r.view]
+    assert not np.array_equal(pixels(surface), before)
+    # Already at the deepest zoom: nothing changes, nothing is repainted
+    assert not r.zoom_by(1, focus=(0, 0))
+    assert r.flush() == []
+
+def test_zoom_keeps_the_focus_cell_in_place():
+    surface, r = renderer(200, 200)
+    r.center_on((100, 100))
+    r.flush()
+    focus = (60, 80)
+    cell = ((r.offset[0] + focus[0]) // r.scale, (r.offset[1] + focus[1]) // r.scale)
+    r.zoom_by(-1, focus)
+    assert ((r.offset[0] + focus[0]) // r.scale, (r.offset[1] + focus[1]) // r.scale) == cell
+
+def test_layer_changes_repaint_only_their_cells():
+    surface, r = renderer(40, 200)
+    r.set_cells('drone', [(2, 3)])
+    dirty = r.flush()
+    assert dirty and all(rect.w < 50 and rect.h < 50 for rect in dirty)
+    assert dirty[0].collidepoint(r.cell_rect((2, 3)).center)
+    assert tuple(surface.get_at(r.cell_rect((2, 3)).center))[:3] == (0, 0, 255)
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from hierarchical_planner import HierarchicalPlanner
+from instrumentation import metrics
+from pathfinding import plan_path
+from helpers import random_grid, reference_cost, path_cost
+
+def check_near_optimal(grid, path, start, goal):
+    # HPA* paths are legal and reach the goal whenever it is reachable, but may be longer
+    expected = reference_cost(grid, start, goal)
+    if expected is None:
+        assert path == []
+        return
+    assert path[0] == start and path[-1] == goal
+    assert expected <= path_cost(grid, path, False, None) <= expected * 1.5
+
+@pytest.mark.parametrize('seed', range(6))
+@pytest.mark.parametrize('cluster_size', [8, 16])
+def test_paths_are_legal_and_near_optimal(seed, cluster_size):
+    grid = random_grid(seed, size=48, obstacle_prob=0.2)
+    planner = HierarchicalPlanner(grid, cluster_size)
+    for start, goal in [((0, 0), (47, 47)), ((5, 40), (40, 3)), ((10, 10), (12, 13))]:
+        if grid[start[1]][start[0]]:
+            continue
+        check_near_optimal(grid, planner.find_path(start, goal), start, goal)
+
+@pytest.mark.parametrize('seed', range(6))
+def test_update_cells_matches_a_fresh_planner(seed):
+    grid = random_grid(seed, size=48, obstacle_prob=0.2)
+    planner = HierarchicalPlanner(grid, 16)
+    rng = np.random.default_rng(seed)
+    changed = np.array(grid)
+    changes = []
+    for x, y in rng.integers(1, 47, (30, 2)).tolist():
+        value = 1 - int(changed[y][x])
+        changed[y][x] = value
+        changes.append(((x, y), value))
+    # Border cells too, so entrances get rebuilt
+    for x, y in [(15, 20), (16, 20), (30, 31), (30, 32)]:
+        changed[y][x] = 1
+        changes.append(((x, y), 1))
+    planner.update_cells(changes)
+    fresh = HierarchicalPlanner(changed, 16)
+    assert planner.find_path((0, 0), (47, 47)) == fresh.find_path((0, 0), (47, 47))
+    check_near_optimal(changed, planner.find_path((0, 0), (47, 47)), (0, 0), (47, 47))
+
+def test_update_cells_leaves_the_callers_grid_alone():
+    grid = random_grid(0, size=48)
+    before = grid.copy()
+    HierarchicalPlanner(grid, 16).update_cells([((20, 20), 1 - int(grid[20][20]))])
+    assert np.array_equal(grid, before)
+
+def test_plan_path_runs_hpa():
+    grid = random_grid(2, size=48, obstacle_prob=0.15)
+    stats = {}
+    path = plan_path(grid, (0, 0), (47, 47), 'hpa', stats=stats, cluster_size=16)
+    check_near_optimal(grid, path, (0, 0), (47, 47))
+    assert stats['expanded'] > 0
+
+def test_metrics_count_refinement_searches_once(monkeypatch):
+    # The A* runs refining each hop belong to the HPA* query, not to the astar series
+    monkeypatch.setattr(metrics, 'enabled', True)
+    grid = random_grid(4, size=48, obstacle_prob=0.15)
+    hpa_total = metrics.counter('search_expanded_total', planner='hpa')
+    astar_total = metrics.counter('search_expanded_total', planner='astar')
+    before = hpa_total.value, astar_total.value
+    stats = {}
+    path = plan_path(grid, (0, 0), (47, 47), 'hpa', stats=stats, cluster_size=16)
+    check_near_optimal(grid, path, (0, 0), (47, 47))
+    assert astar_total.value == before[1]
+    assert hpa_total.value - before[0] == stats['expanded'] > 0
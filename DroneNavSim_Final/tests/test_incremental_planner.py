@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from incremental_planner import DStarLite
+from helpers import random_grid, check_optimal
+
+@pytest.mark.parametrize('seed', range(8))
+def test_first_path_matches_reference(seed):
+    grid = random_grid(seed)
+    planner = DStarLite(grid, (0, 0), (39, 39))
+    check_optimal(grid, planner.path(), (0, 0), (39, 39))
+
+@pytest.mark.parametrize('seed', range(8))
+def test_repairs_match_reference_while_flying(seed):
+    # Fly towards the goal while cells get blocked and cleared; every repaired path
+    # must be as short as a search from scratch on the changed grid
+    grid = random_grid(seed, obstacle_prob=0.2)
+    rng = np.random.default_rng(seed)
+    planner = DStarLite(grid, (0, 0), (39, 39))
+    pos = (0, 0)
+    for _ in range(30):
+        path = planner.path()
+        check_optimal(grid, path, pos, (39, 39))
+        if len(path) < 2:
+            break
+        pos = planner.next_step()
+        assert pos == path[1]
+        planner.move_to(pos)
+        changes = []
+        for x, y in rng.integers(0, 40, (4, 2)).tolist():
+            if (x, y) not in (pos, (39, 39)):
+                grid[y][x] = 1 - grid[y][x]
+                changes.append(((x, y), int(grid[y][x])))
+        ahead = path[2:-1]
+        if ahead:
+            x, y = ahead[rng.integers(len(ahead))]
+            grid[y][x] = 1
+            changes.append(((x, y), 1))
+        planner.update_cells(changes)
+
+def test_cut_off_goal_has_no_path():
+    grid = np.zeros((5, 5), dtype=np.uint8)
+    planner = DStarLite(grid, (0, 0), (4, 4))
+    assert len(planner.path()) == 9
+    planner.update_cells([((3, 4), 1), ((4, 3), 1)])
+    assert planner.path() == []
+    assert planner.next_step() is None
+    planner.update_cells([((3, 4), 0)])
+    assert len(planner.path()) == 9
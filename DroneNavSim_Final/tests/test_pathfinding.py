@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from instrumentation import metrics
+from pathfinding import astar, jps, plan_path
+from helpers import random_grid, check_optimal
+
+@pytest.mark.parametrize('seed', range(8))
+@pytest.mark.parametrize('diagonal', [False, True])
+def test_astar_matches_reference(seed, diagonal):
+    grid = random_grid(seed)
+    path = astar(grid, (0, 0), (39, 39), diagonal=diagonal)
+    check_optimal(grid, path, (0, 0), (39, 39), diagonal)
+
+@pytest.mark.parametrize('seed', range(4))
+def test_astar_weighted_costs(seed):
+    grid = random_grid(seed, obstacle_prob=0.2)
+    cost_grid = np.random.default_rng(seed).uniform(1.0, 5.0, grid.shape)
+    path = astar(grid, (0, 0), (39, 39), diagonal=True, cost_grid=cost_grid)
+    check_optimal(grid, path, (0, 0), (39, 39), True, cost_grid)
+
+def test_astar_rejects_blocked_and_out_of_bounds_goals():
+    grid = np.zeros((5, 5), dtype=np.uint8)
+    grid[4][4] = 1
+    assert astar(grid, (0, 0), (4, 4)) == []
+    assert astar(grid, (0, 0), (5, 0)) == []
+    assert astar(grid, (2, 2), (2, 2)) == [(2, 2)]
+
+@pytest.mark.parametrize('seed', range(10))
+@pytest.mark.parametrize('obstacle_prob', [0.0, 0.15, 0.3])
+def test_jps_matches_reference(seed, obstacle_prob):
+    grid = random_grid(seed, obstacle_prob=obstacle_prob)
+    stats = {}
+    path = jps(grid, (0, 0), (39, 39), stats=stats)
+    check_optimal(grid, path, (0, 0), (39, 39))
+    assert stats['expanded'] <= stats['scanned']
+
+def test_plan_path_dispatches_by_name():
+    grid = random_grid(1, obstacle_prob=0.1)
+    assert len(plan_path(grid, (0, 0), (39, 39), 'jps')) == len(plan_path(grid, (0, 0), (39, 39)))
+    with pytest.raises(ValueError):
+        plan_path(grid, (0, 0), (39, 39), 'dijkstra')
+
+def test_instrumented_search_takes_stats_either_way(monkeypatch):
+    monkeypatch.setattr(metrics, 'enabled', True)
+    grid = random_grid(3, obstacle_prob=0.1)
+    expanded = metrics.counter('search_expanded_total', planner='astar')
+    before = expanded.value
+    positional, by_name = {}, {}
+    astar(grid, (0, 0), (39, 39), False, None, positional)
+    astar(grid, (0, 0), (39, 39), stats=by_name)
+    path = astar(grid, (0, 0), (39, 39))
+    check_optimal(grid, path, (0, 0), (39, 39))
+    assert positional['expanded'] == by_name['expanded'] > 0
+    assert expanded.value - before == 3 * positional['expanded']
@@ -0,0 +1,62 @@
+import os
+import warnings
+import numpy as np
+import pytest
+from matched_filter import MatchedFilterClassifier
+from sos_detector import load_model
+from strobe_simulator import SOS_PATTERN, labeled_batch
+from streaming_detector import WINDOW, StreamingSOSDetector, classify_windows
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'models', 'sos_classifier.pkl')
+
+@pytest.fixture(scope='module')
+def model():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # The pickle may come from another scikit-learn version
+        return load_model(MODEL_PATH)
+
+def flight_stream(seed):
+    # Noisy sky with the SOS pattern dropped in at a couple of arbitrary frames
+    rng = np.random.default_rng(seed)
+    pattern = np.asarray(SOS_PATTERN, dtype=np.float64) * 255.0
+    parts = [rng.uniform(0, 40, rng.integers(0, 150))]
+    for _ in range(2):
+        parts += [pattern + rng.uniform(-20, 0, WINDOW), rng.uniform(0, 120, rng.integers(60, 200))]
+    return np.clip(np.concatenate(parts), 0, 255)
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('stride', [1, 7])
+def test_stream_confidences_match_batch(model, seed, stride):
+    # With no threshold or cooldown, every classified window becomes an event
+    stream = flight_stream(seed)
+    detector = StreamingSOSDetector(model, stride=stride, cooldown=0, threshold=0.0)
+    events = detector.feed(stream)
+    expected = classify_windows(model, stream)
+    starts = [start for start in range(len(expected)) if (start + WINDOW - 1) % stride == 0]
+    assert [event.start for event in events] == starts
+    assert np.allclose([event.confidence for event in events], expected[starts])
+
+@pytest.mark.parametrize('seed', range(4))
+def test_stream_events_follow_batch_windows(model, seed):
+    stream = flight_stream(seed)
+    detector = StreamingSOSDetector(model)
+    events = detector.feed(stream)
+    # Reference: first window over the threshold, then skip the cooldown
+    probability = classify_windows(model, stream)
+    expected, start = [], 0
+    while start < len(probability):
+        if probability[start] >= 0.5:
+            expected.append(start)
+            start += WINDOW
+        else:
+            start += 1
+    assert [event.start for event in events] == expected
+    assert len(expected) >= 2
+    assert all(event.frame == event.start + WINDOW - 1 for event in events)
+
+def test_matched_filter_agrees_with_model(model):
+    X, _ = labeled_batch(np.random.default_rng(0), 400)
+    windows = np.concatenate([X, np.lib.stride_tricks.sliding_window_view(flight_stream(0), WINDOW)])
+    fast = MatchedFilterClassifier(model)
+    assert np.array_equal(fast.predict(windows), model.predict(windows))
+    assert fast.stats['flat'] + fast.stats['matched'] > 0
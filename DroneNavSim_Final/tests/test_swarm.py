@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from distance_field import compute_distance_field
+from pathfinding import ReservationTable, space_time_astar, to_index
+from swarm import Swarm, random_swarm
+from helpers import random_grid, check_optimal
+
+def check_conflict_free(swarm):
+    # Every tick each drone waits or takes one 4-connected step onto a free cell, no two
+    # drones share a cell, and no two swap places
+    paths, width = swarm.paths, swarm.width
+    y, x = np.divmod(paths, width)
+    assert not swarm.terrain[y[:, swarm.tick:] - 1, x[:, swarm.tick:] - 1].any()
+    steps = np.abs(np.diff(x, axis=1)) + np.abs(np.diff(y, axis=1))
+    assert (steps <= 1).all()
+    for t in range(paths.shape[1]):
+        assert len(np.unique(paths[:, t])) == swarm.count
+        if t:
+            moved = {(a, b) for a, b in zip(paths[:, t - 1].tolist(), paths[:, t].tolist()) if a != b}
+            assert not any((b, a) in moved for a, b in moved)
+
+@pytest.mark.parametrize('seed', range(6))
+@pytest.mark.parametrize('with_field', [False, True])
+def test_single_drone_matches_reference(seed, with_field):
+    # With nobody else around, space-time A* never waits and finds a shortest path
+    grid = random_grid(seed, obstacle_prob=0.2)
+    distances = compute_distance_field(grid, (39, 39)).distances if with_field else None
+    path = space_time_astar(grid, (0, 0), (39, 39), ReservationTable(), distances=distances, max_time=400)
+    check_optimal(grid, path, (0, 0), (39, 39))
+
+def test_respects_another_drones_parking():
+    # Corridor: drone 0 flies to the far end and parks there for good, so drone 1 can
+    # reach cells short of it but never the end cell
+    grid = np.ones((3, 6), dtype=np.uint8)
+    grid[1, :] = 0
+    reservations = ReservationTable()
+    corridor = [to_index((x, 1), 8) for x in range(6)]
+    reservations.reserve(0, corridor[2:], 0)
+    path = space_time_astar(grid, (0, 1), (1, 1), reservations, drone=1)
+    assert path[-1] == (1, 1)
+    assert space_time_astar(grid, (0, 1), (5, 1), reservations, drone=1, max_time=30) == []
+
+@pytest.mark.parametrize('seed', range(4))
+def test_swarm_routes_are_conflict_free(seed):
+    terrain, starts, goals = random_swarm(32, 30, 0.2, seed)
+    swarm = Swarm(terrain, starts, goals)
+    assert not swarm.failed.any()
+    check_conflict_free(swarm)
+    y, x = np.divmod(swarm.paths[:, -1], swarm.width)
+    assert list(zip((x - 1).tolist(), (y - 1).tolist())) == goals
+    assert swarm.fields.misses == len(set(goals))
+
+@pytest.mark.parametrize('seed', range(4))
+def test_replans_around_new_obstacles_stay_conflict_free(seed):
+    terrain, starts, goals = random_swarm(32, 30, 0.2, seed)
+    swarm = Swarm(terrain, starts, goals)
+    rng = np.random.default_rng(seed)
+    for _ in range(5):
+        for _ in range(4):
+            swarm.step()
+        # Drop an obstacle on some drone's route a few cells ahead
+        d = int(rng.integers(swarm.count))
+        ahead = swarm.paths[d, swarm.tick + 2:swarm.arrival[d]]
+        if not ahead.size:
+            continue
+        y, x = divmod(int(ahead[0]), swarm.width)
+        occupied = (swarm.cells == ahead[0]).any()
+        affected = swarm.report_obstacle((x - 1, y - 1))
+        check_conflict_free(swarm)
+        if occupied:
+            assert affected == []  # Somebody is standing there, so it isn't an obstacle
+        else:
+            assert d in affected and not (swarm.paths[:, swarm.tick:] == ahead[0]).any()
+    while swarm.step():
+        pass
+    assert swarm.collisions()[0].size == 0
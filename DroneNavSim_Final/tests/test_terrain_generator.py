@@ -0,0 +1,11 @@
+import numpy as np
+import pytest
+from terrain_generator import OBSTACLE_MODELS, generate_terrain
+
+@pytest.mark.parametrize('model', OBSTACLE_MODELS)
+@pytest.mark.parametrize('shape', [(0, 0), (0, 7), (7, 0)])
+def test_empty_shapes_give_empty_grids(model, shape):
+    width, height = shape
+    terrain = generate_terrain(width, height, seed=0, model=model)
+    assert terrain.shape == (height, width) and terrain.dtype == np.uint8
+
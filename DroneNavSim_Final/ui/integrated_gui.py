@@ -6,16 +6,22 @@ import numpy as np
 import time
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from pathfinding import astar
-from terrain_generator import generate_terrain
-from sos_detector import detect_sos_pattern
+from mission import Mission, MODEL_PATH, SOS_FRAMES
+from sos_detector import SOSDetectorService, IDLE, PENDING, COMPLETE, FAILED
+from grid_renderer import GridRenderer
+from instrumentation import metrics, start_export
 
 # Constants
 TILE_SIZE = 20
 GRID_WIDTH = 30
 GRID_HEIGHT = 30
-WINDOW_WIDTH = TILE_SIZE * GRID_WIDTH + 200
-WINDOW_HEIGHT = TILE_SIZE * GRID_HEIGHT
+SEED = None  # Set to an int to replay the same sequence of missions
+# Larger maps scroll inside a view of at most this size, following the drone
+MAX_VIEW_SIZE = 800
+VIEW_WIDTH = min(TILE_SIZE * GRID_WIDTH, MAX_VIEW_SIZE)
+VIEW_HEIGHT = min(TILE_SIZE * GRID_HEIGHT, MAX_VIEW_SIZE)
+WINDOW_WIDTH = VIEW_WIDTH + 200
+WINDOW_HEIGHT = VIEW_HEIGHT
 
 # Colors
 WHITE = (255, 255, 255)
@@ -26,43 +32,77 @@ BLUE = (0, 0, 255)
 RED = (255, 0, 0)
 YELLOW = (255, 255, 0)
 
+# Time between frames; the per-frame steps are timed as task_seconds{task=...}
+FRAME_SECONDS = metrics.histogram('frame_seconds', view='integrated')
+
 class DroneSimulator:
     def __init__(self):
         pygame.init()
         self.window = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
         pygame.display.set_caption("Integrated DroneNavSim")
         self.clock = pygame.time.Clock()
+        self.font = pygame.font.SysFont(None, 24)
+        self.sidebar = pygame.Rect(VIEW_WIDTH, 0, WINDOW_WIDTH - VIEW_WIDTH, WINDOW_HEIGHT)
+        self.renderer = GridRenderer(self.window, np.zeros((GRID_HEIGHT, GRID_WIDTH), dtype=np.uint8),
+                                     TILE_SIZE - 1, gap=1, gap_color=GRAY, view_size=(VIEW_WIDTH, VIEW_HEIGHT))
+        # Drawn bottom to top, so the drone covers the goal and both cover the trail
+        self.renderer.add_layer('trail', GREEN)
+        self.renderer.add_layer('goal', YELLOW, marker=True)
+        self.renderer.add_layer('drone', BLUE, marker=True)
+        self.rng = np.random.default_rng(SEED)
+        # Detection runs off the render loop; the model is loaded once, in the background
+        self.detector = SOSDetectorService(MODEL_PATH, SOS_FRAMES)
+        self.detector.preload()
         self.reset_simulation()
 
     def reset_simulation(self):
-        self.terrain = generate_terrain(GRID_WIDTH, GRID_HEIGHT, obstacle_prob=0.25)
-        self.start = (0, 0)
-        self.goal = (np.random.randint(5, GRID_WIDTH), np.random.randint(5, GRID_HEIGHT))
-        while self.terrain[self.goal[1]][self.goal[0]] == 1:
-            self.goal = (np.random.randint(5, GRID_WIDTH), np.random.randint(5, GRID_HEIGHT))
-        self.strobe_pos = self.goal
-        self.path = astar(self.terrain, self.start, self.goal)
-        self.path_index = 0
+        # The GUI runs detection itself (asynchronously), so the mission only navigates
+        self.mission = Mission(self.rng, GRID_WIDTH, GRID_HEIGHT, obstacle_prob=0.25, detector=None)
         self.last_move_time = time.time()
-        self.drone_pos = self.start
-        self.detected_sos = False
+        self.detector.reset()
+        self.detection_recorded = False
+        # Everything is painted once here; after that frames only repaint what changed
+        self.window.fill(GRAY)
+        self.renderer.set_terrain(self.mission.terrain)
+        self.renderer.center_on(self.mission.drone_pos)
+        self.renderer.draw()
+        self.trail_drawn = 0
+        self.legend_message = False  # Differs from every message, so the sidebar gets drawn
+        self.dirty = [self.window.get_rect()]
+
+    def add_obstacle_ahead(self):
+        pos = self.mission.add_obstacle_ahead()
+        if pos is not None:
+            self.renderer.update_terrain([pos])
 
+    @metrics.timed('task_seconds', task='draw_grid')
     def draw_grid(self):
-        for y in range(GRID_HEIGHT):
-            for x in range(GRID_WIDTH):
-                color = WHITE
-                if self.terrain[y][x] == 1:
-                    color = BLACK
-                elif (x, y) == self.drone_pos:
-                    color = BLUE
-                elif (x, y) == self.strobe_pos:
-                    color = YELLOW
-                elif (x, y) in self.path[:self.path_index]:
-                    color = GREEN
-                pygame.draw.rect(self.window, color, (x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE - 1, TILE_SIZE - 1))
+        mission = self.mission
+        self.renderer.add_cells('trail', mission.trail[self.trail_drawn:])
+        self.trail_drawn = len(mission.trail)
+        self.renderer.set_cells('goal', [mission.goal])
+        self.renderer.set_cells('drone', [mission.drone_pos])
+        self.renderer.follow(mission.drone_pos)
+        self.dirty += self.renderer.flush()
 
+    @metrics.timed('task_seconds', task='draw_legend')
     def draw_legend(self):
-        font = pygame.font.SysFont(None, 24)
+        status = self.detector.status()
+        message = None
+        if status == PENDING:
+            message = ("⏳ Analyzing strobe...", YELLOW)
+        elif self.mission.detected_sos:
+            message = ("✅ SOS Detected!", GREEN)
+        elif status == COMPLETE:
+            message = ("❌ No SOS pattern", RED)
+        elif status == FAILED:
+            message = ("⚠️ Detection failed", RED)
+        if message == self.legend_message:
+            return  # Unchanged sidebar, nothing to repaint
+        self.legend_message = message
+
+        font = self.font
+        self.window.fill(GRAY, self.sidebar)
         labels = [
             (BLUE, "Drone"),
             (GREEN, "Path"), 
@@ -70,47 +110,62 @@ class DroneSimulator:
             (YELLOW, "SOS Strobe"),
         ]
         for i, (color, text) in enumerate(labels):
-            pygame.draw.rect(self.window, color, (GRID_WIDTH * TILE_SIZE + 20, 30 + i * 30, 20, 20))
+            pygame.draw.rect(self.window, color, (VIEW_WIDTH + 20, 30 + i * 30, 20, 20))
             label = font.render(text, True, WHITE)
-            self.window.blit(label, (GRID_WIDTH * TILE_SIZE + 50, 30 + i * 30))
-
-        if self.detected_sos:
-            msg = font.render("✅ SOS Detected!", True, GREEN)
-            self.window.blit(msg, (GRID_WIDTH * TILE_SIZE + 20, 200))
+            self.window.blit(label, (VIEW_WIDTH + 50, 30 + i * 30))
+        if message is not None:
+            self.window.blit(font.render(*message, True), (VIEW_WIDTH + 20, 200))
+        self.dirty.append(self.sidebar)
 
+    @metrics.timed('task_seconds', task='update_autonomous')
     def update_autonomous(self):
+        # The mission itself is headless; the GUI only paces it to one move every 0.3 s
         now = time.time()
-        if self.path_index < len(self.path) and now - self.last_move_time > 0.3:
-            self.drone_pos = self.path[self.path_index]
-            self.path_index += 1
+        if not self.mission.done and now - self.last_move_time > 0.3:
+            self.mission.step()
             self.last_move_time = now
 
-        if self.drone_pos == self.strobe_pos and not self.detected_sos:
-            result = detect_sos_pattern()
-            self.detected_sos = result
+        # Submit once on arrival, then just poll; the loop never waits on the detector
+        status = self.detector.status()
+        if status == IDLE and self.mission.drone_pos == self.mission.goal:
+            self.detector.submit()
+        elif status == COMPLETE and not self.detection_recorded:
+            self.mission.record_detection(*self.detector.result())
+            self.detection_recorded = True
 
     def run(self):
         running = True
         while running:
-            self.window.fill(GRAY)
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_r:
                         self.reset_simulation()
+                    elif event.key == pygame.K_o:
+                        self.add_obstacle_ahead()
                     elif event.key == pygame.K_q:
                         running = False
+                    elif event.key in (pygame.K_EQUALS, pygame.K_PLUS, pygame.K_KP_PLUS):
+                        self.renderer.zoom_by(1)
+                    elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                        self.renderer.zoom_by(-1)
+                elif event.type == pygame.MOUSEWHEEL:
+                    self.renderer.zoom_by(event.y, pygame.mouse.get_pos())
 
             self.update_autonomous()
             self.draw_grid()
             self.draw_legend()
-            pygame.display.flip()
-            self.clock.tick(60)
+            # Only the cells and sidebar repainted this frame go to the display
+            pygame.display.update(self.dirty)
+            self.dirty = []
+            FRAME_SECONDS.observe(self.clock.tick(60) / 1000)
 
+        self.detector.shutdown()
         pygame.quit()
         sys.exit()
 
 if __name__ == "__main__":
+    start_export()
     sim = DroneSimulator()
     sim.run()
@@ -2,15 +2,24 @@
 import pygame
 import numpy as np
 import sys
-import random
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from terrain_generator import generate_terrain
+from grid_renderer import GridRenderer
+from instrumentation import metrics, start_export
 
 # Constants
 GRID_SIZE = 30
 CELL_SIZE = 20
 MARGIN = 1
-WIDTH = GRID_SIZE * (CELL_SIZE + MARGIN) + 200
-HEIGHT = GRID_SIZE * (CELL_SIZE + MARGIN)
+# Larger maps scroll inside a view of at most this size, following the drone
+MAX_VIEW_SIZE = 800
+VIEW_SIZE = min(GRID_SIZE * (CELL_SIZE + MARGIN), MAX_VIEW_SIZE)
+WIDTH = VIEW_SIZE + 200
+HEIGHT = VIEW_SIZE
 FPS = 60
+SEED = None  # Set to an int to replay the same map
 
 # Colors
 WHITE = (255, 255, 255)
@@ -21,64 +30,65 @@ RED = (255, 0, 0)
 YELLOW = (255, 255, 0)
 GRAY = (150, 150, 150)
 
-# Initialize terrain
-def generate_terrain(grid_size, obstacle_ratio=0.25):
-    terrain = np.zeros((grid_size, grid_size), dtype=int)
-    num_obstacles = int(obstacle_ratio * grid_size * grid_size)
-    for _ in range(num_obstacles):
-        x, y = random.randint(0, grid_size - 1), random.randint(0, grid_size - 1)
-        terrain[y][x] = 1
-    return terrain
+# Time between frames, and time spent repainting after a move
+FRAME_SECONDS = metrics.histogram('frame_seconds', view='manual')
+REDRAW_SECONDS = metrics.histogram('redraw_seconds', view='manual')
 
 # Game setup
+if __name__ == "__main__":
+    start_export()
 pygame.init()
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("Manual Drone Navigation")
 clock = pygame.time.Clock()
 font = pygame.font.SysFont(None, 24)
 
-terrain = generate_terrain(GRID_SIZE)
+rng = np.random.default_rng(SEED)
+terrain = generate_terrain(GRID_SIZE, GRID_SIZE, obstacle_prob=0.25, seed=rng)
 drone_pos = [0, 0]
-target_pos = [random.randint(GRID_SIZE//2, GRID_SIZE-1), random.randint(GRID_SIZE//2, GRID_SIZE-1)]
+target_pos = [int(rng.integers(GRID_SIZE//2, GRID_SIZE)), int(rng.integers(GRID_SIZE//2, GRID_SIZE))]
 while terrain[target_pos[1]][target_pos[0]] == 1:
-    target_pos = [random.randint(GRID_SIZE//2, GRID_SIZE-1), random.randint(GRID_SIZE//2, GRID_SIZE-1)]
+    target_pos = [int(rng.integers(GRID_SIZE//2, GRID_SIZE)), int(rng.integers(GRID_SIZE//2, GRID_SIZE))]
 path = []
+visited = set()  # Same cells as path, for O(1) membership tests
+
+# Terrain is rendered once; moves only repaint the cells that changed
+renderer = GridRenderer(screen, terrain, CELL_SIZE, gap=MARGIN, gap_color=GRAY, view_size=(VIEW_SIZE, VIEW_SIZE))
+renderer.add_layer('path', GREEN)
+renderer.add_layer('target', RED, marker=True)
+renderer.add_layer('drone', BLUE, marker=True)
+renderer.set_cells('target', [target_pos])
+renderer.set_cells('drone', [drone_pos])
+renderer.center_on(drone_pos)
 
 def draw_grid():
+    # Full repaint: grid and legend
     screen.fill(GRAY)
-    for y in range(GRID_SIZE):
-        for x in range(GRID_SIZE):
-            rect = pygame.Rect(x * (CELL_SIZE + MARGIN), y * (CELL_SIZE + MARGIN), CELL_SIZE, CELL_SIZE)
-            color = WHITE
-            if terrain[y][x] == 1:
-                color = BLACK
-            pygame.draw.rect(screen, color, rect)
-    for x, y in path:
-        rect = pygame.Rect(x * (CELL_SIZE + MARGIN), y * (CELL_SIZE + MARGIN), CELL_SIZE, CELL_SIZE)
-        pygame.draw.rect(screen, GREEN, rect)
-    tx, ty = target_pos
-    pygame.draw.rect(screen, RED, pygame.Rect(tx * (CELL_SIZE + MARGIN), ty * (CELL_SIZE + MARGIN), CELL_SIZE, CELL_SIZE))
-    dx, dy = drone_pos
-    pygame.draw.rect(screen, BLUE, pygame.Rect(dx * (CELL_SIZE + MARGIN), dy * (CELL_SIZE + MARGIN), CELL_SIZE, CELL_SIZE))
+    renderer.draw()
 
     # Draw legend
     legend_items = [("Drone", BLUE), ("Path", GREEN), ("Obstacle", BLACK), ("SOS Strobe", RED)]
     for i, (label, color) in enumerate(legend_items):
-        pygame.draw.rect(screen, color, (GRID_SIZE * (CELL_SIZE + MARGIN) + 20, 30 + i * 30, 20, 20))
+        pygame.draw.rect(screen, color, (VIEW_SIZE + 20, 30 + i * 30, 20, 20))
         text = font.render(label, True, WHITE)
-        screen.blit(text, (GRID_SIZE * (CELL_SIZE + MARGIN) + 50, 30 + i * 30))
+        screen.blit(text, (VIEW_SIZE + 50, 30 + i * 30))
 
 running = True
 sos_found = False
+draw_grid()
+pygame.display.flip()
+renderer.flush()
 while running:
-    clock.tick(FPS)
-    draw_grid()
-    pygame.display.flip()
+    FRAME_SECONDS.observe(clock.tick(FPS) / 1000)
 
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             running = False
 
+        elif event.type == pygame.KEYDOWN and event.key in (pygame.K_EQUALS, pygame.K_PLUS, pygame.K_MINUS):
+            renderer.zoom_by(-1 if event.key == pygame.K_MINUS else 1)
+            pygame.display.update(renderer.flush())
+
         elif event.type == pygame.KEYDOWN and not sos_found:
             x, y = drone_pos
             if event.key == pygame.K_w and y > 0 and terrain[y-1][x] == 0:
@@ -90,8 +100,14 @@ while running:
             elif event.key == pygame.K_d and x < GRID_SIZE - 1 and terrain[y][x+1] == 0:
                 drone_pos[0] += 1
 
-            if tuple(drone_pos) not in path:
-                path.append(tuple(drone_pos))
+            with REDRAW_SECONDS.time():
+                if tuple(drone_pos) not in visited:
+                    visited.add(tuple(drone_pos))
+                    path.append(tuple(drone_pos))
+                    renderer.add_cells('path', [drone_pos])
+                renderer.set_cells('drone', [drone_pos])
+                renderer.follow(drone_pos)
+                pygame.display.update(renderer.flush())
 
             if drone_pos == target_pos:
                 sos_found = True